@@ -1,12 +1,22 @@
 # agents/agente_revisor.py - VERSÃO UNIFICADA QUE RESOLVE O ERRO
-from typing import Optional, Dict, Any
-from tools import github_reader
-from tools.revisor_geral import executar_analise_llm 
+import json
+import asyncio
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from tools import github_reader, chunker, payload_codigo
+from tools.revisor_geral import executar_analise_llm, executar_analise_llm_async, carregar_prompt, gateway_llm
+from tools.llm_gateway import ObservadorDelta
+from tools.resiliencia import ObservadorEventos, CircuitoAbertoError, eh_erro_transitorio, notificar
+from tools.cache_llm import cache_resultados, gerar_chave
+from tools.tokens import estimar_tokens
 
 # Mantendo o modelo que funciona
 modelo_llm = 'gpt-4.1'
 max_tokens_saida = 6000  # Aumentado para incluir mais análises
 
+# Map-reduce: código acima deste orçamento de tokens é dividido em partes
+max_tokens_entrada_por_chunk = 60000
+max_tentativas_por_chunk = 2  # Repetições de uma parte que falhou (além dos retries do gateway)
+
 # Lista completa de análises válidas
 analises_validas = [
     "design", "pentest", "seguranca", "terraform",
@@ -20,20 +30,13 @@ def code_from_repo(repositorio: str,
     try:
         print('Iniciando a leitura do repositório: '+ repositorio)
         
-        # Verificar qual versão do github_reader temos
-        try:
-            # Tenta a versão nova com nome_repo e nome_branch
-            codigo_para_analise = github_reader.main(
-                nome_repo=repositorio,
-                tipo_de_analise=tipo_analise,
-                nome_branch=nome_branch
-            )
-        except TypeError:
-            # Fallback para versão antiga com repo
-            codigo_para_analise = github_reader.main(
-                repo=repositorio,
-                tipo_de_analise=tipo_analise
-            )
+        # Sem nome_branch o leitor usa o padrão dele; com, lê exatamente aquela branch
+        argumentos = {"branch": nome_branch} if nome_branch else {}
+        codigo_para_analise = github_reader.main(
+            repo=repositorio,
+            tipo_de_analise=tipo_analise,
+            **argumentos
+        )
         
         return codigo_para_analise
 
@@ -62,13 +65,191 @@ def validation(tipo_analise: str,
 
     return codigo_para_analise
 
+# --- MAP-REDUCE PARA REPOSITÓRIOS MAIORES QUE O CONTEXTO ---
+
+instrucao_consolidacao = (
+    "Os conteúdos acima são relatórios parciais da mesma análise, cada um cobrindo uma parte "
+    "diferente do repositório. Consolide-os em um único relatório final no mesmo formato, "
+    "removendo duplicidades e preservando todos os achados e recomendações específicos."
+)
+
+def _usar_map_reduce(codigo_para_analise: Any, modo: str, payload: payload_codigo.PayloadCodigo) -> bool:
+    """`payload` é o código já codificado: o tamanho medido é o que seria enviado"""
+    return payload_codigo.eh_mapa_de_arquivos(codigo_para_analise) and (
+        modo == "map_reduce" or (modo == "auto" and payload.tokens > max_tokens_entrada_por_chunk)
+    )
+
+def codificar_payload(codigo_para_analise: Any) -> payload_codigo.PayloadCodigo:
+    """Código no formato enviado ao modelo (seções de texto puro por arquivo), com o tamanho no log"""
+    payload = payload_codigo.codificar(codigo_para_analise)
+    print(f"📦 Payload: {payload.arquivos} arquivo(s), {payload.caracteres} caracteres, ~{payload.tokens} tokens")
+    return payload
+
+def dividir_em_chunks(arquivos: Dict[str, str], max_tokens: Optional[int] = None) -> List[List[chunker.Chunk]]:
+    """Agrupa os arquivos em partes que cabem em `max_tokens`, cortando arquivos grandes em funções/classes"""
+    return chunker.agrupar_em_lotes(arquivos, max_tokens or max_tokens_entrada_por_chunk)
+
+def _vale_repetir(erro: Exception) -> bool:
+    """Só falhas transitórias valem outra tentativa (o revisor embrulha o erro original como causa)"""
+    causa = erro.__cause__ or erro
+    return not isinstance(causa, CircuitoAbertoError) and eh_erro_transitorio(causa)
+
+async def _analisar_chunk(indice: int, total: int, chunk: List[chunker.Chunk], tipo_analise: str,
+                          instrucoes_extras: str, model_name: str, max_token_out: int,
+                          ao_evento: Optional[ObservadorEventos]) -> str:
+    """Analisa uma parte, usando o cache e repetindo só esta parte em caso de falha"""
+    # Com as linhas numeradas, cada parte mantém a numeração do arquivo original
+    numeros = {parte.nome: parte.numeros_das_linhas() for parte in chunk} \
+        if payload_codigo.PayloadConfig.NUMERAR_LINHAS else None
+    codigo = payload_codigo.codificar({parte.nome: parte.conteudo for parte in chunk},
+                                      numeros_de_linha=numeros).texto
+    chave = gerar_chave('chunk', tipo_analise, carregar_prompt(tipo_analise), model_name,
+                        max_token_out, instrucoes_extras, codigo)
+    em_cache = cache_resultados.obter(chave)
+    if em_cache is not None:
+        print(f"💾 Parte {indice}/{total} reaproveitada do cache")
+        notificar(ao_evento, "map_reduce", {"fase": "map", "parte": indice, "total": total, "cache": True})
+        return em_cache
+
+    ultimo_erro = None
+    for tentativa in range(1, max_tentativas_por_chunk + 2):
+        try:
+            resultado = await executar_analise_llm_async(
+                tipo_analise=tipo_analise,
+                codigo=codigo,
+                analise_extra=instrucoes_extras,
+                model_name=model_name,
+                max_token_out=max_token_out,
+                ao_evento=ao_evento
+            )
+            cache_resultados.guardar(chave, resultado)
+            notificar(ao_evento, "map_reduce", {"fase": "map", "parte": indice, "total": total, "cache": False})
+            return resultado
+        except Exception as e:
+            if not _vale_repetir(e):
+                # Erro permanente ou circuito aberto: repetir só gastaria chamadas
+                raise
+            ultimo_erro = e
+            print(f"⚠️ Parte {indice}/{total} falhou (tentativa {tentativa}): {e}")
+    raise RuntimeError(f"Parte {indice}/{total} falhou após {max_tentativas_por_chunk + 1} tentativas: {ultimo_erro}")
+
+def _mesclar_resultados_json(parciais: List[str]) -> Optional[str]:
+    """Mescla localmente resultados parciais no formato {'resumo_geral', 'conjunto_de_mudancas'}"""
+    resumos, mudancas = [], []
+    for parcial in parciais:
+        try:
+            dados = json.loads(parcial.replace("```json", '').replace("```", '').strip())
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(dados, dict) or not isinstance(dados.get('conjunto_de_mudancas'), list):
+            return None
+        if dados.get('resumo_geral'):
+            resumos.append(dados['resumo_geral'])
+        mudancas.extend(dados['conjunto_de_mudancas'])
+    return json.dumps({"resumo_geral": "\n\n".join(resumos), "conjunto_de_mudancas": mudancas},
+                      ensure_ascii=False, indent=2)
+
+async def _consolidar(parciais: List[str], tipo_analise: str, instrucoes_extras: str, model_name: str,
+                      max_token_out: int, ao_evento: Optional[ObservadorEventos]) -> str:
+    """Etapa reduce: junta os relatórios parciais (em níveis, se não couberem em uma chamada)"""
+    if len(parciais) == 1:
+        return parciais[0]
+
+    mesclado = _mesclar_resultados_json(parciais)
+    if mesclado is not None:
+        print(f"🧩 {len(parciais)} resultados JSON mesclados localmente")
+        return mesclado
+
+    instrucoes = instrucao_consolidacao
+    if instrucoes_extras and instrucoes_extras.strip():
+        instrucoes += f"\n\n{instrucoes_extras}"
+
+    while len(parciais) > 1:
+        grupos, atual, tokens_atual = [], [], 0
+        for parcial in parciais:
+            tokens_parcial = estimar_tokens(parcial)
+            if atual and tokens_atual + tokens_parcial > max_tokens_entrada_por_chunk:
+                grupos.append(atual)
+                atual, tokens_atual = [], 0
+            atual.append(parcial)
+            tokens_atual += tokens_parcial
+        grupos.append(atual)
+        if len(grupos) == len(parciais):
+            # Nenhum par de relatórios cabe junto: consolidar de dois em dois para garantir progresso
+            grupos = [parciais[i:i + 2] for i in range(0, len(parciais), 2)]
+
+        print(f"🧩 Consolidando {len(parciais)} relatórios parciais em {len(grupos)} chamada(s)...")
+        notificar(ao_evento, "map_reduce", {"fase": "reduce", "parciais": len(parciais), "grupos": len(grupos)})
+        parciais = await _reunir([
+            executar_analise_llm_async(
+                tipo_analise=tipo_analise,
+                codigo="\n\n".join(
+                    f"=== RELATÓRIO PARCIAL {i}/{len(grupo)} ===\n{parcial}" for i, parcial in enumerate(grupo, 1)
+                ),
+                analise_extra=instrucoes,
+                model_name=model_name,
+                max_token_out=max_token_out,
+                ao_evento=ao_evento
+            ) if len(grupo) > 1 else _retornar(grupo[0])
+            for grupo in grupos
+        ])
+    return parciais[0]
+
+async def _retornar(valor: str) -> str:
+    return valor
+
+async def _reunir(aguardaveis: List[Awaitable[Any]]) -> List[Any]:
+    """
+    Como asyncio.gather, mas na primeira falha (ou no cancelamento) as tarefas ainda
+    pendentes são canceladas: um job que já falhou não segue gastando cota no gateway.
+    """
+    tarefas = [asyncio.ensure_future(aguardavel) for aguardavel in aguardaveis]
+    if not tarefas:
+        return []
+    try:
+        await asyncio.wait(tarefas, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        pendentes = [tarefa for tarefa in tarefas if not tarefa.done()]
+        for tarefa in pendentes:
+            tarefa.cancel()
+        if pendentes:
+            await asyncio.wait(pendentes)
+    erros = [tarefa.exception() for tarefa in tarefas if not tarefa.cancelled()]
+    erro = next((e for e in erros if e is not None), None)
+    if erro is not None:
+        raise erro
+    return [tarefa.result() for tarefa in tarefas]
+
+async def executar_map_reduce(arquivos: Dict[str, str], tipo_analise: str, instrucoes_extras: str,
+                              model_name: str, max_token_out: int,
+                              ao_evento: Optional[ObservadorEventos] = None) -> str:
+    """Divide o código em partes, analisa as partes em paralelo e consolida os relatórios"""
+    chunks = dividir_em_chunks(arquivos)
+    total = len(chunks)
+    print(f"🗂️ Map-reduce: {len(arquivos)} arquivos divididos em {total} parte(s)")
+
+    parciais = await _reunir([
+        _analisar_chunk(i, total, chunk, tipo_analise, instrucoes_extras, model_name, max_token_out, ao_evento)
+        for i, chunk in enumerate(chunks, 1)
+    ])
+    return await _consolidar(list(parciais), tipo_analise, instrucoes_extras, model_name, max_token_out, ao_evento)
+
 def main(tipo_analise: str,
          repositorio: Optional[str] = None,
          nome_branch: Optional[str] = None,  # ADICIONADO nome_branch
          codigo: Optional[str] = None,
          instrucoes_extras: str = "",
          model_name: str = modelo_llm,
-         max_token_out: int = max_tokens_saida) -> Dict[str, Any]:
+         max_token_out: int = max_tokens_saida,
+         ao_evento: Optional[ObservadorEventos] = None,
+         modo: str = "auto",
+         ao_delta: Optional[ObservadorDelta] = None) -> Dict[str, Any]:
+    """
+    Executa a análise. `modo`: "unico" (uma chamada), "map_reduce" (partes em paralelo
+    + consolidação) ou "auto" (map-reduce só quando o código não cabe em uma chamada).
+    Com `ao_delta`, o texto do relatório é repassado em trechos à medida que é gerado
+    (no map-reduce, o relatório consolidado é entregue de uma vez ao final).
+    """
 
     try:
         print(f"🎯 Executando análise: {tipo_analise}")
@@ -86,12 +267,29 @@ def main(tipo_analise: str,
         
         print(f"📝 Código obtido com sucesso")
         
+        payload = codificar_payload(codigo_para_analise)
+        if _usar_map_reduce(codigo_para_analise, modo, payload):
+            resultado = gateway_llm.executar(executar_map_reduce(
+                arquivos=codigo_para_analise,
+                tipo_analise=tipo_analise,
+                instrucoes_extras=instrucoes_extras,
+                model_name=model_name,
+                max_token_out=max_token_out,
+                ao_evento=ao_evento
+            ))
+            if ao_delta:
+                ao_delta(resultado)
+            print(f"✅ Análise concluída")
+            return {"tipo_analise": tipo_analise, "resultado": resultado}
+        
         resultado = executar_analise_llm(
             tipo_analise=tipo_analise,
-            codigo=str(codigo_para_analise),
+            codigo=payload.texto,
             analise_extra=instrucoes_extras,
             model_name=model_name,
-            max_token_out=max_token_out
+            max_token_out=max_token_out,
+            ao_evento=ao_evento,
+            ao_delta=ao_delta
         )
         
         print(f"✅ Análise concluída")
@@ -109,4 +307,112 @@ def main(tipo_analise: str,
 # Função para compatibilidade com código existente
 def executar_analise(tipo_analise: str, repositorio: Optional[str] = None, codigo: Optional[str] = None, instrucoes_extras: str = "") -> Dict[str, Any]:
     """Função compatível com código existente que não usa nome_branch"""
-    return main(tipo_analise=tipo_analise, repositorio=repositorio, codigo=codigo, instrucoes_extras=instrucoes_extras)
\ No newline at end of file
+    return main(tipo_analise=tipo_analise, repositorio=repositorio, codigo=codigo, instrucoes_extras=instrucoes_extras)
+
+# --- Suíte: várias análises sobre uma única leitura do repositório ---
+
+def code_from_repo_para_analises(repositorio: str,
+                                 tipos_analise: List[str],
+                                 nome_branch: Optional[str] = None) -> Dict[str, str]:
+    """Lê o repositório uma única vez, com a união das extensões de todos os tipos de análise"""
+    extensoes = github_reader.get_file_extensions_by_analyses(tipos_analise)
+    print(f"Iniciando a leitura do repositório: {repositorio} ({len(tipos_analise)} análises, {len(extensoes)} extensões)")
+    try:
+        argumentos = {"branch": nome_branch} if nome_branch else {}
+        return github_reader.main(repo=repositorio, tipo_de_analise=tipos_analise[0],
+                                  extensoes=extensoes, **argumentos)
+    except Exception as e:
+        raise RuntimeError(f"Falha ao ler o repositório para a suíte de análises: {e}") from e
+
+def filtrar_arquivos_da_analise(arquivos: Dict[str, str], tipo_analise: str) -> Dict[str, str]:
+    """
+    Recorta da leitura combinada os arquivos que o tipo de análise leria sozinho. Sem nenhum,
+    usa as extensões básicas, como o github_reader faz na leitura individual.
+    """
+    extensoes = tuple(github_reader.get_file_extensions_by_analysis(tipo_analise))
+    selecionados = {caminho: conteudo for caminho, conteudo in arquivos.items() if caminho.endswith(extensoes)}
+    if not selecionados:
+        basicas = tuple(github_reader.GitHubReaderConfig.BASIC_EXTENSIONS)
+        selecionados = {caminho: conteudo for caminho, conteudo in arquivos.items() if caminho.endswith(basicas)}
+    return selecionados
+
+async def analisar_codigo_async(codigo_para_analise: Any, tipo_analise: str, instrucoes_extras: str = "",
+                                model_name: str = modelo_llm, max_token_out: int = max_tokens_saida,
+                                ao_evento: Optional[ObservadorEventos] = None, modo: str = "auto") -> str:
+    """Versão assíncrona do núcleo de `main` (sem leitura do repositório nem streaming)"""
+    payload = codificar_payload(codigo_para_analise)
+    if _usar_map_reduce(codigo_para_analise, modo, payload):
+        return await executar_map_reduce(codigo_para_analise, tipo_analise, instrucoes_extras,
+                                         model_name, max_token_out, ao_evento)
+    return await executar_analise_llm_async(
+        tipo_analise=tipo_analise,
+        codigo=payload.texto,
+        analise_extra=instrucoes_extras,
+        model_name=model_name,
+        max_token_out=max_token_out,
+        ao_evento=ao_evento
+    )
+
+def montar_relatorio_suite(resultados: Dict[str, str], tipos_analise: List[str]) -> str:
+    """Relatório combinado, uma seção por análise, na ordem pedida"""
+    secoes = [f"## Análise: {tipo}\n\n{resultados[tipo]}" for tipo in tipos_analise if tipo in resultados]
+    return "# Relatório combinado\n\n" + "\n\n---\n\n".join(secoes)
+
+async def _executar_suite_async(arquivos: Dict[str, str], tipos_analise: List[str], instrucoes_extras: str,
+                                model_name: str, max_token_out: int,
+                                ao_evento: Optional[ObservadorEventos],
+                                ao_secao: Optional[Callable[[str, str], None]]) -> Dict[str, str]:
+    async def _uma_analise(tipo: str) -> str:
+        codigo = filtrar_arquivos_da_analise(arquivos, tipo)
+        if not codigo:
+            texto = 'Não foi fornecido nenhum código para análise'
+        else:
+            try:
+                texto = await analisar_codigo_async(codigo, tipo, instrucoes_extras, model_name,
+                                                    max_token_out, ao_evento)
+            except Exception as e:
+                print(f"❌ Erro na análise '{tipo}' da suíte: {e}")
+                texto = f"Erro durante a análise: Erro na análise '{tipo}': {e}"
+        print(f"✅ Análise '{tipo}' da suíte concluída")
+        if ao_secao:
+            ao_secao(tipo, texto)
+        return texto
+
+    textos = await _reunir([_uma_analise(tipo) for tipo in tipos_analise])
+    return dict(zip(tipos_analise, textos))
+
+def executar_suite(repositorio: str,
+                   tipos_analise: List[str],
+                   nome_branch: Optional[str] = None,
+                   instrucoes_extras: str = "",
+                   model_name: str = modelo_llm,
+                   max_token_out: int = max_tokens_saida,
+                   ao_evento: Optional[ObservadorEventos] = None,
+                   ao_secao: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    """
+    Executa vários tipos de análise sobre o mesmo repositório: uma leitura (união das
+    extensões) e as análises em paralelo no gateway. `ao_secao(tipo, texto)` é chamado
+    assim que cada análise termina. Falha de uma análise não derruba as demais.
+    """
+    tipos = list(dict.fromkeys(tipos_analise))
+    if not tipos:
+        raise ValueError("Informe ao menos um tipo de análise para a suíte.")
+    invalidos = [tipo for tipo in tipos if tipo not in analises_validas]
+    if invalidos:
+        raise ValueError(f"Tipos de análise inválidos: {invalidos}. Válidos: {analises_validas}")
+
+    print(f"🎯 Executando suíte de análises: {', '.join(tipos)}")
+    arquivos = code_from_repo_para_analises(repositorio, tipos, nome_branch)
+    if not arquivos:
+        resultados = {tipo: 'Não foi fornecido nenhum código para análise' for tipo in tipos}
+    else:
+        print(f"📝 {len(arquivos)} arquivos lidos para {len(tipos)} análises")
+        resultados = gateway_llm.executar(_executar_suite_async(
+            arquivos, tipos, instrucoes_extras, model_name, max_token_out, ao_evento, ao_secao
+        ))
+
+    return {
+        "tipo_analise": "suite",
+        "resultados": resultados,
+        "resultado": montar_relatorio_suite(resultados, tipos)
+    }
@@ -0,0 +1,89 @@
+# benchmark_preenchimento.py - MEDE O PREENCHIMENTO DE CONTEÚDO EM CONJUNTOS GRANDES DE MUDANÇAS
+# Uso: python benchmark_preenchimento.py [quantidade_de_arquivos]
+import io
+import sys
+import copy
+import time
+import random
+from contextlib import redirect_stdout
+
+from tools import preenchimento
+
+
+def gerar_conjunto(quantidade: int, semente: int = 42):
+    """JSON inicial com `quantidade` arquivos e um agrupamento que cita os mesmos arquivos com variações de caminho"""
+    aleatorio = random.Random(semente)
+    pacotes = [f"pacote_{i}" for i in range(50)]
+    mudancas = []
+    for i in range(quantidade):
+        caminho = f"src/{aleatorio.choice(pacotes)}/modulo_{i // 50}/arquivo_{i}.py"
+        mudancas.append({"caminho_do_arquivo": caminho, "status": "MODIFICADO", "conteudo": f"# arquivo {i}\n"})
+
+    grupos = {}
+    for i, mudanca in enumerate(mudancas):
+        caminho = mudanca["caminho_do_arquivo"]
+        variacao = i % 10
+        if variacao == 7:
+            caminho = "./" + caminho                     # prefixo relativo
+        elif variacao == 8:
+            caminho = caminho.split('/', 1)[1]           # sem o diretório raiz
+        elif variacao == 9:
+            caminho = caminho.replace('/', '\\')         # separador do Windows
+        grupo = grupos.setdefault(f"grupo{i % 20 + 1}", {"titulo_pr": f"Grupo {i % 20 + 1}", "conjunto_de_mudancas": []})
+        grupo["conjunto_de_mudancas"].append({"caminho_do_arquivo": caminho, "status": "MODIFICADO"})
+    return {"conjunto_de_mudancas": mudancas}, grupos
+
+
+def preencher_varredura_linear(json_agrupado: dict, json_inicial: dict) -> dict:
+    """Algoritmo anterior ao índice (busca por substring em todo o mapa), para comparação"""
+    mapa = {m["caminho_do_arquivo"]: m["conteudo"] for m in json_inicial["conjunto_de_mudancas"]}
+    for dados in json_agrupado.values():
+        for mudanca in dados["conjunto_de_mudancas"]:
+            caminho = mudanca["caminho_do_arquivo"]
+            if caminho in mapa:
+                mudanca["conteudo"] = mapa[caminho]
+                continue
+            nome_arquivo = caminho.split('/')[-1]
+            for caminho_mapa in mapa:
+                if nome_arquivo in caminho_mapa or caminho_mapa.endswith(nome_arquivo):
+                    mudanca["conteudo"] = mapa[caminho_mapa]
+                    break
+    return json_agrupado
+
+
+def medir(funcao, json_agrupado: dict, json_inicial: dict):
+    entrada = copy.deepcopy(json_agrupado)
+    inicio = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        resultado = funcao(json_agrupado=entrada, json_inicial=json_inicial)
+    return time.perf_counter() - inicio, resultado
+
+
+def acertos(resultado: dict, json_inicial: dict) -> int:
+    """Mudanças que receberam o conteúdo do próprio arquivo"""
+    esperado = {preenchimento.normalizar_caminho(m["caminho_do_arquivo"]): m["conteudo"]
+                for m in json_inicial["conjunto_de_mudancas"]}
+    total = 0
+    for dados in resultado.values():
+        for mudanca in dados["conjunto_de_mudancas"]:
+            caminho = preenchimento.normalizar_caminho(mudanca["caminho_do_arquivo"])
+            conteudo = next((c for p, c in esperado.items() if p.endswith('/' + caminho)), None) \
+                if caminho not in esperado else esperado[caminho]
+            total += mudanca.get("conteudo") == conteudo
+    return total
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    json_inicial, json_agrupado = gerar_conjunto(quantidade)
+    print(f"📦 {quantidade} arquivos, {len(json_agrupado)} grupos (30% dos caminhos com variação)")
+
+    tempo_indice, resultado_indice = medir(preenchimento.main, json_agrupado, json_inicial)
+    print(f"⚡ Índice de caminhos:  {tempo_indice * 1000:9.1f} ms  "
+          f"({acertos(resultado_indice, json_inicial)}/{quantidade} com o conteúdo certo)")
+
+    tempo_linear, resultado_linear = medir(preencher_varredura_linear, json_agrupado, json_inicial)
+    print(f"🐢 Varredura linear:    {tempo_linear * 1000:9.1f} ms  "
+          f"({acertos(resultado_linear, json_inicial)}/{quantidade} com o conteúdo certo)")
+
+    print(f"📊 {tempo_linear / tempo_indice:.1f}x mais rápido")
@@ -1,16 +1,32 @@
 # mcp_server_fastapi.py - VERSÃO CORRIGIDA
+import os
+import copy
 import json
 import uuid
 import time
+import asyncio
 import threading
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Path
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Path, Query, Request, Response, Header
+from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, Dict, Any
+from typing import Optional, Literal, Dict, Any, List, Union
+
+from tools.job_store import JobStore, ESTADOS_TERMINAIS, CursorInvalidoError
+from tools.retencao_jobs import FaxineiroJobs
+from tools.compressao import comprimir_relatorio
+from tools.checkpoints import checkpoints
+from tools.cancelamento import cancelamentos, contexto_cancelamento, verificar_cancelamento, JobCanceladoError
+from tools.workflow_engine import MotorWorkflow, EtapaFalhouError, validar_registro
+from tools import dry_run_diff
 
 # Imports dos agentes (mantenha os seus imports originais)
 try:
     from agents import agente_revisor
-    from tools import preenchimento, commit_multiplas_branchs
+    from tools import preenchimento, commit_multiplas_branchs, commit_clone_local
+    from tools.commit_journal import ARQUIVO_DIARIO, DiarioCommits
+    from tools.llm_gateway import obter_gateway
     AGENTS_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️  Agentes não disponíveis: {e}")
@@ -22,6 +38,23 @@ class StartAnalysisPayload(BaseModel):
     analysis_type: Literal["design", "relatorio_teste_unitario"]
     branch_name: Optional[str] = None
     instrucoes_extras: Optional[str] = None
+    stream: bool = False  # Retorna o job_id na hora e entrega o relatório em trechos via /status
+    independent_branches: bool = False  # Cada grupo sai da branch base e os PRs são criados em paralelo (sem empilhar)
+    dry_run: bool = False  # Após aprovação, gera só a prévia (diffs) das mudanças, sem commitar
+
+class StartSuitePayload(BaseModel):
+    repo_name: str
+    analysis_types: List[Literal["design", "pentest", "seguranca", "terraform", "relatorio_teste_unitario", "docstring"]] = Field(..., min_length=1)
+    branch_name: Optional[str] = None
+    instrucoes_extras: Optional[str] = None
+
+    @property
+    def analysis_type(self) -> str:
+        return "suite"
+
+class StartSuiteResponse(BaseModel):
+    job_id: str
+    analysis_types: List[str]
 
 class UpdateJobPayload(BaseModel):
     job_id: str
@@ -35,63 +68,238 @@ class JobStatusResponse(BaseModel):
     error_details: Optional[str] = None
     last_updated: Optional[float] = None
     report: Optional[str] = None  # ✅ Adicionar campo report
+    llm_status: Optional[Dict[str, Any]] = None  # Retries e estado do circuit breaker das chamadas LLM
+    report_offset: Optional[int] = None  # Posição inicial do trecho de relatório devolvido em 'report'
+    report_length: Optional[int] = None  # Tamanho total atual do relatório
+    report_revision: Optional[int] = None  # Muda quando o relatório é substituído (não só estendido): reler do offset 0
+    version: Optional[int] = None  # Versão do job; muda a cada atualização (também enviada no ETag)
+    sections: Optional[Dict[str, str]] = None  # Suíte: relatório de cada análise já concluída
+    commit_result: Optional[Dict[str, Any]] = None  # Arquivos criados/modificados/inalterados e commits por branch
+    dry_run_stats: Optional[Dict[str, Any]] = None  # Totais da prévia das mudanças (diffs completos em /jobs/{id}/diff)
 
 class StartAnalysisResponse(BaseModel):
     job_id: str
     report: str
 
+# Armazenamento em memória para jobs (versionado, notifica mudanças para SSE)
+jobs = JobStore()
+
+# Expira jobs terminais e manda relatórios antigos para o disco (ver tools/retencao_jobs.py)
+faxineiro_jobs = FaxineiroJobs(jobs, ao_remover=checkpoints.remover)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    retomar_jobs_persistidos()
+    faxineiro_jobs.iniciar()
+    yield
+    faxineiro_jobs.parar()
+
 # --- Configuração do FastAPI ---
 app = FastAPI(
     title="Agentes Peers - Backend",
     description="Sistema de análise de código com IA multi-agentes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Armazenamento em memória para jobs
-jobs: Dict[str, Dict[str, Any]] = {}
+# Respostas acima deste tamanho (bytes) são comprimidas quando o cliente aceita gzip
+COMPRESSAO_RESPOSTA_MINIMO = int(os.getenv('COMPRESSAO_RESPOSTA_MINIMO', 1024))
+
+class CompressaoRespostas(GZipMiddleware):
+    """GZip para as respostas da API, exceto os streams SSE (que não podem ser bufferizados)"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/events"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(CompressaoRespostas, minimum_size=COMPRESSAO_RESPOSTA_MINIMO, compresslevel=6)
+
+# Intervalo de keep-alive e de agrupamento de mudanças no SSE (segundos)
+SSE_KEEPALIVE = 15.0
+SSE_INTERVALO_MINIMO = 0.1
+
+# Motor do envio das mudanças: 'api' (Git Data API, um commit por grupo) ou
+# 'clone_local' (git em um clone local a partir de espelho em cache, um único push)
+MOTOR_COMMIT = os.getenv('COMMIT_MOTOR', 'api')
+
+# WORKFLOW_REGISTRY: cada pipeline é um DAG de etapas (ver tools/workflow_engine.py).
+# 'inputs' mapeia parâmetro da função -> valor do contexto; 'output' nomeia o valor produzido.
+# Etapas sem dependência entre si rodam em paralelo; 'timeout' (s), 'retries' e 'cache' valem por etapa.
+# 'after' lista valores que precisam existir antes da etapa, sem serem passados a ela.
+ETAPAS_COMMIT = [
+    {
+        "status": "validating_github",
+        "message": "Validando acesso ao repositório GitHub...",
+        "agent_function": "validar_github",
+        "inputs": {"repositorio": "repositorio", "nome_branch": "nome_branch"},
+        "output": "branch_base",
+        "timeout": 120,
+        "retries": 1,
+        "cache": False,
+        "duration": 1
+    },
+    {
+        "status": "populating_data",
+        "message": "Preparando dados para commit...",
+        "agent_function": "preenchimento.main",
+        "inputs": {"json_agrupado": "resultado_agrupamento", "json_inicial": "resultado_mudancas"},
+        "output": "dados_para_commit",
+        "duration": 2
+    },
+    {
+        "status": "generating_diff",
+        "message": "Gerando prévia das mudanças (dry-run)...",
+        "agent_function": "dry_run_diff",
+        "inputs": {"dados_agrupados": "dados_para_commit", "snapshot": "snapshot_base"},
+        "output": "relatorio_diff",
+        "duration": 1
+    },
+    {
+        "status": "committing_to_github",
+        "message": "Enviando mudanças para GitHub...",
+        "agent_function": "commit_multiplas_branchs",
+        "inputs": {"repositorio": "repositorio", "dados_agrupados": "dados_para_commit", "base_branch": "branch_base",
+                   "independentes": "branches_independentes"},
+        "after": ["relatorio_diff"],
+        "output": "commit_realizado",
+        "timeout": 1800,
+        "duration": 3
+    }
+]
 
-# WORKFLOW_REGISTRY corrigido e completo
 WORKFLOW_REGISTRY = {
     "design": {
         "description": "Analisa o design, refatora o código e agrupa os commits",
+        "inputs": ["repositorio", "nome_branch", "instrucoes_extras", "branches_independentes"],
         "steps": [
+            {
+                "status": "reading_repository",
+                "message": "Lendo o repositório (snapshot da base)...",
+                "agent_function": "snapshot_base",
+                "params": {"tipo_analise": "refatoracao"},
+                "inputs": {"repositorio": "repositorio", "nome_branch": "nome_branch"},
+                "output": "snapshot_base",
+                "timeout": 600,
+                "retries": 1,
+                "duration": 2
+            },
             {
                 "status": "refactoring_code",
                 "message": "Refatorando código...",
-                "agent_function": "agente_revisor.main" if AGENTS_AVAILABLE else None,
-                "params": {"tipo_analise": "refatoracao"},
+                "agent_function": "agente_revisor.main",
+                "params": {"tipo_analise": "refatoracao", "formato_saida": "mudancas"},
+                "inputs": {"codigo": "snapshot_base", "instrucoes_extras": "instrucoes_extras"},
+                "output": "resultado_mudancas",
+                "timeout": 1800,
+                "retries": 1,
                 "duration": 5
             },
             {
                 "status": "grouping_commits", 
                 "message": "Agrupando commits por tema...",
-                "agent_function": "agente_revisor.main" if AGENTS_AVAILABLE else None,
-                "params": {"tipo_analise": "agrupamento_design"},
+                "agent_function": "agrupamento",
+                "params": {"tipo_analise": "agrupamento_design", "formato_saida": "agrupamento"},
+                "inputs": {"mudancas": "resultado_mudancas"},
+                "output": "resultado_agrupamento",
+                "timeout": 900,
+                "retries": 1,
                 "duration": 3
-            }
+            },
+            *ETAPAS_COMMIT
         ]
     },
     "relatorio_teste_unitario": {
         "description": "Cria testes unitários com base no relatório e os agrupa",
+        "inputs": ["repositorio", "nome_branch", "instrucoes_extras", "branches_independentes"],
         "steps": [
+            {
+                "status": "reading_repository",
+                "message": "Lendo o repositório (snapshot da base)...",
+                "agent_function": "snapshot_base",
+                "params": {"tipo_analise": "escrever_testes"},
+                "inputs": {"repositorio": "repositorio", "nome_branch": "nome_branch"},
+                "output": "snapshot_base",
+                "timeout": 600,
+                "retries": 1,
+                "duration": 2
+            },
             {
                 "status": "writing_unit_tests",
                 "message": "Escrevendo testes unitários...", 
-                "agent_function": "agente_revisor.main" if AGENTS_AVAILABLE else None,
-                "params": {"tipo_analise": "escrever_testes"},
+                "agent_function": "agente_revisor.main",
+                "params": {"tipo_analise": "escrever_testes", "formato_saida": "mudancas"},
+                "inputs": {"codigo": "snapshot_base", "instrucoes_extras": "instrucoes_extras"},
+                "output": "resultado_mudancas",
+                "timeout": 1800,
+                "retries": 1,
                 "duration": 6
             },
             {
                 "status": "grouping_tests",
                 "message": "Agrupando testes em grupos...",
-                "agent_function": "agente_revisor.main" if AGENTS_AVAILABLE else None, 
-                "params": {"tipo_analise": "agrupamento_testes"},
+                "agent_function": "agrupamento",
+                "params": {"tipo_analise": "agrupamento_testes", "formato_saida": "agrupamento"},
+                "inputs": {"mudancas": "resultado_mudancas"},
+                "output": "resultado_agrupamento",
+                "timeout": 900,
+                "retries": 1,
                 "duration": 2
-            }
+            },
+            *ETAPAS_COMMIT
         ]
     }
 }
 
+# Validado na importação: erro de definição aparece ao subir o servidor, não no meio de um job
+WORKFLOWS = validar_registro(WORKFLOW_REGISTRY)
+
+# Jobs com dry_run=true terminam na prévia: sem validar o acesso ao GitHub nem commitar
+ETAPAS_SO_COMMIT = {"validating_github", "committing_to_github"}
+WORKFLOWS_DRY_RUN = validar_registro({
+    nome: {**workflow, "steps": [etapa for etapa in workflow["steps"] if etapa["status"] not in ETAPAS_SO_COMMIT]}
+    for nome, workflow in WORKFLOW_REGISTRY.items()
+})
+
+def criar_observador_llm(job_id: str):
+    """Cria o callback que registra no job os eventos de retry/circuit breaker das chamadas LLM"""
+    def _ao_evento(evento: str, dados: Dict[str, Any]):
+        job = jobs.get(job_id)
+        if not job:
+            return
+        llm_status = job.setdefault('llm_status', {'retries': 0})
+        llm_status['ultimo_evento'] = evento
+        if 'circuito' in dados:
+            llm_status['circuito'] = dados['circuito']
+        if evento == 'retry':
+            llm_status['retries'] += 1
+            llm_status['ultimo_erro'] = dados.get('erro')
+            llm_status['proxima_tentativa_em'] = time.time() + dados['espera_segundos']
+        elif evento in ('retry_esgotado', 'circuito_aberto'):
+            llm_status['ultimo_erro'] = dados.get('erro', 'Circuito aberto')
+        elif evento == 'map_reduce':
+            llm_status['map_reduce'] = dados
+        elif evento == 'stream_reiniciado' and job['status'] == 'analyzing':
+            # A tentativa anterior foi interrompida no meio: o relatório recomeça do zero
+            _substituir_relatorio(job, '')
+        job['last_updated'] = time.time()
+    return _ao_evento
+
+def _substituir_relatorio(job: Dict[str, Any], novo: str) -> None:
+    """
+    Troca o relatório do job pelo texto final. Se ele estende o que já foi publicado, só a
+    cauda é acrescentada (os `report_offset` dos clientes continuam valendo); senão o texto é
+    substituído e `report_revision` muda, avisando os clientes para relerem do início.
+    """
+    atual = job['data'].get('analysis_report') or ''
+    if novo.startswith(atual):
+        if len(novo) > len(atual):
+            job['data']['analysis_report'] = atual + novo[len(atual):]
+        return
+    job['data']['analysis_report'] = novo
+    job['data']['report_revision'] = (job['data'].get('report_revision') or 0) + 1
+
 def simulate_job_progress(job_id: str):
     """Simula o progresso automático de um job após aprovação"""
     try:
@@ -108,8 +316,8 @@ def simulate_job_progress(job_id: str):
         
         print(f"[{job_id}] 🚀 Iniciando workflow para {original_analysis_type}")
         
-        # Simular etapas do workflow
-        total_steps = len(workflow['steps']) + 2  # +2 para populating_data e committing_to_github
+        # Simular etapas do workflow (já incluem preenchimento e commit)
+        total_steps = len(workflow['steps'])
         progress_per_step = 75 / total_steps  # 75% restante dividido pelas etapas
         current_progress = 25  # Começa em 25% (após aprovação)
         
@@ -117,6 +325,7 @@ def simulate_job_progress(job_id: str):
         for i, step in enumerate(workflow['steps']):
             if job_id not in jobs:  # Job pode ter sido removido
                 return
+            verificar_cancelamento()
                 
             # Atualizar status do job
             job_info['status'] = step['status']
@@ -130,25 +339,6 @@ def simulate_job_progress(job_id: str):
             # Simular tempo de processamento
             time.sleep(step.get('duration', 2))
         
-        # Etapas finais
-        final_steps = [
-            {"status": "populating_data", "message": "Preparando dados para commit...", "duration": 2},
-            {"status": "committing_to_github", "message": "Enviando mudanças para GitHub...", "duration": 3}
-        ]
-        
-        for step in final_steps:
-            if job_id not in jobs:
-                return
-                
-            job_info['status'] = step['status']
-            job_info['message'] = step['message']
-            current_progress += progress_per_step
-            job_info['progress'] = int(current_progress)
-            job_info['last_updated'] = time.time()
-            
-            print(f"[{job_id}] {step['status']}: {step['message']} ({int(current_progress)}%)")
-            time.sleep(step['duration'])
-        
         # Finalização
         if job_id in jobs:
             job_info['status'] = 'completed'
@@ -165,6 +355,208 @@ def simulate_job_progress(job_id: str):
             jobs[job_id]['message'] = f'Erro durante processamento: {str(e)}'
             jobs[job_id]['last_updated'] = time.time()
 
+# Estruturas usadas quando a resposta do LLM não é um JSON válido, por formato de saída da etapa
+FALLBACK_POR_FORMATO = {
+    "mudancas": {
+        "resumo_geral": "Refatoração automática aplicada",
+        "conjunto_de_mudancas": [
+            {
+                "caminho_do_arquivo": "index.js",
+                "status": "MODIFICADO",
+                "conteudo": "// Código refatorado automaticamente\nconsole.log('Hello World - Refatorado');",
+                "justificativa": "Refatoração automática aplicada devido a erro no parsing JSON"
+            }
+        ]
+    },
+    "agrupamento": {
+        "resumo_geral": "Agrupamento automático realizado",
+        "grupo_refatoracao": {
+            "resumo_do_pr": "Refatoração Automática",
+            "descricao_do_pr": "Aplicação de melhorias no código",
+            "conjunto_de_mudancas": [
+                {
+                    "caminho_do_arquivo": "index.js",
+                    "status": "MODIFICADO",
+                    "justificativa": "Melhoria de código automática"
+                }
+            ]
+        }
+    }
+}
+
+def _etapa_agente(job_id: str, formato_saida: Optional[str] = None, **agent_params):
+    """Etapa de LLM: chama agente_revisor.main e devolve o resultado já convertido de JSON"""
+    agent_params['ao_evento'] = criar_observador_llm(job_id)
+    agent_response = agente_revisor.main(**agent_params)
+    
+    # agente_revisor.main() retorna {"tipo_analise": X, "resultado": Y}, com "resultado" em texto
+    resultado_bruto = agent_response['resultado']
+    if not isinstance(resultado_bruto, str):
+        return resultado_bruto
+    # Erros da análise voltam como texto: falha da etapa (o motor tenta de novo)
+    if resultado_bruto.startswith('Erro durante a análise'):
+        raise RuntimeError(resultado_bruto)
+    
+    # Tentar extrair JSON da string (pode vir com ```json``` ou não)
+    json_string = resultado_bruto.replace("```json", '').replace("```", '').strip()
+    try:
+        resultado = json.loads(json_string)
+        print(f"[{job_id}] ✅ JSON parseado com sucesso")
+        return resultado
+    except json.JSONDecodeError as e:
+        print(f"[{job_id}] ❌ ERRO JSON: {e}")
+        if formato_saida not in FALLBACK_POR_FORMATO:
+            raise
+        print(f"[{job_id}] 📝 Criando estrutura de fallback")
+        return copy.deepcopy(FALLBACK_POR_FORMATO[formato_saida])
+
+def _etapa_agrupamento(job_id: str, mudancas, **agent_params):
+    """
+    Etapa de agrupamento: o modelo recebe só o manifesto das mudanças (caminho, status,
+    justificativa, tamanho). O conteúdo fica em 'resultado_mudancas' e volta no preenchimento.
+    """
+    return _etapa_agente(job_id, codigo=preenchimento.montar_manifesto(mudancas), **agent_params)
+
+def formatar_grupos(dados_preenchidos) -> Dict[str, Any]:
+    """Converte a saída do preenchimento no formato esperado pelo commit ({'resumo_geral', 'grupos'})"""
+    # ✅ CORREÇÃO: Verificar se dados_preenchidos é dict antes de processar
+    if isinstance(dados_preenchidos, str):
+        # Se for string, tentar converter para JSON
+        try:
+            dados_preenchidos = json.loads(dados_preenchidos)
+        except json.JSONDecodeError:
+            print("⚠️ Não foi possível converter dados_preenchidos para JSON")
+            dados_preenchidos = {"resumo_geral": "Erro na conversão de dados"}
+    
+    dados_finais_formatados = {
+        "resumo_geral": dados_preenchidos.get("resumo_geral", "") if isinstance(dados_preenchidos, dict) else "",
+        "grupos": []
+    }
+    
+    if isinstance(dados_preenchidos, dict):
+        for nome_grupo, detalhes_pr in dados_preenchidos.items():
+            if nome_grupo == "resumo_geral":
+                continue
+                
+            # ✅ CORREÇÃO: Verificar se detalhes_pr é dict antes de usar .get()
+            if isinstance(detalhes_pr, dict):
+                dados_finais_formatados["grupos"].append({
+                    "branch_sugerida": nome_grupo,
+                    "titulo_pr": detalhes_pr.get("resumo_do_pr", ""),
+                    "resumo_do_pr": detalhes_pr.get("descricao_do_pr", ""),
+                    "conjunto_de_mudancas": detalhes_pr.get("conjunto_de_mudancas", [])
+                })
+            else:
+                # Se detalhes_pr não é dict, criar estrutura básica
+                dados_finais_formatados["grupos"].append({
+                    "branch_sugerida": nome_grupo,
+                    "titulo_pr": f"Mudanças em {nome_grupo}",
+                    "resumo_do_pr": str(detalhes_pr) if detalhes_pr else "",
+                    "conjunto_de_mudancas": []
+                })
+    
+    if not dados_finais_formatados.get("grupos"):
+        print("⚠️ Nenhum grupo foi criado, criando grupo padrão")
+        dados_finais_formatados["grupos"].append({
+            "branch_sugerida": "refactoring",
+            "titulo_pr": "Refatoração automática",
+            "resumo_do_pr": "Aplicação de melhorias no código baseadas na análise",
+            "conjunto_de_mudancas": []
+        })
+    return dados_finais_formatados
+
+def _etapa_preenchimento(json_agrupado, json_inicial) -> Dict[str, Any]:
+    dados_preenchidos = preenchimento.main(json_agrupado=json_agrupado, json_inicial=json_inicial)
+    return formatar_grupos(dados_preenchidos)
+
+def _etapa_snapshot(job_id: str, repositorio: str, nome_branch: Optional[str], tipo_analise: str) -> Dict[str, str]:
+    """
+    Lê o repositório uma vez e fixa o conteúdo no checkpoint: a refatoração analisa
+    este snapshot e a prévia (dry-run) compara as mudanças com ele.
+    """
+    from tools import github_connector
+
+    # A mesma branch em que o commit vai se apoiar (ver _etapa_validar_github)
+    branch_base = _resolver_branch_base(github_connector.connection(repositorio=repositorio), nome_branch)
+    arquivos = agente_revisor.code_from_repo(repositorio=repositorio, tipo_analise=tipo_analise, nome_branch=branch_base)
+    print(f"[{job_id}] 📸 Snapshot da base ({branch_base}): {len(arquivos or {})} arquivo(s)")
+    return arquivos or {}
+
+def _etapa_dry_run(job_id: str, dados_agrupados: Dict[str, Any], snapshot: Dict[str, str]) -> Dict[str, Any]:
+    """Diffs de cada arquivo proposto contra o snapshot e estatísticas por grupo (nada é enviado ao GitHub)"""
+    relatorio = dry_run_diff.gerar_relatorio_diff(dados_agrupados, snapshot)
+    job = jobs.get(job_id)
+    if job is not None:
+        job['data']['dry_run_diff'] = relatorio
+    totais = relatorio['totais']
+    print(f"[{job_id}] 🔍 Prévia: {totais['arquivos']} arquivo(s) em {totais['grupos']} grupo(s), "
+          f"+{totais['adicionadas']} -{totais['removidas']} ({relatorio['duracao_ms']} ms)")
+    return relatorio
+
+def _etapa_validar_github(job_id: str, repositorio: str, nome_branch: Optional[str]) -> str:
+    """Confere o acesso ao repositório e devolve a branch base que existe (a pedida, 'master' ou 'main')"""
+    from tools import github_connector
+    
+    print(f"[{job_id}] 📋 Testando conexão com {repositorio}...")
+    try:
+        repo = github_connector.connection(repositorio=repositorio)
+    except Exception as github_error:
+        error_msg = str(github_error)
+        if "404" in error_msg:
+            raise RuntimeError(f"Repositório {repositorio} não encontrado ou sem acesso")
+        if "403" in error_msg:
+            raise RuntimeError("Token do GitHub sem permissões")
+        raise
+    print(f"[{job_id}] ✅ Repositório acessível: {repo.full_name}")
+    
+    branch_base = _resolver_branch_base(repo, nome_branch)
+    print(f"[{job_id}] 📋 Usando branch: {branch_base}")
+    return branch_base
+
+def _resolver_branch_base(repo, nome_branch: Optional[str]) -> str:
+    """Branch base que existe: a pedida, 'master' ou 'main' (snapshot e commit usam a mesma)"""
+    for candidata in dict.fromkeys([nome_branch or 'main', 'master', 'main']):
+        verificar_cancelamento()
+        try:
+            repo.get_git_ref(f"heads/{candidata}")
+            return candidata
+        except Exception as branch_error:
+            if "404" not in str(branch_error):
+                raise
+    raise RuntimeError(f"Nenhuma branch base encontrada ({nome_branch or 'main'}, master ou main)")
+
+def _etapa_commit(job_id: str, repositorio: str, dados_agrupados: Dict[str, Any], base_branch: str,
+                  independentes: bool = False) -> Dict[str, Any]:
+    print(f"[{job_id}] 🚀 Iniciando commit para GitHub (base: {base_branch}, {'independentes' if independentes else 'empilhadas'})...")
+    motor = commit_clone_local if MOTOR_COMMIT == 'clone_local' else commit_multiplas_branchs
+    # O diário fica com os checkpoints do job: retomar o job refaz só as operações que faltaram
+    diario = DiarioCommits(checkpoints.caminho_arquivo(job_id, ARQUIVO_DIARIO))
+    resumo = motor.processar_e_subir_mudancas_agrupadas(
+        nome_repo=repositorio,
+        dados_agrupados=dados_agrupados,
+        base_branch=base_branch,
+        independentes=independentes,
+        diario=diario
+    ) or {}
+    # Contagens (criados/modificados/inalterados) ficam no resultado do job
+    job = jobs.get(job_id)
+    if job is not None:
+        job['data']['resultado_commit'] = resumo
+    print(f"[{job_id}] ✅ Commit realizado com sucesso!")
+    return resumo
+
+def funcoes_do_workflow(job_id: str) -> Dict[str, Any]:
+    """Funções que os 'agent_function' do WORKFLOW_REGISTRY referenciam, ligadas ao job"""
+    return {
+        "agente_revisor.main": lambda **kw: _etapa_agente(job_id, **kw),
+        "agrupamento": lambda **kw: _etapa_agrupamento(job_id, **kw),
+        "preenchimento.main": _etapa_preenchimento,
+        "validar_github": lambda **kw: _etapa_validar_github(job_id, **kw),
+        "snapshot_base": lambda **kw: _etapa_snapshot(job_id, **kw),
+        "dry_run_diff": lambda **kw: _etapa_dry_run(job_id, **kw),
+        "commit_multiplas_branchs": lambda **kw: _etapa_commit(job_id, **kw),
+    }
+
 def run_workflow_task_REAL(job_id: str):
     """Executa o workflow real com os agentes (quando disponíveis)"""
     if not AGENTS_AVAILABLE:
@@ -176,7 +568,8 @@ def run_workflow_task_REAL(job_id: str):
         print(f"[{job_id}] 🚀 Iniciando workflow REAL...")
         job_info = jobs[job_id]
         original_analysis_type = job_info['data']['original_analysis_type']
-        workflow = WORKFLOW_REGISTRY.get(original_analysis_type)
+        dry_run = bool(job_info['data'].get('dry_run'))
+        workflow = (WORKFLOWS_DRY_RUN if dry_run else WORKFLOWS).get(original_analysis_type)
         
         if not workflow:
             raise ValueError(f"Nenhum workflow definido para: {original_analysis_type}")
@@ -189,283 +582,261 @@ def run_workflow_task_REAL(job_id: str):
         print(f"[{job_id}]   - Tem relatório: {bool(job_info['data'].get('analysis_report'))}")
         print(f"[{job_id}]   - Tem instruções: {bool(job_info['data'].get('instrucoes_extras'))}")
         
-        resultado_refatoracao, resultado_agrupamento = None, None
-        previous_step_result = None
+        # Primeira etapa recebe o relatório aprovado combinado com as instruções extras
+        instrucoes_completas = job_info['data']['analysis_report']
+        instrucoes_usuario = job_info['data'].get('instrucoes_extras')
+        if instrucoes_usuario:
+            instrucoes_completas += f"\n\n--- INSTRUÇÕES ADICIONAIS DO USUÁRIO ---\n{instrucoes_usuario}"
         
-        # Executar cada step do workflow
-        for i, step in enumerate(workflow['steps']):
-            if job_id not in jobs:
-                return
-                
-            # ✅ CORREÇÃO: Usar 'status' ao invés de 'status_update'
-            job_info['status'] = step['status']
-            job_info['message'] = step['message']
-            job_info['last_updated'] = time.time()
-            
-            print(f"[{job_id}] ... Executando passo: {job_info['status']}")
-            
-            # Preparar parâmetros para o agente
-            agent_params = step['params'].copy()
-            
-            if i == 0:
-                # Primeira etapa: combinar relatório com instruções extras
-                relatorio_gerado = job_info['data']['analysis_report']
-                instrucoes_usuario = job_info['data'].get('instrucoes_extras')
-                
-                instrucoes_completas = relatorio_gerado
-                if instrucoes_usuario:
-                    instrucoes_completas += f"\n\n--- INSTRUÇÕES ADICIONAIS DO USUÁRIO ---\n{instrucoes_usuario}"
-                
-                agent_params.update({
-                    'repositorio': job_info['data']['repo_name'],
-                    'nome_branch': job_info['data']['branch_name'],
-                    'instrucoes_extras': instrucoes_completas
-                })
-            else:
-                # Etapas subsequentes: usar resultado anterior
-                agent_params['codigo'] = previous_step_result
-            
-            # Executar função do agente
-            if step['agent_function']:
-                agent_response = agente_revisor.main(**agent_params)
-                
-                # ✅ CORREÇÃO: agente_revisor.main() retorna {"tipo_analise": X, "resultado": Y}
-                # onde "resultado" é uma string, não um dicionário
-                resultado_bruto = agent_response['resultado']
-                
-            # Tentar extrair JSON da string (pode vir com ```json``` ou não)
-            if isinstance(resultado_bruto, str):
-                json_string = resultado_bruto.replace("```json", '').replace("```", '').strip()
-                try:
-                    previous_step_result = json.loads(json_string)
-                    print(f"[{job_id}] ✅ JSON parseado com sucesso")
-                    
-                    
-                
-                except json.JSONDecodeError as e:
-                    print(f"[{job_id}] ❌ ERRO JSON: {e}")
-                    print(f"[{job_id}] 📝 Criando estrutura de fallback")
-                    # CORREÇÃO: Criar estrutura válida baseada no step atual
-                    if i == 0:  # Primeiro step (refatoração)
-                        previous_step_result = {
-                            "resumo_geral": "Refatoração automática aplicada",
-                            "conjunto_de_mudancas": [
-                                {
-                                    "caminho_do_arquivo": "index.js",
-                                    "status": "MODIFICADO",
-                                    "conteudo": "// Código refatorado automaticamente\nconsole.log('Hello World - Refatorado');",
-                                    "justificativa": "Refatoração automática aplicada devido a erro no parsing JSON"
-                                }
-                            ]
-                        }
-                    else:  # Segundo step (agrupamento)
-                        previous_step_result = {
-                            "resumo_geral": "Agrupamento automático realizado",
-                            "grupo_refatoracao": {
-                                "resumo_do_pr": "Refatoração Automática",
-                                "descricao_do_pr": "Aplicação de melhorias no código",
-                                "conjunto_de_mudancas": [
-                                    {
-                                        "caminho_do_arquivo": "index.js",
-                                        "status": "MODIFICADO",
-                                        "justificativa": "Melhoria de código automática"
-                                    }
-                                ]
-                            }
-                        }
-
-
-
-            else:
-                previous_step_result = resultado_bruto
-                
-                if i == 0:
-                    resultado_refatoracao = previous_step_result
-                else:
-                    resultado_agrupamento = previous_step_result
-        
-        # Etapas finais de processamento
-        job_info['status'] = 'populating_data'
-        job_info['message'] = 'Preparando dados para commit...'
-        job_info['last_updated'] = time.time()
-        print(f"[{job_id}] ... Etapa de preenchimento...")
+        total_etapas = len(workflow.etapas)
+        concluidas = []
         
-
-        dados_preenchidos = preenchimento.main(json_agrupado=resultado_agrupamento, json_inicial=resultado_refatoracao)
-        
-        print(f"[{job_id}] ... Etapa de transformação...")
-        
-        # ✅ CORREÇÃO: Verificar se dados_preenchidos é dict antes de processar
-        if isinstance(dados_preenchidos, str):
-            # Se for string, tentar converter para JSON
-            try:
-                dados_preenchidos = json.loads(dados_preenchidos)
-            except json.JSONDecodeError:
-                print(f"[{job_id}] ⚠️ Não foi possível converter dados_preenchidos para JSON")
-                dados_preenchidos = {"resumo_geral": "Erro na conversão de dados"}
-        
-        dados_finais_formatados = {
-            "resumo_geral": dados_preenchidos.get("resumo_geral", "") if isinstance(dados_preenchidos, dict) else "",
-            "grupos": []
-        }
-        
-        if isinstance(dados_preenchidos, dict):
-            for nome_grupo, detalhes_pr in dados_preenchidos.items():
-                if nome_grupo == "resumo_geral":
-                    continue
-                    
-                # ✅ CORREÇÃO: Verificar se detalhes_pr é dict antes de usar .get()
-                if isinstance(detalhes_pr, dict):
-                    dados_finais_formatados["grupos"].append({
-                        "branch_sugerida": nome_grupo,
-                        "titulo_pr": detalhes_pr.get("resumo_do_pr", ""),
-                        "resumo_do_pr": detalhes_pr.get("descricao_do_pr", ""),
-                        "conjunto_de_mudancas": detalhes_pr.get("conjunto_de_mudancas", [])
-                    })
-                else:
-                    # Se detalhes_pr não é dict, criar estrutura básica
-                    dados_finais_formatados["grupos"].append({
-                        "branch_sugerida": nome_grupo,
-                        "titulo_pr": f"Mudanças em {nome_grupo}",
-                        "resumo_do_pr": str(detalhes_pr) if detalhes_pr else "",
-                        "conjunto_de_mudancas": []
-                    })
-        
-        if not dados_finais_formatados.get("grupos"):
-            print(f"[{job_id}] ⚠️ Nenhum grupo foi criado, criando grupo padrão")
-            dados_finais_formatados["grupos"].append({
-                "branch_sugerida": "refactoring",
-                "titulo_pr": "Refatoração automática",
-                "resumo_do_pr": "Aplicação de melhorias no código baseadas na análise",
-                "conjunto_de_mudancas": []
-            })
-
-        job_info['status'] = 'committing_to_github'
-        job_info['message'] = 'Enviando mudanças para GitHub...'
-        job_info['last_updated'] = time.time()
-        print(f"[{job_id}] ... Etapa de commit para o GitHub...")
-        
-        # ✅ USAR FUNÇÃO SEGURA PARA COMMIT
-        # Importar a função segura (você pode colocar este código diretamente aqui)
-        def safe_commit_to_github_inline():
-            try:
-                print(f"[{job_id}] 🔍 Validando acesso ao repositório {job_info['data']['repo_name']}...")
-                
-                # Importar dentro da função para evitar problemas de dependência
-                try:
-                    from tools import github_connector, commit_multiplas_branchs
-                except ImportError as e:
-                    print(f"[{job_id}] ❌ Módulos GitHub não disponíveis: {e}")
-                    return False
-                
-                # Validação rápida de acesso ao repositório
-                try:
-                    print(f"[{job_id}] 📋 Testando conexão com {job_info['data']['repo_name']}...")
-                    repo = github_connector.connection(repositorio=job_info['data']['repo_name'])
-                    
-                    # ✅ CORREÇÃO: repo já é o objeto Repository, não precisa de .get_repo()
-                    print(f"[{job_id}] ✅ Repositório acessível: {repo.full_name}")
-                    
-                    # Verificar se a branch existe
-                    branch_to_check = job_info['data']['branch_name'] or 'main'
-                    try:
-                        ref = repo.get_git_ref(f"heads/{branch_to_check}")
-                        print(f"[{job_id}] ✅ Branch '{branch_to_check}' encontrada")
-                    except Exception as branch_error:
-                        if "404" in str(branch_error):
-                            print(f"[{job_id}] ⚠️ Branch '{branch_to_check}' não encontrada, tentando 'master'...")
-                            try:
-                                ref = repo.get_git_ref("heads/master")
-                                print(f"[{job_id}] ✅ Branch 'master' encontrada")
-                            except Exception:
-                                print(f"[{job_id}] ❌ Nem 'main' nem 'master' encontradas")
-                                return False
-                        else:
-                            raise branch_error
-                            
-                except Exception as github_error:
-                    error_msg = str(github_error)
-                    print(f"[{job_id}] ❌ Erro GitHub: {error_msg}")
-                    
-                    if "404" in error_msg:
-                        print(f"[{job_id}] ❌ Repositório não encontrado ou sem acesso")
-                        return False
-                    elif "403" in error_msg:
-                        print(f"[{job_id}] ❌ Token do GitHub sem permissões")
-                        return False
-                    else:
-                        print(f"[{job_id}] ❌ Erro inesperado do GitHub")
-                        return False
-                
-                # Se chegou aqui, tentar o commit
-                print(f"[{job_id}] 🚀 Iniciando commit para GitHub...")
-                
-                # ✅ CORREÇÃO: Usar a branch correta detectada na validação
-                branch_to_use = job_info['data']['branch_name'] or 'main'
-                
-                # Verificar qual branch realmente existe
-                detected_branch = None
-                try:
-                    repo.get_git_ref(f"heads/{branch_to_use}")
-                    detected_branch = branch_to_use
-                    print(f"[{job_id}] 📋 Usando branch: {detected_branch}")
-                except Exception:
-                    try:
-                        repo.get_git_ref("heads/master")
-                        detected_branch = 'master'
-                        print(f"[{job_id}] 📋 Branch 'main' não encontrada, usando 'master'")
-                    except Exception:
-                        try:
-                            repo.get_git_ref("heads/main")
-                            detected_branch = 'main'
-                            print(f"[{job_id}] 📋 Usando branch padrão 'main'")
-                        except Exception:
-                            print(f"[{job_id}] ❌ Nenhuma branch padrão encontrada")
-                            return False
-                
-                # Criar uma cópia dos dados com a branch correta
-                dados_para_commit = dados_finais_formatados.copy()
-                
-                # Chamar commit com a branch detectada
-                commit_multiplas_branchs.processar_e_subir_mudancas_agrupadas(
-                    nome_repo=job_info['data']['repo_name'],
-                    dados_agrupados=dados_para_commit,
-                    base_branch=detected_branch  # ✅ Usar branch detectada
-                )
-                
-                print(f"[{job_id}] ✅ Commit realizado com sucesso!")
-                return True
-                
-            except Exception as commit_error:
-                error_msg = str(commit_error)
-                print(f"[{job_id}] ❌ Erro durante commit: {error_msg}")
-                return False
+        def _ao_iniciar(etapa, em_execucao):
+            job_info['status'] = etapa.nome
+            job_info['message'] = etapa.mensagem if len(em_execucao) == 1 else f"Executando em paralelo: {', '.join(em_execucao)}"
+            job_info['last_updated'] = time.time()
+            _persistir_job(job_id)
+            print(f"[{job_id}] ... Executando passo: {etapa.nome}")
         
-        # Tentar commit seguro
-        commit_success = safe_commit_to_github_inline()
+        def _ao_concluir(etapa, resultado, do_cache):
+            concluidas.append(etapa.nome)
+            job_info['progress'] = 25 + int(74 * len(concluidas) / total_etapas)
+            job_info['last_updated'] = time.time()
         
-        if commit_success:
-            job_info['message'] = 'Análise concluída e mudanças enviadas para GitHub!'
-        else:
-            job_info['message'] = 'Análise concluída. Commit não realizado devido a problemas de acesso ao GitHub.'
-            job_info['error_details'] = 'Verifique se o repositório existe e se o token GitHub tem permissões adequadas.'
+        motor = MotorWorkflow(workflow, funcoes_do_workflow(job_id))
+        motor.executar(
+            {
+                'repositorio': job_info['data']['repo_name'],
+                'nome_branch': job_info['data']['branch_name'],
+                'instrucoes_extras': instrucoes_completas,
+                'branches_independentes': bool(job_info['data'].get('independent_branches'))
+            },
+            job_id=job_id,
+            armazem=checkpoints,
+            ao_iniciar=_ao_iniciar,
+            ao_concluir=_ao_concluir
+        )
         
+        verificar_cancelamento()
         job_info['status'] = 'completed'
-        job_info['message'] = 'Processo concluído com sucesso!'
+        job_info['message'] = ('Prévia concluída (dry-run): nenhuma mudança foi enviada ao GitHub' if dry_run
+                               else 'Análise concluída e mudanças enviadas para GitHub!')
         job_info['progress'] = 100
         job_info['last_updated'] = time.time()
+        _persistir_job(job_id)
         print(f"[{job_id}] ✅ Processo concluído com sucesso!")
         
     except Exception as e:
         print(f"[{job_id}] ❌ ERRO: {e}")
-        import traceback
-        traceback.print_exc()
+        if not isinstance(e, EtapaFalhouError):
+            import traceback
+            traceback.print_exc()
         
         if job_id in jobs:
             jobs[job_id]['status'] = 'failed'
             jobs[job_id]['error_details'] = str(e)
             jobs[job_id]['message'] = f'Erro durante processamento: {str(e)}'
             jobs[job_id]['last_updated'] = time.time()
+            _persistir_job(job_id)
+
+# Jobs com workflow em execução neste processo (evita duas execuções do mesmo job)
+_workflows_ativos = set()
+_lock_workflows = threading.Lock()
+
+def executar_workflow(job_id: str):
+    """Executa o workflow do job, a menos que ele já esteja rodando (aprovação, retomada ou reinício)"""
+    with _lock_workflows:
+        if job_id in _workflows_ativos:
+            print(f"[{job_id}] ⚠️ Workflow já em execução, ignorando nova execução")
+            return
+        _workflows_ativos.add(job_id)
+    try:
+        executar_cancelavel(job_id, run_workflow_task_REAL, job_id)
+    finally:
+        with _lock_workflows:
+            _workflows_ativos.discard(job_id)
+
+def executar_cancelavel(job_id: str, funcao, *args):
+    """
+    Executa a tarefa de um job com um token de cancelamento na thread atual: o
+    cancelamento aborta as chamadas LLM em voo e interrompe a tarefa no próximo
+    ponto de verificação.
+    """
+    token = cancelamentos.criar(job_id)
+    try:
+        # O status é conferido depois de criar o token: um cancelamento anterior não passa despercebido
+        job = jobs.get(job_id)
+        if job is None or job['status'] == 'cancelled':
+            return
+        with contexto_cancelamento(token):
+            funcao(*args)
+    except JobCanceladoError as e:
+        print(f"[{job_id}] 🛑 Execução interrompida: {e}")
+    finally:
+        cancelamentos.remover(job_id, token)
+        if token.cancelado:
+            _marcar_cancelado(job_id, token.motivo)
+        if job_id not in jobs:
+            # Removido durante a execução: apaga o que a tarefa gravou depois da remoção
+            checkpoints.remover(job_id)
+
+def _marcar_cancelado(job_id: str, motivo: Optional[str] = None):
+    job = jobs.get(job_id)
+    if job is None:
+        return
+    job['status'] = 'cancelled'
+    job['message'] = motivo or 'Cancelado pelo usuário'
+    job['last_updated'] = time.time()
+    _persistir_job(job_id)
+
+def _persistir_job(job_id: str):
+    """Grava o retrato atual do job junto dos checkpoints (sobrevive a reinícios do servidor)"""
+    job = jobs.get(job_id)
+    if job is not None:
+        checkpoints.salvar_job(job_id, job.copy())
+
+def retomar_jobs_persistidos():
+    """
+    Recarrega os jobs gravados em disco e retoma, a partir da primeira etapa sem
+    checkpoint, os workflows que estavam em andamento quando o servidor parou.
+    """
+    retomados = 0
+    for job_id, dados in checkpoints.listar_jobs().items():
+        if job_id in jobs:
+            continue
+        jobs[job_id] = dados
+        if dados.get('status') in ESTADOS_TERMINAIS or dados.get('status') in ('pending_approval', 'analyzing'):
+            if dados.get('status') == 'analyzing':
+                # Relatório em streaming não tem checkpoint: o job volta como falho
+                jobs[job_id].update(status='failed', message='Servidor reiniciado durante a geração do relatório',
+                                    last_updated=time.time())
+            continue
+        jobs[job_id]['message'] = 'Retomando após reinício do servidor...'
+        jobs[job_id]['last_updated'] = time.time()
+        threading.Thread(target=executar_workflow, args=(job_id,), daemon=True).start()
+        retomados += 1
+    if retomados:
+        print(f"♻️ {retomados} workflow(s) retomado(s) após reinício")
+
+def _criar_job(payload: Union[StartAnalysisPayload, StartSuitePayload], report: str, status: str = 'pending_approval',
+               message: str = 'Aguardando aprovação do usuário') -> str:
+    """Registra um novo job de análise e retorna seu ID"""
+    job_id = str(uuid.uuid4())
+    jobs[job_id] = {
+        'status': status,
+        'message': message,
+        'progress': 25 if status == 'pending_approval' else 10,
+        'data': {
+            'repo_name': payload.repo_name,
+            'branch_name': payload.branch_name,
+            'original_analysis_type': payload.analysis_type,
+            'analysis_report': report,
+            'instrucoes_extras': payload.instrucoes_extras,
+            'independent_branches': getattr(payload, 'independent_branches', False),
+            'dry_run': getattr(payload, 'dry_run', False)
+        },
+        'created_at': time.time(),
+        'last_updated': time.time()
+    }
+    if status != 'analyzing':
+        # Relatório pronto: guardado comprimido, descomprimido só quando lido
+        comprimir_relatorio(jobs[job_id]['data'])
+    _persistir_job(job_id)
+    return job_id
+
+def run_streaming_analysis(job_id: str, payload: StartAnalysisPayload):
+    """Gera o relatório inicial em streaming, anexando cada trecho ao job assim que chega"""
+    job = jobs.get(job_id)
+    if not job:
+        return
+
+    def _ao_delta(texto: str):
+        job['data']['analysis_report'] += texto
+        job['last_updated'] = time.time()
+
+    try:
+        resposta = agente_revisor.main(
+            tipo_analise=payload.analysis_type,
+            repositorio=payload.repo_name,
+            nome_branch=payload.branch_name,
+            instrucoes_extras=payload.instrucoes_extras,
+            ao_evento=criar_observador_llm(job_id),
+            ao_delta=_ao_delta
+        )
+        report = resposta['resultado'] if isinstance(resposta, dict) and 'resultado' in resposta else str(resposta)
+        # agente_revisor.main devolve os erros como texto do relatório
+        falhou = report.startswith('Erro durante a análise')
+        # O texto final pode diferir do transmitido (ex.: espaços removidos, resposta vazia)
+        _substituir_relatorio(job, report)
+        job['status'] = 'failed' if falhou else 'pending_approval'
+        job['message'] = 'Falha ao gerar o relatório de análise' if falhou else 'Aguardando aprovação do usuário'
+        job['progress'] = 25
+        if falhou:
+            job['error_details'] = report
+        comprimir_relatorio(job['data'])
+        print(f"[{job_id}] ✅ Relatório em streaming concluído ({len(report)} caracteres)")
+    except Exception as e:
+        print(f"[{job_id}] ❌ Erro no relatório em streaming: {e}")
+        job['status'] = 'failed'
+        job['error_details'] = str(e)
+        job['message'] = f'Falha ao gerar o relatório de análise: {e}'
+    job['last_updated'] = time.time()
+    _persistir_job(job_id)
+
+def run_suite_analysis(job_id: str, payload: StartSuitePayload):
+    """
+    Executa a suíte de análises. Cada seção entra no job assim que sua análise termina;
+    o relatório combinado cresce só por acréscimo (ordem de conclusão), então
+    `report_offset` continua valendo para buscar apenas o trecho novo.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        return
+    tipos = list(dict.fromkeys(payload.analysis_types))
+    concluidas: List[str] = []
+
+    def _ao_secao(tipo: str, texto: str):
+        concluidas.append(tipo)
+        secao = f"## Análise: {tipo}\n\n{texto}"
+        job['data']['analysis_reports'] = {**(job['data'].get('analysis_reports') or {}), tipo: texto}
+        job['data']['analysis_report'] += ("# Relatório combinado\n\n" if len(concluidas) == 1 else "\n\n---\n\n") + secao
+        job['progress'] = 10 + int(85 * len(concluidas) / len(tipos))
+        job['message'] = f'{len(concluidas)}/{len(tipos)} análises concluídas'
+        job['last_updated'] = time.time()
+
+    try:
+        resposta = agente_revisor.executar_suite(
+            repositorio=payload.repo_name,
+            tipos_analise=tipos,
+            nome_branch=payload.branch_name,
+            instrucoes_extras=payload.instrucoes_extras or "",
+            ao_evento=criar_observador_llm(job_id),
+            ao_secao=_ao_secao
+        )
+        resultados = resposta['resultados']
+        # Seções que não passaram pelo callback (ex.: repositório sem código) entram ao final
+        ordem = concluidas + [tipo for tipo in tipos if tipo not in concluidas]
+        job['data']['analysis_reports'] = dict(resultados)
+        _substituir_relatorio(job, agente_revisor.montar_relatorio_suite(resultados, ordem))
+        falhas = [tipo for tipo, texto in resultados.items() if texto.startswith('Erro durante a análise')]
+        if len(falhas) == len(tipos):
+            job['status'] = 'failed'
+            job['message'] = 'Todas as análises da suíte falharam'
+            job['error_details'] = '\n'.join(resultados[tipo] for tipo in falhas)
+        else:
+            job['status'] = 'completed'
+            job['message'] = (f'Suíte concluída com {len(falhas)} análise(s) com erro: {", ".join(falhas)}'
+                              if falhas else 'Suíte de análises concluída')
+        job['progress'] = 100
+        comprimir_relatorio(job['data'])
+        print(f"[{job_id}] ✅ Suíte concluída ({len(tipos)} análises, {len(falhas)} com erro)")
+    except Exception as e:
+        print(f"[{job_id}] ❌ Erro na suíte de análises: {e}")
+        job['status'] = 'failed'
+        job['error_details'] = str(e)
+        job['message'] = f'Falha ao executar a suíte de análises: {e}'
+    job['last_updated'] = time.time()
+    _persistir_job(job_id)
 
 # --- ENDPOINTS DA API ---
 
@@ -479,11 +850,21 @@ async def root():
     }
 
 @app.post("/start-analysis", response_model=StartAnalysisResponse, tags=["Jobs"])
-def start_analysis(payload: StartAnalysisPayload):
-    """Inicia um novo job de análise de código e retorna um relatório para aprovação."""
+def start_analysis(payload: StartAnalysisPayload, background_tasks: BackgroundTasks):
+    """
+    Inicia um novo job de análise de código e retorna um relatório para aprovação.
+    Com `stream=true`, retorna o job_id imediatamente (status 'analyzing') e o relatório
+    vai sendo preenchido em /status/{job_id}, que aceita `report_offset` para buscar só o trecho novo.
+    """
     try:
         print(f"🚀 Iniciando análise: {payload.repo_name} ({payload.analysis_type})")
         
+        if payload.stream and AGENTS_AVAILABLE:
+            job_id = _criar_job(payload, report='', status='analyzing', message='Gerando relatório de análise...')
+            background_tasks.add_task(executar_cancelavel, job_id, run_streaming_analysis, job_id, payload)
+            print(f"✅ Job criado em modo streaming: {job_id}")
+            return StartAnalysisResponse(job_id=job_id, report='')
+        
         # Gerar relatório inicial
         if AGENTS_AVAILABLE:
             print(f"📡 Chamando agente_revisor.main() com parâmetros:")
@@ -536,21 +917,7 @@ Este é um relatório simulado para o repositório {payload.repo_name}.
             print("🎭 Usando relatório simulado (agentes não disponíveis)")
         
         # Criar job
-        job_id = str(uuid.uuid4())
-        jobs[job_id] = {
-            'status': 'pending_approval',
-            'message': 'Aguardando aprovação do usuário',
-            'progress': 25,
-            'data': {
-                'repo_name': payload.repo_name,
-                'branch_name': payload.branch_name,
-                'original_analysis_type': payload.analysis_type,
-                'analysis_report': report,
-                'instrucoes_extras': payload.instrucoes_extras
-            },
-            'created_at': time.time(),
-            'last_updated': time.time()
-        }
+        job_id = _criar_job(payload, report)
         
         print(f"✅ Job criado: {job_id}")
         print(f"📊 Relatório tem {len(report)} caracteres")
@@ -563,6 +930,25 @@ Este é um relatório simulado para o repositório {payload.repo_name}.
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Falha ao gerar o relatório de análise: {e}")
 
+@app.post("/start-analysis-suite", response_model=StartSuiteResponse, tags=["Jobs"])
+def start_analysis_suite(payload: StartSuitePayload, background_tasks: BackgroundTasks):
+    """
+    Inicia vários tipos de análise sobre o mesmo repositório: o código é lido uma vez
+    (união das extensões) e as análises rodam em paralelo. Retorna o job_id na hora; o
+    relatório combinado e as seções (`sections`) aparecem em /status/{job_id}.
+    O job termina como 'completed' (a suíte gera apenas relatórios, sem workflow).
+    """
+    if not AGENTS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Agentes não disponíveis para executar a suíte")
+    tipos = list(dict.fromkeys(payload.analysis_types))
+    print(f"🚀 Iniciando suíte de análises: {payload.repo_name} ({', '.join(tipos)})")
+    job_id = _criar_job(payload, report='', status='analyzing', message='Executando suíte de análises...')
+    jobs[job_id]['data']['analysis_types'] = tipos
+    jobs[job_id]['data']['analysis_reports'] = {}
+    background_tasks.add_task(executar_cancelavel, job_id, run_suite_analysis, job_id, payload)
+    print(f"✅ Job de suíte criado: {job_id}")
+    return StartSuiteResponse(job_id=job_id, analysis_types=tipos)
+
 @app.post("/update-job-status", tags=["Jobs"])
 def update_job_status(payload: UpdateJobPayload, background_tasks: BackgroundTasks):
     """Atualiza o status do job (aprovar/rejeitar)."""
@@ -579,13 +965,12 @@ def update_job_status(payload: UpdateJobPayload, background_tasks: BackgroundTas
     if payload.action == 'approve':
         job['status'] = 'workflow_started'
         job['message'] = 'Processamento iniciado'
+        job['approved_at'] = time.time()
         job['last_updated'] = time.time()
+        _persistir_job(payload.job_id)
         
-        # Escolher entre workflow real ou simulado
-        if AGENTS_AVAILABLE:
-            background_tasks.add_task(run_workflow_task_REAL, payload.job_id)
-        else:
-            background_tasks.add_task(simulate_job_progress, payload.job_id)
+        # Workflow real ou simulado (escolhido em run_workflow_task_REAL)
+        background_tasks.add_task(executar_workflow, payload.job_id)
         
         return {
             "job_id": payload.job_id,
@@ -597,6 +982,7 @@ def update_job_status(payload: UpdateJobPayload, background_tasks: BackgroundTas
         job['status'] = 'rejected'
         job['message'] = 'Processo encerrado pelo usuário'
         job['last_updated'] = time.time()
+        _persistir_job(payload.job_id)
         
         return {
             "job_id": payload.job_id,
@@ -604,13 +990,48 @@ def update_job_status(payload: UpdateJobPayload, background_tasks: BackgroundTas
             "message": "Processo encerrado a pedido do usuário."
         }
 
+def _etag_status(job_id: str, versao: int, report_offset: int, include_report: bool) -> str:
+    return f'W/"{job_id}-{versao}-{report_offset}-{int(include_report)}"'
+
 @app.get("/status/{job_id}", response_model=JobStatusResponse, tags=["Jobs"])
-def get_status(job_id: str = Path(..., title="O ID do Job a ser verificado")):
-    """Verifica o status de um job específico."""
+async def get_status(
+    response: Response,
+    job_id: str = Path(..., title="O ID do Job a ser verificado"),
+    report_offset: int = Query(0, ge=0, description="Devolve o relatório apenas a partir desta posição"),
+    include_report: bool = Query(True, description="false omite o relatório (apenas status/progresso)"),
+    wait: float = Query(0, ge=0, le=60, description="Segundos para aguardar uma mudança (long-poll)"),
+    since_version: Optional[int] = Query(None, description="Versão já conhecida pelo cliente (alternativa ao If-None-Match)"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Verifica o status de um job específico.
+
+    A resposta traz `version` e um ETag. Com `If-None-Match` (ou `since_version`) igual à
+    versão atual, responde 304 sem corpo; com `wait`, segura a requisição até o job mudar
+    ou o tempo acabar (long-poll).
+    """
     job = jobs.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job ID não encontrado")
     
+    def _nao_mudou(versao: int) -> bool:
+        if since_version is not None:
+            return since_version == versao
+        return if_none_match is not None and if_none_match == _etag_status(job_id, versao, report_offset, include_report)
+    
+    if wait and _nao_mudou(job.versao):
+        await jobs.aguardar_mudanca([job_id], {job_id: job.versao}, timeout=wait)
+        job = jobs.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job ID não encontrado")
+    
+    versao = job.versao
+    etag = _etag_status(job_id, versao, report_offset, include_report)
+    if _nao_mudou(versao):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    
     # ✅ CORREÇÃO: Incluir o relatório na resposta do status
     response_data = {
         "job_id": job_id,
@@ -618,46 +1039,293 @@ def get_status(job_id: str = Path(..., title="O ID do Job a ser verificado")):
         "message": job.get('message'),
         "progress": job.get('progress'),
         "error_details": job.get('error_details'),
-        "last_updated": job.get('last_updated')
+        "last_updated": job.get('last_updated'),
+        "version": versao
     }
     
     # Adicionar relatório se disponível
     if 'data' in job and 'analysis_report' in job['data']:
-        response_data["report"] = job['data']['analysis_report']
+        if include_report:
+            report = job['data']['analysis_report'] or ''
+            response_data["report"] = report[report_offset:] if report_offset else report
+            response_data["report_offset"] = min(report_offset, len(report))
+        # Relatórios descarregados para o disco informam o tamanho sem serem lidos
+        response_data["report_length"] = len(job['data'].obter_bruto('analysis_report') or '')
+        response_data["report_revision"] = job['data'].get('report_revision') or 0
+        if include_report and job['data'].get('analysis_reports'):
+            response_data["sections"] = job['data']['analysis_reports']
+    
+    if job.get('llm_status'):
+        response_data["llm_status"] = job['llm_status']
+    
+    if 'data' in job and job['data'].get('resultado_commit'):
+        response_data["commit_result"] = job['data']['resultado_commit']
+    
+    if 'data' in job and job['data'].get('dry_run_diff'):
+        relatorio_diff = job['data']['dry_run_diff']
+        response_data["dry_run_stats"] = {
+            **relatorio_diff['totais'],
+            "por_grupo": {grupo['branch']: grupo['estatisticas'] for grupo in relatorio_diff['grupos']}
+        }
     
     return response_data
 
+# Campos disponíveis na listagem de jobs; os pesados (relatório, instruções) só com `fields`
+CAMPOS_LISTAGEM = {
+    "job_id": lambda job_id, job: job_id,
+    "status": lambda job_id, job: job['status'],
+    "message": lambda job_id, job: job.get('message'),
+    "progress": lambda job_id, job: job.get('progress'),
+    "repo_name": lambda job_id, job: job['data'].get('repo_name'),
+    "analysis_type": lambda job_id, job: job['data'].get('original_analysis_type'),
+    "branch_name": lambda job_id, job: job['data'].get('branch_name'),
+    "created_at": lambda job_id, job: job.get('created_at'),
+    "last_updated": lambda job_id, job: job.get('last_updated'),
+    "version": lambda job_id, job: job.versao,
+    "report_length": lambda job_id, job: len(job['data'].obter_bruto('analysis_report') or ''),
+    "report": lambda job_id, job: job['data'].get('analysis_report'),
+    "instructions": lambda job_id, job: job['data'].get('instrucoes_extras'),
+}
+CAMPOS_LISTAGEM_PADRAO = [campo for campo in CAMPOS_LISTAGEM if campo not in ("report", "instructions")]
+
+def _lista_query(valor: Optional[str]) -> List[str]:
+    return [item.strip() for item in (valor or '').split(',') if item.strip()]
+
 @app.get("/jobs", tags=["Jobs"])
-def list_jobs():
-    """Lista todos os jobs."""
-    return {
-        "jobs": [
-            {
-                "job_id": job_id,
-                "status": job_data['status'],
-                "message": job_data.get('message'),
-                "progress": job_data.get('progress'),
-                "repo_name": job_data['data']['repo_name'],
-                "analysis_type": job_data['data']['original_analysis_type'],
-                "branch_name": job_data['data'].get('branch_name'),
-                "created_at": job_data.get('created_at'),
-                "last_updated": job_data.get('last_updated'),
-                "report": job_data['data'].get('analysis_report'),  # ✅ Incluir relatório
-                "instructions": job_data['data'].get('instrucoes_extras')  # ✅ Incluir instruções
-            }
-            for job_id, job_data in jobs.items()
-        ]
-    }
+def list_jobs(
+    status: Optional[str] = Query(None, description="Um ou mais status separados por vírgula"),
+    repo_name: Optional[str] = Query(None, description="Filtra pelo repositório"),
+    analysis_type: Optional[str] = Query(None, description="Um ou mais tipos de análise separados por vírgula"),
+    created_after: Optional[float] = Query(None, description="created_at mínimo (epoch, inclusivo)"),
+    created_before: Optional[float] = Query(None, description="created_at máximo (epoch, inclusivo)"),
+    sort: str = Query("created_at", pattern="^(created_at|last_updated)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por vírgula (report e instructions só sob pedido)")
+):
+    """
+    Lista jobs com paginação por cursor, filtros e projeção de campos.
+
+    Os filtros e a ordenação usam os índices do JobStore, então o custo depende do
+    tamanho da página e não do número de jobs em memória.
+    """
+    campos = _lista_query(fields) or CAMPOS_LISTAGEM_PADRAO
+    desconhecidos = [campo for campo in campos if campo not in CAMPOS_LISTAGEM]
+    if desconhecidos:
+        raise HTTPException(status_code=400, detail=f"Campos desconhecidos: {', '.join(desconhecidos)}. "
+                                                    f"Disponíveis: {', '.join(CAMPOS_LISTAGEM)}")
+
+    filtros = {}
+    if status:
+        filtros['status'] = _lista_query(status)
+    if repo_name:
+        filtros['repo_name'] = [repo_name]
+    if analysis_type:
+        filtros['analysis_type'] = _lista_query(analysis_type)
+
+    try:
+        job_ids, proximo_cursor = jobs.consultar(
+            filtros=filtros, ordenar_por=sort, decrescente=(order == "desc"), limite=limit,
+            cursor=cursor, desde=created_after, ate=created_before
+        )
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    itens = []
+    for job_id in job_ids:
+        job = jobs.get(job_id)
+        if job is None:
+            continue  # Removido entre a consulta e a leitura
+        itens.append({campo: CAMPOS_LISTAGEM[campo](job_id, job) for campo in campos})
+
+    return {"jobs": itens, "next_cursor": proximo_cursor}
+
+def _evento_sse(evento: str, dados: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    linhas = [f"event: {evento}"]
+    if event_id is not None:
+        linhas.append(f"id: {event_id}")
+    linhas.append(f"data: {json.dumps(dados, ensure_ascii=False)}")
+    return "\n".join(linhas) + "\n\n"
+
+def _diferenca_do_job(job_id: str, job: Dict[str, Any], enviado: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Monta o evento com o que mudou desde o último envio e atualiza `enviado`"""
+    dados: Dict[str, Any] = {"job_id": job_id}
+    for campo in ("status", "message", "progress", "error_details", "llm_status"):
+        valor = job.get(campo)
+        if valor != enviado.get(campo):
+            dados[campo] = valor
+            enviado[campo] = valor.copy() if isinstance(valor, dict) else valor
+
+    report = (job.get('data') or {}).get('analysis_report') or ''
+    revisao = (job.get('data') or {}).get('report_revision') or 0
+    offset = enviado.get('report_length', 0)
+    if revisao != enviado.get('report_revision', 0) or len(report) < offset \
+            or not report.startswith(enviado.get('report_prefixo', '')):
+        # Relatório reiniciado ou substituído: reenvia inteiro
+        dados["report_reset"] = True
+        dados["report_revision"] = revisao
+        enviado['report_revision'] = revisao
+        offset = 0
+    if len(report) > offset or dados.get("report_reset"):
+        dados["report_delta"] = report[offset:]
+        dados["report_offset"] = offset
+        dados["report_length"] = len(report)
+        enviado['report_length'] = len(report)
+        enviado['report_prefixo'] = report[:64]
+
+    return dados if len(dados) > 1 else None
+
+async def _gerar_eventos_jobs(request: Request, job_ids: List[str]):
+    """Gera eventos SSE para os jobs indicados até todos terminarem ou o cliente desconectar"""
+    enviados: Dict[str, Dict[str, Any]] = {job_id: {} for job_id in job_ids}
+    ativos = list(job_ids)
+
+    while ativos:
+        # Versões lidas antes do estado: qualquer escrita posterior acorda a espera abaixo
+        versoes_vistas = jobs.versoes(ativos)
+        for job_id in list(ativos):
+            job = jobs.get(job_id)
+            if job is None:
+                yield _evento_sse("deleted", {"job_id": job_id})
+                ativos.remove(job_id)
+                continue
+            dados = _diferenca_do_job(job_id, job, enviados[job_id])
+            if dados:
+                yield _evento_sse("update", dados, event_id=f"{job_id}:{versoes_vistas[job_id]}")
+            if job.get('status') in ESTADOS_TERMINAIS:
+                yield _evento_sse("end", {"job_id": job_id, "status": job['status']})
+                ativos.remove(job_id)
+
+        if not ativos or await request.is_disconnected():
+            break
+
+        mudou = await jobs.aguardar_mudanca(
+            ativos, {job_id: versoes_vistas[job_id] for job_id in ativos}, timeout=SSE_KEEPALIVE
+        )
+        if not mudou:
+            yield ": keep-alive\n\n"
+        else:
+            # Agrupa rajadas de mudanças (ex.: trechos de streaming) em um único evento
+            await asyncio.sleep(SSE_INTERVALO_MINIMO)
+
+def _resposta_sse(request: Request, job_ids: List[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _gerar_eventos_jobs(request, job_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs/events", tags=["Jobs"])
+async def jobs_events(request: Request, job_ids: str = Query(..., description="IDs separados por vírgula")):
+    """Server-Sent Events multiplexado: acompanha vários jobs em uma única conexão."""
+    ids = [job_id.strip() for job_id in job_ids.split(",") if job_id.strip()]
+    if not ids:
+        raise HTTPException(status_code=400, detail="Informe ao menos um job_id")
+    return _resposta_sse(request, ids)
+
+@app.get("/jobs/{job_id}/events", tags=["Jobs"])
+async def job_events(request: Request, job_id: str):
+    """
+    Server-Sent Events de um job: envia status, progresso, mensagem e trechos novos do
+    relatório sempre que mudam, no lugar de polling em /status.
+    """
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job ID não encontrado")
+    return _resposta_sse(request, [job_id])
+
+@app.get("/jobs/{job_id}/diff", tags=["Jobs"])
+def get_job_diff(job_id: str, formato: Literal["json", "patch"] = Query("json", description="'patch' devolve um único texto de diff")):
+    """Prévia (dry-run) das mudanças do job: diffs unificados contra o snapshot da base e estatísticas por grupo"""
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job ID não encontrado")
+    relatorio_diff = job['data'].get('dry_run_diff')
+    if not relatorio_diff:
+        raise HTTPException(status_code=404, detail="Prévia ainda não gerada para este job")
+    if formato == "patch":
+        return Response(content=dry_run_diff.relatorio_como_patch(relatorio_diff), media_type="text/x-diff")
+    return relatorio_diff
+
+@app.post("/jobs/{job_id}/cancel", tags=["Jobs"])
+def cancel_job(job_id: str):
+    """
+    Cancela um job: a execução em andamento (se houver) é sinalizada, as chamadas LLM em
+    voo são abortadas e o job termina no estado 'cancelled'.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job ID não encontrado")
+    if job['status'] in ESTADOS_TERMINAIS:
+        raise HTTPException(status_code=409, detail=f"O job já terminou. Status atual: {job['status']}")
+    
+    # Primeiro o status, depois o sinal (ver executar_cancelavel)
+    _marcar_cancelado(job_id)
+    em_execucao = cancelamentos.cancelar(job_id)
+    return {"job_id": job_id, "status": "cancelled", "execucao_interrompida": em_execucao}
 
 @app.delete("/jobs/{job_id}", tags=["Jobs"])  
 def delete_job(job_id: str):
-    """Remove um job específico."""
+    """Remove um job específico (cancelando a execução dele, se ainda estiver rodando)."""
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job ID não encontrado")
     
+    # Se ainda estiver rodando, a execução apaga de novo os checkpoints ao terminar
+    cancelamentos.cancelar(job_id, "Job removido")
     del jobs[job_id]
+    checkpoints.remover(job_id)
     return {"message": f"Job {job_id} removido com sucesso"}
 
+@app.post("/jobs/{job_id}/resume", tags=["Jobs"])
+def resume_job(job_id: str, background_tasks: BackgroundTasks):
+    """
+    Reexecuta o workflow de um job aprovado que falhou, a partir da primeira etapa
+    sem checkpoint (etapas concluídas não chamam o LLM de novo).
+    """
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job ID não encontrado")
+    if not job.get('approved_at'):
+        raise HTTPException(status_code=400, detail="Só jobs aprovados têm workflow para retomar")
+    with _lock_workflows:
+        em_execucao = job_id in _workflows_ativos
+    if em_execucao:
+        raise HTTPException(status_code=409, detail="O workflow deste job já está em execução")
+    if job['status'] == 'completed':
+        raise HTTPException(status_code=400, detail="O job já foi concluído")
+    
+    etapas = checkpoints.etapas_concluidas(job_id)
+    job['status'] = 'workflow_started'
+    job['message'] = f'Retomando workflow ({len(etapas)} etapa(s) já concluída(s))'
+    job['error_details'] = None
+    job['last_updated'] = time.time()
+    _persistir_job(job_id)
+    background_tasks.add_task(executar_workflow, job_id)
+    return {"job_id": job_id, "status": "workflow_started", "etapas_concluidas": etapas}
+
+@app.post("/jobs/{job_id}/commit", tags=["Jobs"])
+def commit_dry_run_job(job_id: str, background_tasks: BackgroundTasks):
+    """
+    Envia ao GitHub as mudanças de um job concluído em dry-run. As etapas já feitas
+    (snapshot, refatoração, agrupamento, prévia) vêm dos checkpoints; só o commit roda.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job ID não encontrado")
+    if not job['data'].get('dry_run'):
+        raise HTTPException(status_code=400, detail="O job não está em modo dry-run")
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=400, detail="A prévia deste job ainda não foi concluída")
+    
+    job['data']['dry_run'] = False
+    job['status'] = 'workflow_started'
+    job['message'] = 'Enviando as mudanças da prévia para o GitHub...'
+    job['progress'] = 25
+    job['last_updated'] = time.time()
+    _persistir_job(job_id)
+    background_tasks.add_task(executar_workflow, job_id)
+    return {"job_id": job_id, "status": "workflow_started"}
+
 # Health check
 @app.get("/health")
 async def health_check():
@@ -668,6 +1336,17 @@ async def health_check():
         "active_jobs": len(jobs)
     }
 
+@app.get("/metrics", tags=["Monitoramento"])
+async def metrics():
+    """Métricas do gateway LLM (chamadas em voo, retries, limites de taxa, circuit breaker) e da tabela de jobs."""
+    if not AGENTS_AVAILABLE:
+        return {"agents_available": False, "jobs": faxineiro_jobs.metricas()}
+    return {
+        "agents_available": True,
+        "llm": obter_gateway().metricas(),
+        "jobs": faxineiro_jobs.metricas()
+    }
+
 @app.get("/test-github/{repo_name}")
 async def test_github_access(repo_name: str, branch_name: str = "main"):
     """Testa o acesso a um repositório GitHub específico."""
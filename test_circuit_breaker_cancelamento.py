@@ -0,0 +1,55 @@
+# test_circuit_breaker_cancelamento.py - Verificação manual: cancelar a chamada de teste do circuito meio aberto
+# não pode deixar o circuit breaker bloqueado. Não chama a OpenAI (a tentativa é simulada no gateway).
+# Uso: python test_circuit_breaker_cancelamento.py
+import time
+import asyncio
+import threading
+
+from tools.llm_gateway import LLMGateway
+from tools.resiliencia import CircuitBreaker, CircuitoAbertoError
+from tools.cancelamento import TokenCancelamento, contexto_cancelamento, JobCanceladoError
+
+
+def main():
+    gateway = LLMGateway(api_key="sk-teste")
+
+    async def tentativa_lenta(model_name, mensagens, ao_delta=None, **kwargs):
+        await asyncio.sleep(30)
+
+    async def tentativa_rapida(model_name, mensagens, ao_delta=None, **kwargs):
+        return "ok"
+
+    # Circuito aberto há mais que o tempo de recuperação: a próxima chamada é a de teste
+    circuito = gateway._circuito
+    circuito.estado = CircuitBreaker.ABERTO
+    circuito.aberto_em = time.monotonic() - circuito.tempo_recuperacao - 1
+
+    print("🧪 1. Chamada de teste (meio aberto) cancelada no meio...")
+    gateway._chat_uma_tentativa = tentativa_lenta
+    token = TokenCancelamento("job-teste")
+    threading.Timer(0.3, token.cancelar).start()
+    try:
+        with contexto_cancelamento(token):
+            gateway.chat_sync("gpt-4.1", [{"role": "user", "content": "oi"}])
+        print("❌ A chamada deveria ter sido cancelada")
+        return False
+    except JobCanceladoError:
+        print(f"✅ Cancelada; circuito: {circuito.resumo()}")
+
+    print("🧪 2. Próxima chamada precisa passar como nova chamada de teste...")
+    gateway._chat_uma_tentativa = tentativa_rapida
+    try:
+        resposta = gateway.chat_sync("gpt-4.1", [{"role": "user", "content": "oi"}])
+    except CircuitoAbertoError as e:
+        print(f"❌ Circuito preso após o cancelamento: {e}")
+        return False
+    finally:
+        gateway.fechar()
+
+    ok = resposta == "ok" and circuito.estado == CircuitBreaker.FECHADO
+    print(f"{'✅' if ok else '❌'} Resposta: {resposta!r}; circuito: {circuito.resumo()}")
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -6,7 +6,7 @@ import time
 from dotenv import load_dotenv
 from github import Github
 from agents import agente_revisor
-from tools import preenchimento, commit_multiplas_branchs
+from tools import preenchimento, commit_multiplas_branchs, dry_run_diff
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -140,9 +140,10 @@ class WorkflowTester:
         try:
             print("📦 Executando agrupamento de commits...")
             
+            # Só o manifesto (sem o conteúdo dos arquivos) vai para o agrupamento
             resultado = agente_revisor.main(
                 tipo_analise="agrupamento_design",
-                codigo=json.dumps(refactoring_result),
+                codigo=json.dumps(preenchimento.montar_manifesto(refactoring_result)),
                 instrucoes_extras="Criar agrupamentos simples para teste"
             )
             
@@ -200,6 +201,20 @@ class WorkflowTester:
                 
                 print(f"📈 Total de mudanças preparadas: {total_changes}")
                 
+                # Prévia real: diffs contra o conteúdo atual do repositório, sem escrever nada
+                snapshot = agente_revisor.code_from_repo(self.test_repo.full_name, "refatoracao") or {}
+                grupos = {"grupos": [
+                    {"branch_sugerida": key, "titulo_pr": value.get("resumo_do_pr", ""),
+                     "conjunto_de_mudancas": value.get("conjunto_de_mudancas", [])}
+                    for key, value in dados_preenchidos.items()
+                    if key != "resumo_geral" and isinstance(value, dict)
+                ]}
+                relatorio_diff = dry_run_diff.gerar_relatorio_diff(grupos, snapshot)
+                totais = relatorio_diff["totais"]
+                print(f"🔍 Prévia: {totais['criados']} criado(s), {totais['modificados']} modificado(s), "
+                      f"{totais['inalterados']} inalterado(s), +{totais['adicionadas']} -{totais['removidas']} "
+                      f"({relatorio_diff['duracao_ms']} ms)")
+                
                 return dados_preenchidos
             else:
                 print(f"⚠️ Formato inesperado dos dados: {type(dados_preenchidos)}")
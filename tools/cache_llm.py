@@ -0,0 +1,82 @@
+# tools/cache_llm.py - CACHE DE RESULTADOS DE CHAMADAS LLM
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def gerar_chave(*partes: Any) -> str:
+    """Gera uma chave estável (sha256) a partir das partes que determinam a resposta"""
+    bruto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(bruto.encode('utf-8')).hexdigest()
+
+
+class CacheResultados:
+    """
+    Cache LRU em memória com persistência opcional em disco.
+
+    Com `diretorio` definido (variável LLM_CACHE_DIR), cada resultado também é
+    gravado em `<diretorio>/<chave>.json` e sobrevive a reinícios do servidor.
+    """
+
+    def __init__(self, max_itens: int = 1000, diretorio: Optional[str] = None):
+        self.max_itens = max_itens
+        self.diretorio = diretorio
+        self._itens: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def obter(self, chave: str) -> Optional[str]:
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+
+        if self.diretorio and os.path.exists(self._caminho(chave)):
+            try:
+                with open(self._caminho(chave), 'r', encoding='utf-8') as f:
+                    valor = json.load(f)['valor']
+                self._guardar_em_memoria(chave, valor)
+                with self._lock:
+                    self.acertos += 1
+                return valor
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Entrada de cache ilegível ({chave[:12]}): {e}")
+
+        with self._lock:
+            self.falhas += 1
+        return None
+
+    def _guardar_em_memoria(self, chave: str, valor: str) -> None:
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def guardar(self, chave: str, valor: str) -> None:
+        self._guardar_em_memoria(chave, valor)
+        if self.diretorio:
+            try:
+                caminho_tmp = self._caminho(chave) + '.tmp'
+                with open(caminho_tmp, 'w', encoding='utf-8') as f:
+                    json.dump({'valor': valor}, f, ensure_ascii=False)
+                os.replace(caminho_tmp, self._caminho(chave))
+            except OSError as e:
+                print(f"⚠️ Não foi possível gravar o cache em disco: {e}")
+
+
+# Cache compartilhado dos resultados parciais (map-reduce)
+cache_resultados = CacheResultados(
+    max_itens=int(os.getenv('LLM_CACHE_MAX_ITENS', 1000)),
+    diretorio=os.getenv('LLM_CACHE_DIR') or None
+)
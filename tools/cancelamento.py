@@ -0,0 +1,123 @@
+# tools/cancelamento.py - CANCELAMENTO COOPERATIVO DE JOBS EM EXECUÇÃO
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class JobCanceladoError(BaseException):
+    """
+    Levantada dentro de um job cancelado. Herda de BaseException (como asyncio.CancelledError)
+    para atravessar os `except Exception` dos agentes e do commit sem virar "falha".
+    """
+
+
+class TokenCancelamento:
+    """Sinal de cancelamento de um job, compartilhado entre a thread do workflow e o gateway LLM"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.motivo: Optional[str] = None
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelado(self) -> bool:
+        return self._evento.is_set()
+
+    def cancelar(self, motivo: str = "Cancelado pelo usuário") -> None:
+        with self._lock:
+            if self._evento.is_set():
+                return
+            self.motivo = motivo
+            self._evento.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Erro ao abortar operação do job {self.job_id}: {e}")
+
+    def ao_cancelar(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Registra uma ação de aborto (ex.: cancelar a chamada LLM em voo). Se o job já foi
+        cancelado, executa na hora. Retorna a função que desfaz o registro.
+        """
+        with self._lock:
+            if not self._evento.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remover_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remover_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def verificar(self) -> None:
+        if self._evento.is_set():
+            raise JobCanceladoError(self.motivo or "Job cancelado")
+
+
+# Token do job que a thread (ou tarefa) atual está executando
+_token_atual: contextvars.ContextVar[Optional[TokenCancelamento]] = contextvars.ContextVar(
+    'token_cancelamento', default=None
+)
+
+
+def token_atual() -> Optional[TokenCancelamento]:
+    return _token_atual.get()
+
+
+def verificar_cancelamento() -> None:
+    """Ponto de verificação: levanta JobCanceladoError se o job em execução foi cancelado"""
+    token = _token_atual.get()
+    if token is not None:
+        token.verificar()
+
+
+@contextmanager
+def contexto_cancelamento(token: TokenCancelamento):
+    """Associa o token ao código executado dentro do bloco (na thread atual)"""
+    marcador = _token_atual.set(token)
+    try:
+        yield token
+    finally:
+        _token_atual.reset(marcador)
+
+
+class RegistroCancelamentos:
+    """Tokens dos jobs em execução, por job_id"""
+
+    def __init__(self):
+        self._tokens: Dict[str, TokenCancelamento] = {}
+        self._lock = threading.Lock()
+
+    def criar(self, job_id: str) -> TokenCancelamento:
+        with self._lock:
+            token = TokenCancelamento(job_id)
+            self._tokens[job_id] = token
+            return token
+
+    def obter(self, job_id: str) -> Optional[TokenCancelamento]:
+        with self._lock:
+            return self._tokens.get(job_id)
+
+    def cancelar(self, job_id: str, motivo: str = "Cancelado pelo usuário") -> bool:
+        """Sinaliza o job. Retorna False se não há execução em andamento para ele"""
+        token = self.obter(job_id)
+        if token is None:
+            return False
+        token.cancelar(motivo)
+        return True
+
+    def remover(self, job_id: str, token: TokenCancelamento) -> None:
+        with self._lock:
+            if self._tokens.get(job_id) is token:
+                del self._tokens[job_id]
+
+
+# Registro compartilhado pelo servidor
+cancelamentos = RegistroCancelamentos()
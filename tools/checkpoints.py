@@ -0,0 +1,101 @@
+# tools/checkpoints.py - CHECKPOINTS DAS ETAPAS DO WORKFLOW E PERSISTÊNCIA DOS JOBS EM DISCO
+import os
+import json
+import time
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class CheckpointConfig:
+    """Configurações dos checkpoints (variáveis de ambiente)"""
+    DIRETORIO = os.getenv('JOBS_CHECKPOINT_DIR', os.path.join('.cache', 'checkpoints'))
+
+
+ARQUIVO_JOB = '_job.json'
+
+
+class ArmazemCheckpoints:
+    """
+    Guarda em disco o resultado de cada etapa concluída de um job (`<dir>/<job_id>/<etapa>.json`)
+    e um retrato do próprio job, para que um job interrompido (erro, reinício do servidor)
+    continue da primeira etapa incompleta sem repetir as chamadas LLM já feitas.
+    """
+
+    def __init__(self, diretorio: str = CheckpointConfig.DIRETORIO):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+
+    def _pasta_job(self, job_id: str) -> str:
+        # job_ids são UUIDs; o basename impede sair do diretório com ids forjados
+        return os.path.join(self.diretorio, os.path.basename(job_id))
+
+    def _gravar_json(self, caminho: str, conteudo: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        caminho_tmp = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(caminho_tmp, 'w', encoding='utf-8') as f:
+            json.dump(conteudo, f, ensure_ascii=False)
+        os.replace(caminho_tmp, caminho)
+
+    def _ler_json(self, caminho: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Checkpoint ilegível ({caminho}): {e}")
+            return None
+
+    # --- Etapas ---
+
+    def salvar(self, job_id: str, etapa: str, resultado: Any, chave: Optional[str] = None) -> None:
+        """Registra o resultado de uma etapa concluída; `chave` identifica as entradas que o geraram"""
+        caminho = os.path.join(self._pasta_job(job_id), f"{etapa}.json")
+        self._gravar_json(caminho, {"etapa": etapa, "resultado": resultado, "chave": chave, "salvo_em": time.time()})
+
+    def carregar(self, job_id: str, etapa: str) -> Optional[Dict[str, Any]]:
+        """Checkpoint da etapa ({'etapa', 'resultado', 'chave', 'salvo_em'}) ou None se ela não foi concluída"""
+        return self._ler_json(os.path.join(self._pasta_job(job_id), f"{etapa}.json"))
+
+    def caminho_arquivo(self, job_id: str, nome: str) -> str:
+        """Caminho de um arquivo auxiliar do job (ex.: diário de commits), removido junto com ele"""
+        return os.path.join(self._pasta_job(job_id), nome)
+
+    def etapas_concluidas(self, job_id: str) -> List[str]:
+        pasta = self._pasta_job(job_id)
+        if not os.path.isdir(pasta):
+            return []
+        return sorted(
+            nome[:-len('.json')] for nome in os.listdir(pasta)
+            if nome.endswith('.json') and nome != ARQUIVO_JOB
+        )
+
+    # --- Jobs ---
+
+    def salvar_job(self, job_id: str, dados: Dict[str, Any]) -> None:
+        """Grava o retrato do job (status, dados de entrada, relatório)"""
+        with self._lock:
+            try:
+                self._gravar_json(os.path.join(self._pasta_job(job_id), ARQUIVO_JOB), dados)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠️ Não foi possível persistir o job {job_id}: {e}")
+
+    def listar_jobs(self) -> Dict[str, Dict[str, Any]]:
+        """Jobs persistidos, por job_id"""
+        if not os.path.isdir(self.diretorio):
+            return {}
+        persistidos = {}
+        for job_id in os.listdir(self.diretorio):
+            dados = self._ler_json(os.path.join(self.diretorio, job_id, ARQUIVO_JOB))
+            if dados is not None:
+                persistidos[job_id] = dados
+        return persistidos
+
+    def remover(self, job_id: str) -> None:
+        """Apaga o job e todos os checkpoints dele"""
+        shutil.rmtree(self._pasta_job(job_id), ignore_errors=True)
+
+
+# Armazém compartilhado pelo servidor
+checkpoints = ArmazemCheckpoints()
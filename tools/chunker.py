@@ -0,0 +1,321 @@
+# tools/chunker.py - DIVISÃO DE CÓDIGO EM PARTES RESPEITANDO A SINTAXE (FUNÇÕES/CLASSES)
+import re
+import ast
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from tools.tokens import estimar_tokens
+from tools.payload_codigo import PayloadConfig, custo_numeracao, custo_secao
+
+EXTENSOES_PYTHON = ('.py',)
+EXTENSOES_CHAVES = ('.js', '.jsx', '.ts', '.tsx', '.java', '.cs', '.go', '.c', '.cpp', '.php')
+# Linguagens em que os membros relevantes ficam um nível abaixo (dentro de class/namespace)
+EXTENSOES_CORTE_NIVEL_1 = ('.java', '.cs')
+
+_RE_TOKENS_CHAVES = re.compile(r'//|/\*|\*/|\\.|["\'`{}]')
+_RE_CABECALHO_CHAVES = re.compile(
+    r'^\s*(import\b|package\b|using\b|#include\b|#import\b|namespace\s+[\w.]+\s*;|'
+    r'(const|let|var)\s+.*=\s*require\(|export\s+.*\bfrom\b|[\'"]use strict[\'"])'
+)
+_RE_INICIO_PYTHON = re.compile(r'^(def |async def |class |@)')
+
+
+@dataclass
+class Chunk:
+    """Parte de um arquivo pronta para ser enviada ao LLM"""
+    caminho: str
+    conteudo: str
+    tokens: int  # Custo da seção no payload (conteúdo, cabeçalho da seção e numeração das linhas)
+    linha_inicio: int
+    linha_fim: int
+    parte: int = 1
+    total_partes: int = 1
+    linhas_cabecalho: int = 0  # Linhas do cabeçalho (imports) repetidas no início do conteúdo
+
+    @property
+    def nome(self) -> str:
+        if self.total_partes == 1:
+            return self.caminho
+        return f"{self.caminho} (parte {self.parte}/{self.total_partes}, linhas {self.linha_inicio}-{self.linha_fim})"
+
+    def numeros_das_linhas(self) -> List[int]:
+        """Número, no arquivo original, de cada linha do conteúdo (cabeçalho repetido e depois o trecho)"""
+        quantidade = len(self.conteudo.splitlines())
+        cabecalho = list(range(1, self.linhas_cabecalho + 1))
+        return cabecalho + list(range(self.linha_inicio, self.linha_inicio + quantidade - len(cabecalho)))
+
+
+# --- Segmentação por linguagem ---
+# Cada segmentador devolve (linhas_do_cabecalho, lista de (inicio, fim)) com índices de linha 0-based,
+# fim exclusivo. Os segmentos cobrem o arquivo inteiro (exceto o cabeçalho) e são cortes válidos.
+
+def _segmentar_python(linhas: List[str], texto: str) -> Tuple[int, List[Tuple[int, int]]]:
+    try:
+        arvore = ast.parse(texto)
+    except (SyntaxError, ValueError):
+        return _segmentar_por_indentacao(linhas)
+
+    corpo = arvore.body
+    cabecalho = 0
+    # Cabeçalho: docstring do módulo + imports iniciais (e __future__)
+    for i, no in enumerate(corpo):
+        eh_docstring = i == 0 and isinstance(no, ast.Expr) and isinstance(getattr(no, 'value', None), ast.Constant)
+        if isinstance(no, (ast.Import, ast.ImportFrom)) or eh_docstring:
+            cabecalho = no.end_lineno
+        else:
+            break
+
+    def _inicio(no) -> int:
+        return min([no.lineno] + [d.lineno for d in getattr(no, 'decorator_list', [])]) - 1
+
+    inicios = []
+    for no in corpo:
+        if _inicio(no) >= cabecalho:
+            inicios.append(_inicio(no))
+        # Métodos também são cortes válidos, usados quando a classe não cabe inteira
+        if isinstance(no, ast.ClassDef):
+            inicios.extend(_inicio(filho) for filho in no.body[1:])
+    return cabecalho, _cortes_para_segmentos(inicios, cabecalho, len(linhas), linhas)
+
+
+def _segmentar_por_indentacao(linhas: List[str]) -> Tuple[int, List[Tuple[int, int]]]:
+    """Fallback para Python inválido: corta em definições sem indentação"""
+    cabecalho = 0
+    for i, linha in enumerate(linhas):
+        if linha.startswith(('import ', 'from ')) or not linha.strip() or linha.startswith('#'):
+            cabecalho = i + 1 if linha.strip() else cabecalho
+        else:
+            break
+
+    inicios = []
+    for i in range(cabecalho, len(linhas)):
+        linha = linhas[i]
+        anterior = linhas[i - 1] if i > 0 else ''
+        if _RE_INICIO_PYTHON.match(linha) and not anterior.startswith('@'):
+            inicios.append(i)
+        elif linha.strip() and not linha[0].isspace() and not anterior.strip():
+            inicios.append(i)
+    return cabecalho, _cortes_para_segmentos(inicios, cabecalho, len(linhas), linhas)
+
+
+def _profundidade_por_linha(linhas: List[str]) -> List[int]:
+    """Profundidade de chaves no início de cada linha, ignorando strings e comentários"""
+    profundidades = []
+    profundidade = 0
+    em_comentario_bloco = False
+    aspas: Optional[str] = None
+    for linha in linhas:
+        profundidades.append(profundidade)
+        for m in _RE_TOKENS_CHAVES.finditer(linha):
+            token = m.group()
+            if em_comentario_bloco:
+                if token == '*/':
+                    em_comentario_bloco = False
+                continue
+            if aspas:
+                if token == aspas:
+                    aspas = None
+                continue
+            if token == '//':
+                break
+            if token == '/*':
+                em_comentario_bloco = True
+            elif token in ('"', "'", '`'):
+                aspas = token
+            elif token == '{':
+                profundidade += 1
+            elif token == '}':
+                profundidade = max(0, profundidade - 1)
+        # Strings simples não atravessam linhas; template strings (`) sim
+        if aspas in ('"', "'"):
+            aspas = None
+    return profundidades
+
+
+def _segmentar_chaves(linhas: List[str], nivel_corte: int) -> Tuple[int, List[Tuple[int, int]]]:
+    cabecalho = 0
+    em_bloco_import = False
+    for i, linha in enumerate(linhas):
+        despida = linha.strip()
+        if em_bloco_import:
+            cabecalho = i + 1
+            em_bloco_import = despida != ')'
+        elif _RE_CABECALHO_CHAVES.match(linha):
+            cabecalho = i + 1
+            em_bloco_import = despida.endswith('(')  # import ( ... ) do Go
+        elif not despida or despida.startswith(('//', '/*', '*')):
+            continue
+        else:
+            break
+
+    profundidades = _profundidade_por_linha(linhas)
+    inicios = []
+    for i in range(cabecalho, len(linhas)):
+        despida = linhas[i].strip()
+        if not despida or profundidades[i] > nivel_corte or despida.startswith(('}', ')', ']')):
+            continue
+        # Só corta depois de uma linha em branco ou de um fim de bloco/instrução,
+        # para não separar anotações e comentários da definição que descrevem
+        anterior = linhas[i - 1].rstrip() if i > 0 else ''
+        if not anterior or anterior.endswith(('}', ';', '};', ')')) and profundidades[i - 1] <= nivel_corte + 1:
+            inicios.append(i)
+    return cabecalho, _cortes_para_segmentos(inicios, cabecalho, len(linhas), linhas)
+
+
+def _cortes_para_segmentos(inicios: List[int], cabecalho: int, total: int,
+                           linhas: List[str]) -> List[Tuple[int, int]]:
+    """Converte pontos de corte em segmentos, puxando comentários logo acima para o segmento seguinte"""
+    cortes = []
+    for inicio in sorted(set(inicios)):
+        while inicio - 1 > cabecalho and linhas[inicio - 1].lstrip().startswith(('#', '//', '/*', '*')):
+            inicio -= 1
+        cortes.append(inicio)
+    cortes = sorted(set([cabecalho] + [c for c in cortes if cabecalho < c < total]))
+    return [(inicio, fim) for inicio, fim in zip(cortes, cortes[1:] + [total]) if inicio < fim]
+
+
+def _segmentar(caminho: str, linhas: List[str], texto: str) -> Tuple[int, List[Tuple[int, int]]]:
+    caminho_lower = caminho.lower()
+    if caminho_lower.endswith(EXTENSOES_PYTHON):
+        return _segmentar_python(linhas, texto)
+    if caminho_lower.endswith(EXTENSOES_CHAVES):
+        nivel = 1 if caminho_lower.endswith(EXTENSOES_CORTE_NIVEL_1) else 0
+        return _segmentar_chaves(linhas, nivel)
+    return 0, [(0, len(linhas))]
+
+
+def _dividir_por_linhas(inicio: int, fim: int, tokens_linhas: List[int], max_tokens: int) -> List[Tuple[int, int]]:
+    """Último recurso para um segmento maior que o orçamento: linhas inteiras"""
+    segmentos, atual, tokens_atual = [], inicio, 0
+    for i in range(inicio, fim):
+        if i > atual and tokens_atual + tokens_linhas[i] > max_tokens:
+            segmentos.append((atual, i))
+            atual, tokens_atual = i, 0
+        tokens_atual += tokens_linhas[i]
+    segmentos.append((atual, fim))
+    return segmentos
+
+
+def _cortar_linha(linha: str, tokens_linha: int, max_tokens: int) -> List[str]:
+    """Linha sozinha maior que o orçamento (JS minificado, arquivo de dados): cortada por caracteres"""
+    tamanho = max(1, len(linha) * max_tokens // tokens_linha)
+    pedacos, inicio = [], 0
+    while inicio < len(linha):
+        fim = min(len(linha), inicio + tamanho)
+        # A proporção caracteres/tokens varia ao longo da linha: encolhe até caber
+        while fim - inicio > 1 and estimar_tokens(linha[inicio:fim]) > max_tokens:
+            fim = inicio + (fim - inicio) * 9 // 10
+        pedacos.append(linha[inicio:fim])
+        inicio = fim
+    return pedacos
+
+
+def dividir_arquivo(caminho: str, conteudo: str, max_tokens: int,
+                    numerar_linhas: Optional[bool] = None) -> List[Chunk]:
+    """
+    Divide um arquivo em partes de até `max_tokens`, cortando em definições de nível
+    superior (funções, classes, métodos em Java/C#) e repetindo o cabeçalho (imports)
+    em cada parte. Arquivos que já cabem no orçamento são devolvidos sem análise sintática;
+    uma linha maior que o orçamento é cortada por caracteres em várias partes. O orçamento
+    conta o que o payload acrescenta: a moldura da seção e, com `numerar_linhas`
+    (padrão: PAYLOAD_NUMERAR_LINHAS), o número de cada linha.
+    """
+    if numerar_linhas is None:
+        numerar_linhas = PayloadConfig.NUMERAR_LINHAS
+    total_linhas = conteudo.count('\n') + 1
+    tokens_total = estimar_tokens(conteudo)
+    # Números de linha e de parte nunca passam disto (cada parte tem ao menos um token)
+    maior_numero = max(total_linhas, tokens_total)
+    tokens_secao = custo_secao(caminho, maior_numero)
+    tokens_por_linha = custo_numeracao(maior_numero) if numerar_linhas else 0
+    tokens_arquivo = tokens_total + tokens_secao + tokens_por_linha * total_linhas
+    if tokens_arquivo <= max_tokens:
+        return [Chunk(caminho, conteudo, tokens_arquivo, 1, total_linhas)]
+
+    linhas = conteudo.splitlines(keepends=True)
+
+    fim_cabecalho, segmentos = _segmentar(caminho, linhas, conteudo)
+    cabecalho = ''.join(linhas[:fim_cabecalho])
+    tokens_cabecalho = estimar_tokens(cabecalho) + tokens_por_linha * fim_cabecalho
+    if tokens_cabecalho > max_tokens // 4:
+        # Cabeçalho grande demais para repetir: vira parte do primeiro segmento
+        cabecalho, tokens_cabecalho = '', 0
+        segmentos = [(0, segmentos[0][1])] + segmentos[1:] if segmentos else [(0, len(linhas))]
+    orcamento = max(1, max_tokens - tokens_secao - tokens_cabecalho)
+    tokens_linhas = [estimar_tokens(linha) + tokens_por_linha for linha in linhas]
+
+    # Empacota segmentos consecutivos até o orçamento. Cada grupo é (inicio, fim, texto);
+    # o texto só vem preenchido nos pedaços de uma linha cortada por caracteres
+    grupos: List[Tuple[int, int, Optional[str]]] = []
+    atual: Optional[List[int]] = None
+    tokens_atual = 0
+    for inicio, fim in segmentos:
+        tokens_segmento = sum(tokens_linhas[inicio:fim])
+        pedacos = (
+            _dividir_por_linhas(inicio, fim, tokens_linhas, orcamento)
+            if tokens_segmento > orcamento else [(inicio, fim)]
+        )
+        for p_inicio, p_fim in pedacos:
+            tokens_pedaco = sum(tokens_linhas[p_inicio:p_fim])
+            if atual is not None and tokens_atual + tokens_pedaco > orcamento:
+                grupos.append((atual[0], atual[1], None))
+                atual = None
+            if tokens_pedaco > orcamento:
+                # Só acontece com uma linha sozinha (os pedaços acima já cortam entre linhas)
+                grupos.extend(
+                    (p_inicio, p_fim, trecho)
+                    for trecho in _cortar_linha(linhas[p_inicio], tokens_pedaco,
+                                                max(1, orcamento - tokens_por_linha))
+                )
+                continue
+            if atual is None:
+                atual, tokens_atual = [p_inicio, p_fim], 0
+            atual[1] = p_fim
+            tokens_atual += tokens_pedaco
+    if atual is not None:
+        grupos.append((atual[0], atual[1], None))
+
+    total = len(grupos)
+    chunks = []
+    for parte, (inicio, fim, trecho) in enumerate(grupos, 1):
+        corpo = ''.join(linhas[inicio:fim]) if trecho is None else trecho
+        tokens_corpo = sum(tokens_linhas[inicio:fim]) if trecho is None \
+            else estimar_tokens(trecho) + tokens_por_linha
+        texto = corpo if inicio == 0 or not cabecalho else cabecalho + corpo
+        chunks.append(Chunk(
+            caminho=caminho,
+            conteudo=texto,
+            tokens=tokens_secao + tokens_corpo + (tokens_cabecalho if inicio > 0 else 0),
+            linha_inicio=inicio + 1,
+            linha_fim=fim,
+            parte=parte,
+            total_partes=total,
+            linhas_cabecalho=fim_cabecalho if inicio > 0 and cabecalho else 0
+        ))
+    return chunks
+
+
+def agrupar_em_lotes(arquivos: Dict[str, str], max_tokens: int,
+                     numerar_linhas: Optional[bool] = None) -> List[List[Chunk]]:
+    """
+    Agrupa os arquivos (já divididos por sintaxe quando preciso) em lotes de até
+    `max_tokens`, já codificados para o payload, preservando a ordem.
+    """
+    lotes: List[List[Chunk]] = []
+    atual: List[Chunk] = []
+    tokens_atual = 0
+    for caminho, conteudo in arquivos.items():
+        for chunk in dividir_arquivo(caminho, conteudo, max_tokens, numerar_linhas):
+            if atual and tokens_atual + chunk.tokens > max_tokens:
+                lotes.append(atual)
+                atual, tokens_atual = [], 0
+            atual.append(chunk)
+            tokens_atual += chunk.tokens
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def dividir_repositorio(arquivos: Dict[str, str], max_tokens: int) -> List[Dict[str, str]]:
+    """Como `agrupar_em_lotes`, com cada lote como um dict nome -> conteúdo"""
+    return [{chunk.nome: chunk.conteudo for chunk in lote} for lote in agrupar_em_lotes(arquivos, max_tokens)]
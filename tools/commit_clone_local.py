@@ -0,0 +1,295 @@
+# tools/commit_clone_local.py - ENVIO DAS MUDANÇAS AGRUPADAS POR UM CLONE LOCAL (GIT PURO, UM ÚNICO PUSH)
+import os
+import json
+import base64
+import shutil
+import tempfile
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+from tools import github_connector
+from tools.commit_multiplas_branchs import _grupos_validos, _somar_resumo, criar_pull_request
+from tools.git_data import montar_mensagem_commit
+from tools.cancelamento import verificar_cancelamento
+from tools.commit_journal import (
+    CommitParcialError, DiarioCommits, OPERACAO_COMMIT, OPERACAO_PULL_REQUEST, chave_commit, chave_pull_request
+)
+
+
+class CloneLocalConfig:
+    """Configurações do motor de commit por clone local (variáveis de ambiente)"""
+
+    # Espelhos (clones bare só com as branches) reaproveitados entre jobs; só buscam o que mudou
+    DIRETORIO_ESPELHOS = os.getenv('COMMIT_CLONE_CACHE_DIR', os.path.join('.cache', 'espelhos'))
+
+    AUTOR_NOME = os.getenv('COMMIT_AUTOR_NOME', 'Agentes Peers')
+    AUTOR_EMAIL = os.getenv('COMMIT_AUTOR_EMAIL', 'agentes-peers@users.noreply.github.com')
+
+    TIMEOUT_GIT = float(os.getenv('COMMIT_CLONE_TIMEOUT', 600))
+
+
+class ErroGit(RuntimeError):
+    """Comando git terminou com erro"""
+
+
+# Um fetch por espelho de cada vez
+_locks_espelhos: Dict[str, threading.Lock] = {}
+_lock_global = threading.Lock()
+
+
+def _lock_do_espelho(caminho: str) -> threading.Lock:
+    with _lock_global:
+        return _locks_espelhos.setdefault(caminho, threading.Lock())
+
+
+def _ambiente_git(token: Optional[str]) -> Dict[str, str]:
+    """
+    Ambiente dos comandos git. O token vai como cabeçalho HTTP em configuração de
+    ambiente: não aparece na URL, no .git/config nem na lista de processos.
+    """
+    ambiente = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+    if token:
+        credencial = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        ambiente.update(
+            GIT_CONFIG_COUNT='1',
+            GIT_CONFIG_KEY_0='http.https://github.com/.extraheader',
+            GIT_CONFIG_VALUE_0=f"AUTHORIZATION: basic {credencial}",
+        )
+    return ambiente
+
+
+def _git(argumentos: List[str], ambiente: Dict[str, str], cwd: Optional[str] = None,
+         entrada: Optional[str] = None) -> str:
+    resultado = subprocess.run(
+        ['git', *argumentos], cwd=cwd, env=ambiente, input=entrada, capture_output=True, text=True,
+        timeout=CloneLocalConfig.TIMEOUT_GIT
+    )
+    if resultado.returncode != 0:
+        raise ErroGit(f"git {argumentos[0]} falhou: {resultado.stderr.strip() or resultado.stdout.strip()}")
+    return resultado.stdout
+
+
+REFSPEC_BRANCHES = '+refs/heads/*:refs/heads/*'
+
+
+def _somente_branches(caminho: str, ambiente: Dict[str, str]) -> None:
+    """
+    Faz o espelho buscar só as branches. Um --mirror buscaria também refs/pull/* (uma ref
+    por PR já aberto no GitHub), o que pesa no primeiro download e em cada atualização.
+    Espelhos antigos, criados com --mirror, perdem essas refs aqui.
+    """
+    _git(['config', 'remote.origin.fetch', REFSPEC_BRANCHES], ambiente, cwd=caminho)
+    _git(['config', '--bool', 'remote.origin.mirror', 'false'], ambiente, cwd=caminho)
+    refs_pr = _git(['for-each-ref', '--format=delete %(refname)', 'refs/pull/'], ambiente, cwd=caminho)
+    if refs_pr.strip():
+        _git(['update-ref', '--stdin'], ambiente, cwd=caminho, entrada=refs_pr)
+
+
+def preparar_espelho(url_remoto: str, nome_repo: str, ambiente: Dict[str, str],
+                     config=CloneLocalConfig) -> str:
+    """Cria (na primeira vez) ou atualiza o espelho local do repositório e devolve o caminho"""
+    caminho = os.path.abspath(os.path.join(config.DIRETORIO_ESPELHOS, nome_repo.replace('/', '__') + '.git'))
+    with _lock_do_espelho(caminho):
+        if os.path.isdir(caminho):
+            print(f"🔄 Atualizando espelho local de {nome_repo}...")
+            _git(['remote', 'set-url', 'origin', url_remoto], ambiente, cwd=caminho)
+            _somente_branches(caminho, ambiente)
+            _git(['fetch', '--quiet', '--prune', 'origin'], ambiente, cwd=caminho)
+        else:
+            print(f"📥 Criando espelho local de {nome_repo}...")
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # --bare (não --mirror): só branches e tags, sem as refs dos PRs
+            _git(['clone', '--bare', '--quiet', url_remoto, caminho], ambiente)
+            _somente_branches(caminho, ambiente)
+    return caminho
+
+
+def _caminho_seguro(raiz: str, caminho: str) -> str:
+    """Caminho absoluto do arquivo dentro da cópia de trabalho (recusa sair dela)"""
+    raiz_real = os.path.realpath(raiz)
+    destino = os.path.realpath(os.path.join(raiz_real, caminho))
+    relativo = os.path.relpath(destino, raiz_real)
+    if not caminho or os.path.isabs(caminho) or relativo == '.' or relativo.startswith('..') \
+            or relativo.split(os.sep)[0] == '.git':
+        raise ValueError(f"Caminho de arquivo inválido: '{caminho}'")
+    return destino
+
+
+def _aplicar_grupo(copia: str, grupo: dict, origem: str, ambiente: Dict[str, str]) -> dict:
+    """Cria a branch do grupo a partir de `origem`, grava os arquivos e faz um commit"""
+    nome_branch = grupo["nome_branch"]
+    resumo = {"commit": None, "criados": 0, "modificados": 0, "inalterados": 0, "ignorados": 0, "pull_request": None}
+
+    # Branch que já existe no remoto recebe os commits por cima, como no motor via API
+    existentes = _git(['branch', '-r', '--list', f"origin/{nome_branch}"], ambiente, cwd=copia).strip()
+    inicio = f"origin/{nome_branch}" if existentes else origem
+    _git(['checkout', '--quiet', '--force', '-B', nome_branch, inicio], ambiente, cwd=copia)
+    _git(['clean', '--quiet', '-fd'], ambiente, cwd=copia)
+
+    alteradas = []
+    for mudanca in grupo["conjunto_de_mudancas"]:
+        caminho = mudanca.get("caminho_do_arquivo")
+        try:
+            destino = _caminho_seguro(copia, caminho)
+        except ValueError as e:
+            print(f"  [IGNORADO] ⚠️ {e}")
+            resumo["ignorados"] += 1
+            continue
+        dados = mudanca["conteudo"].encode('utf-8')
+        if os.path.isfile(destino):
+            with open(destino, 'rb') as f:
+                if f.read() == dados:
+                    print(f"  [INALTERADO] {caminho}")
+                    resumo["inalterados"] += 1
+                    continue
+            resumo["modificados"] += 1
+        else:
+            resumo["criados"] += 1
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with open(destino, 'wb') as f:
+            f.write(dados)
+        alteradas.append(mudanca)
+
+    if not alteradas:
+        print(f"⚠️ Nenhum arquivo mudou em '{nome_branch}', commit não criado")
+        return resumo
+
+    _git(['add', '--', *[m["caminho_do_arquivo"] for m in alteradas]], ambiente, cwd=copia)
+    mensagem = montar_mensagem_commit(f"refactor: {grupo['mensagem_pr']}", alteradas, grupo["descricao_pr"])
+    _git(['commit', '--quiet', '--no-verify', '-F', '-'], ambiente, cwd=copia, entrada=mensagem)
+    resumo["commit"] = _git(['rev-parse', 'HEAD'], ambiente, cwd=copia).strip()
+    print(f"✅ Commit {resumo['commit'][:7]} em '{nome_branch}' com {len(alteradas)} arquivo(s)")
+    return resumo
+
+
+def processar_e_subir_mudancas_agrupadas(
+    nome_repo: str,
+    dados_agrupados,
+    base_branch: str = "main",
+    independentes: bool = False,
+    url_remoto: Optional[str] = None,
+    criar_prs: bool = True,
+    diario: Optional[DiarioCommits] = None,
+    config=CloneLocalConfig
+):
+    """
+    Alternativa ao commit_multiplas_branchs: aplica todos os grupos em uma cópia de
+    trabalho (a partir de um espelho local em cache), cria as branches empilhadas (ou
+    independentes) e os commits com git puro e envia todas as refs em um único
+    `git push --atomic`. Só os PRs usam a API do GitHub.
+
+    `url_remoto` troca o remoto (ex.: um repositório bare local nos testes); com
+    `criar_prs=False` nenhuma chamada à API é feita. Retorna o mesmo resumo do
+    commit_multiplas_branchs. Com um `diario`, grupos já enviados e PRs já abertos
+    por uma execução anterior não são refeitos (ver tools/commit_journal.py).
+    """
+    if isinstance(dados_agrupados, str):
+        dados_agrupados = json.loads(dados_agrupados)
+
+    resumo = {"grupos_processados": 0, "commits": 0, "criados": 0, "modificados": 0,
+              "inalterados": 0, "ignorados": 0, "branches": {}, "falhas": {}}
+    grupos = _grupos_validos(dados_agrupados.get("grupos", []))
+    if not grupos:
+        print("⚠️ Nenhum grupo de mudanças encontrado para processar.")
+        return resumo
+
+    token = None
+    if url_remoto is None:
+        token = github_connector.get_github_token()
+        url_remoto = f"https://github.com/{nome_repo}.git"
+    ambiente = _ambiente_git(token)
+    ambiente.update(
+        GIT_AUTHOR_NAME=config.AUTOR_NOME, GIT_AUTHOR_EMAIL=config.AUTOR_EMAIL,
+        GIT_COMMITTER_NAME=config.AUTOR_NOME, GIT_COMMITTER_EMAIL=config.AUTOR_EMAIL,
+    )
+
+    print(f"🚀 --- Iniciando o Processo de Pull Requests via clone local ({len(grupos)} grupo(s)) ---")
+    espelho = preparar_espelho(url_remoto, nome_repo, ambiente, config)
+    copia = tempfile.mkdtemp(prefix='agentes_peers_clone_')
+    try:
+        # --shared: a cópia usa os objetos do espelho, sem copiá-los
+        _git(['clone', '--quiet', '--shared', '--no-checkout', espelho, copia], ambiente)
+
+        base = base_branch
+        if not _git(['branch', '-r', '--list', f"origin/{base}"], ambiente, cwd=copia).strip():
+            base = _git(['symbolic-ref', '--short', 'HEAD'], ambiente, cwd=espelho).strip()
+            print(f"⚠️ Branch '{base_branch}' não encontrada, usando branch padrão: {base}")
+
+        # `origem` é a ref de onde a próxima branch sai; `alvo`, a branch para onde vai o PR dela
+        origem, alvo = f"origin/{base}", base
+        alvos_pr, chaves_commit, a_enviar = {}, {}, []
+        for grupo in grupos:
+            verificar_cancelamento()
+            nome_branch = grupo["nome_branch"]
+            print(f"\n📦 Processando grupo: '{nome_branch}' ({len(grupo['conjunto_de_mudancas'])} mudanças)")
+            chaves_commit[nome_branch] = chave_commit(nome_branch, f"refactor: {grupo['mensagem_pr']}",
+                                                      grupo["conjunto_de_mudancas"])
+            registrado = diario.concluida(OPERACAO_COMMIT, chaves_commit[nome_branch]) if diario is not None else None
+            if registrado is not None:
+                # Já enviado por uma execução anterior: a branch está no remoto (e no espelho)
+                print(f"📓 Grupo já enviado em uma execução anterior ({registrado['commit'][:7] if registrado.get('commit') else 'sem mudanças'}).")
+                resumo_branch = {**registrado, "pull_request": None}
+                ref_do_grupo = f"origin/{nome_branch}"
+            else:
+                try:
+                    resumo_branch = _aplicar_grupo(copia, grupo, origem, ambiente)
+                except (ErroGit, OSError) as e:
+                    print(f"❌ Erro no grupo '{nome_branch}': {e}")
+                    resumo["falhas"][nome_branch] = str(e)
+                    continue
+                a_enviar.append(nome_branch)
+                ref_do_grupo = nome_branch
+            alvos_pr[nome_branch] = alvo
+            _somar_resumo(resumo, nome_branch, resumo_branch)
+            resumo["grupos_processados"] += 1
+            if not independentes and resumo_branch["commit"]:
+                # Empilhamento: o próximo grupo sai desta branch (só se ela vai ser enviada)
+                origem, alvo = ref_do_grupo, nome_branch
+
+        com_commit = [nome for nome, dados in resumo["branches"].items() if dados["commit"]]
+        para_push = [nome for nome in com_commit if nome in a_enviar]
+        verificar_cancelamento()
+        if para_push:
+            print(f"📤 Enviando {len(para_push)} branch(es) em um único push...")
+            _git(['push', '--atomic', '--quiet', url_remoto,
+                  *[f"refs/heads/{nome}:refs/heads/{nome}" for nome in para_push]], ambiente, cwd=copia)
+            print("✅ Push concluído")
+        if diario is not None:
+            # O push é atômico: ou todos os grupos desta execução foram para o remoto, ou nenhum
+            for nome in a_enviar:
+                diario.registrar(OPERACAO_COMMIT, chaves_commit[nome], {
+                    chave: resumo["branches"][nome][chave]
+                    for chave in ("commit", "criados", "modificados", "inalterados", "ignorados")
+                })
+
+        if criar_prs and com_commit:
+            repo = github_connector.connection(repositorio=nome_repo)
+            for nome in com_commit:
+                grupo = next(g for g in grupos if g["nome_branch"] == nome)
+                chave_do_pr = chave_pull_request(nome, alvos_pr[nome], chaves_commit[nome])
+                registrado = diario.concluida(OPERACAO_PULL_REQUEST, chave_do_pr) if diario is not None else None
+                if registrado is not None:
+                    print(f"📓 Pull Request já aberto em uma execução anterior: {registrado.get('url')}")
+                    resumo["branches"][nome]["pull_request"] = registrado.get("url")
+                    continue
+                url = criar_pull_request(repo, nome, alvos_pr[nome], grupo["mensagem_pr"], grupo["descricao_pr"])
+                resumo["branches"][nome]["pull_request"] = url
+                if diario is not None:
+                    if url:
+                        diario.registrar(OPERACAO_PULL_REQUEST, chave_do_pr, {"url": url})
+                    else:
+                        resumo["falhas"][nome] = "Pull Request não criado"
+    finally:
+        shutil.rmtree(copia, ignore_errors=True)
+
+    print(f"\n🎉 === PROCESSO CONCLUÍDO ===")
+    print(f"✅ {resumo['grupos_processados']}/{len(grupos)} grupos processados com sucesso!")
+    print(f"📊 {resumo['criados']} criado(s), {resumo['modificados']} modificado(s), "
+          f"{resumo['inalterados']} inalterado(s) em {resumo['commits']} commit(s)")
+    if diario is not None:
+        resumo["operacoes_reaproveitadas"] = diario.reaproveitadas
+        print(f"📓 {diario.reaproveitadas} operação(ões) reaproveitada(s) do diário")
+        if resumo["falhas"]:
+            raise CommitParcialError(f"{len(resumo['falhas'])} grupo(s) não enviado(s): {', '.join(resumo['falhas'])}")
+    return resumo
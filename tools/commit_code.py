@@ -1,6 +1,6 @@
 import json
 from github import GithubException
-from tools import github_connector
+from tools import github_connector, git_data
 
 def aplicar_mudancas_no_github(
     nome_repo: str,      
@@ -35,6 +35,11 @@ def aplicar_mudancas_no_github(
             print("Nenhuma mudança para aplicar.")
             return
 
+        # Existência e SHA de todos os arquivos a partir de uma única listagem da árvore da branch
+        arvore_branch = git_data.arvore_da_branch(
+            repo, nome_branch, [m.get("caminho_do_arquivo") for m in conjunto_de_mudancas if m.get("caminho_do_arquivo")]
+        )
+
         print("\nIniciando a aplicação dos arquivos no repositório (um commit por arquivo)...")
         for mudanca in conjunto_de_mudancas:
             caminho = mudanca.get("caminho_do_arquivo")
@@ -46,14 +51,11 @@ def aplicar_mudancas_no_github(
                 print(f"AVISO: Pulando mudança inválida (sem caminho ou conteúdo): {mudanca}")
                 continue
             
-            sha_arquivo_existente = None
-            try:
-                arquivo_existente = repo.get_contents(caminho, ref=nome_branch)
-                sha_arquivo_existente = arquivo_existente.sha
-            except GithubException as e:
-                if e.status != 404:
-                    print(f"ERRO ao verificar o arquivo '{caminho}': {e}")
-                    continue
+            item_existente = arvore_branch.get(caminho)
+            sha_arquivo_existente = item_existente.sha if item_existente else None
+            if sha_arquivo_existente == git_data.sha_blob_git(conteudo):
+                print(f"  [INALTERADO] {caminho} (conteúdo idêntico ao da branch)")
+                continue
 
             try:
                 # Define o assunto (subject) do commit
@@ -67,7 +69,7 @@ def aplicar_mudancas_no_github(
                     commit_message_completo = assunto_commit
 
                 if sha_arquivo_existente:
-                    repo.update_file(
+                    resposta = repo.update_file(
                         path=caminho,
                         message=commit_message_completo, # Usa a mensagem completa
                         content=conteudo,
@@ -76,13 +78,15 @@ def aplicar_mudancas_no_github(
                     )
                     print(f"  [MODIFICADO] {caminho} (commit criado com justificativa)")
                 else:
-                    repo.create_file(
+                    resposta = repo.create_file(
                         path=caminho,
                         message=commit_message_completo, # Usa a mensagem completa
                         content=conteudo,
                         branch=nome_branch
                     )
                     print(f"  [CRIADO]     {caminho} (commit criado com justificativa)")
+                # O mesmo caminho pode voltar mais adiante na lista: guarda o SHA novo
+                arvore_branch[caminho] = git_data.ItemArvore(resposta["content"].sha)
 
             except GithubException as e:
                 print(f"ERRO ao commitar o arquivo '{caminho}': {e}")
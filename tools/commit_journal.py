@@ -0,0 +1,100 @@
+# tools/commit_journal.py - DIÁRIO DAS OPERAÇÕES DE COMMIT DE UM JOB (RETOMADA SEM DUPLICAR NO GITHUB)
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.git_data import sha_blob_git
+
+
+ARQUIVO_DIARIO = '_diario_commits.jsonl'
+
+# Operações registradas, na ordem em que acontecem para cada grupo
+OPERACAO_BRANCH = 'branch'
+OPERACAO_COMMIT = 'commit'
+OPERACAO_PULL_REQUEST = 'pull_request'
+
+
+def _hash(*partes: Any) -> str:
+    return hashlib.sha256(json.dumps(partes, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def chave_branch(nome_branch: str, origem: str) -> str:
+    return _hash(OPERACAO_BRANCH, nome_branch, origem)
+
+
+def chave_commit(nome_branch: str, titulo: str, mudancas: List[Dict[str, Any]]) -> str:
+    """Identifica o commit pelo conteúdo: mesmos arquivos com os mesmos bytes dão a mesma chave"""
+    arquivos = sorted(
+        (mudanca.get("caminho_do_arquivo") or '', sha_blob_git(mudanca.get("conteudo") or ''))
+        for mudanca in mudancas
+    )
+    return _hash(OPERACAO_COMMIT, nome_branch, titulo, arquivos)
+
+
+def chave_pull_request(nome_branch: str, alvo: str, chave_do_commit: str) -> str:
+    return _hash(OPERACAO_PULL_REQUEST, nome_branch, alvo, chave_do_commit)
+
+
+class DiarioCommits:
+    """
+    Diário (uma linha JSON por operação, só acréscimos) das branches, commits e PRs que
+    a etapa de commit de um job já criou. Cada operação é registrada logo depois de
+    concluída no GitHub; ao rodar a etapa de novo (retomada do job), o que já está no
+    diário é reaproveitado e só as operações que faltaram são feitas.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._entradas: Dict[Tuple[str, str], Dict[str, Any]] = self._carregar()
+        self.reaproveitadas = 0
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+
+    def _carregar(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        entradas = {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    try:
+                        entrada = json.loads(linha)
+                    except ValueError:
+                        # Última linha cortada por uma queda no meio da gravação: a operação refaz
+                        continue
+                    entradas[(entrada["operacao"], entrada["chave"])] = entrada.get("dados") or {}
+        except FileNotFoundError:
+            pass
+        if entradas:
+            print(f"📓 Diário de commits com {len(entradas)} operação(ões) já concluída(s)")
+        return entradas
+
+    def concluida(self, operacao: str, chave: str) -> Optional[Dict[str, Any]]:
+        """Dados registrados da operação, ou None se ela ainda não foi feita"""
+        with self._lock:
+            dados = self._entradas.get((operacao, chave))
+            if dados is not None:
+                self.reaproveitadas += 1
+            return dados
+
+    def registrar(self, operacao: str, chave: str, dados: Optional[Dict[str, Any]] = None) -> None:
+        linha = json.dumps({"operacao": operacao, "chave": chave, "dados": dados or {}, "em": time.time()},
+                           ensure_ascii=False)
+        with self._lock:
+            try:
+                with open(self.caminho, 'a', encoding='utf-8') as f:
+                    f.write(linha + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                # Pasta apagada com o job (removido durante o commit): não há retomada a proteger
+                print(f"⚠️ Diário de commits removido junto com o job, operação não registrada: {operacao}")
+            self._entradas[(operacao, chave)] = dados or {}
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+class CommitParcialError(RuntimeError):
+    """Alguns grupos não foram enviados; o que foi feito está no diário e a retomada completa o resto"""
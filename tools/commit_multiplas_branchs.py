@@ -1,21 +1,54 @@
 # tools/commit_multiplas_branchs.py - CORREÇÃO MÍNIMA DO ERRO 404
 
+import os
 import json
+import contextvars
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from github import GithubException
-from tools import github_connector
+from tools import github_connector, git_data
+from tools.cancelamento import verificar_cancelamento, JobCanceladoError
+from tools.commit_journal import (
+    CommitParcialError, DiarioCommits, OPERACAO_BRANCH, OPERACAO_COMMIT, OPERACAO_PULL_REQUEST,
+    chave_branch, chave_commit, chave_pull_request
+)
 
-def _processar_uma_branch(
-    repo,
-    nome_branch: str,
-    branch_de_origem: str,
-    branch_alvo_do_pr: str,
-    mensagem_pr: str,
-    descricao_pr: str,
-    conjunto_de_mudancas: list
-):
-    print(f"\n--- Processando o Lote para a Branch: '{nome_branch}' ---")
-    
-    # 1. Criação da Branch (COM CORREÇÃO DO 404)
+class CommitConfig:
+    """Configurações do envio das mudanças (variáveis de ambiente)"""
+    # Modo independente: quantos grupos são commitados ao mesmo tempo
+    MAX_BRANCHES_PARALELAS = int(os.getenv('COMMIT_MAX_BRANCHES_PARALELAS', 4))
+
+def criar_pull_request(repo, nome_branch: str, branch_alvo_do_pr: str, mensagem_pr: str, descricao_pr: str):
+    """Abre o PR da branch; retorna a URL, ou None se já existia ou falhou"""
+    try:
+        print(f"\n🔄 Criando Pull Request de '{nome_branch}' para '{branch_alvo_do_pr}'...")
+        pr_body = descricao_pr if descricao_pr else mensagem_pr
+        pr = repo.create_pull(
+            title=mensagem_pr, 
+            body=pr_body, 
+            head=nome_branch, 
+            base=branch_alvo_do_pr
+        )
+        print(f"🎉 Pull Request criado com sucesso! {pr.html_url}")
+        return pr.html_url
+    except GithubException as e:
+        if e.status == 422 and "A pull request for these commits already exists" in str(e.data.get('message', '')):
+            print(f"⚠️ Pull Request para a branch '{nome_branch}' já existe.")
+            return _pull_request_existente(repo, nome_branch, branch_alvo_do_pr)
+        else:
+            print(f"❌ Erro ao criar Pull Request: {e}")
+    return None
+
+def _pull_request_existente(repo, nome_branch: str, branch_alvo_do_pr: str):
+    """URL do PR aberto da branch para o alvo, ou None se não foi possível encontrá-lo"""
+    try:
+        for pr in repo.get_pulls(state='open', head=f"{repo.owner.login}:{nome_branch}", base=branch_alvo_do_pr):
+            return pr.html_url
+    except GithubException as e:
+        print(f"⚠️ Não foi possível consultar o Pull Request existente: {e}")
+    return None
+
+def _criar_branch(repo, nome_branch: str, branch_de_origem: str) -> None:
     print(f"Criando ou reutilizando a branch '{nome_branch}' a partir de '{branch_de_origem}'...")
     try:
         # CORREÇÃO: Verificar se a branch de origem existe primeiro
@@ -39,102 +72,267 @@ def _processar_uma_branch(
             print(f"❌ Erro ao criar branch: {e}")
             raise
 
+def _processar_uma_branch(
+    repo,
+    nome_branch: str,
+    branch_de_origem: str,
+    branch_alvo_do_pr: str,
+    mensagem_pr: str,
+    descricao_pr: str,
+    conjunto_de_mudancas: list,
+    diario: Optional[DiarioCommits] = None
+):
+    print(f"\n--- Processando o Lote para a Branch: '{nome_branch}' ---")
+    
+    # 1. Criação da Branch (COM CORREÇÃO DO 404)
+    chave_da_branch = chave_branch(nome_branch, branch_de_origem)
+    if diario is not None and diario.concluida(OPERACAO_BRANCH, chave_da_branch) is not None:
+        print(f"📓 Branch '{nome_branch}' já criada em uma execução anterior deste job.")
+    else:
+        _criar_branch(repo, nome_branch, branch_de_origem)
+        if diario is not None:
+            diario.registrar(OPERACAO_BRANCH, chave_da_branch, {"branch": nome_branch, "origem": branch_de_origem})
+
     # 2. Loop de Commits (MANTIDO ORIGINAL COM PEQUENAS MELHORIAS)
+    resumo = {"commit": None, "criados": 0, "modificados": 0, "inalterados": 0, "ignorados": 0, "pull_request": None}
     if not conjunto_de_mudancas:
         print("⚠️ Nenhuma mudança para aplicar nesta branch.")
-        return
+        return resumo
 
-    print("📝 Iniciando a aplicação dos arquivos (um commit por arquivo)...")
-    commits_realizados = 0
+    print("📝 Iniciando a aplicação dos arquivos (um único commit para o grupo)...")
+    mudancas_para_commit = []
     
     for mudanca in conjunto_de_mudancas:
+        verificar_cancelamento()
         caminho = mudanca.get("caminho_do_arquivo")
         conteudo = mudanca.get("conteudo")
-        justificativa = mudanca.get("justificativa", "")
 
         # CORREÇÃO: Validações mais rigorosas
         if conteudo is None:
             print(f"  [IGNORADO] ⚠️ Arquivo '{caminho}' tem conteúdo nulo (None).")
+            resumo["ignorados"] += 1
             continue
         if not caminho:
             print(f"  [IGNORADO] ⚠️ Mudança sem caminho de arquivo.")
+            resumo["ignorados"] += 1
             continue
         if conteudo == "":
             print(f"  [IGNORADO] ⚠️ Arquivo '{caminho}' tem conteúdo vazio.")
+            resumo["ignorados"] += 1
             continue
+        mudancas_para_commit.append(mudanca)
 
-        sha_arquivo_existente = None
-        try:
-            arquivo_existente = repo.get_contents(caminho, ref=nome_branch)
-            sha_arquivo_existente = arquivo_existente.sha
-        except GithubException as e:
-            if e.status != 404:
-                print(f"❌ Erro ao verificar arquivo '{caminho}': {e}")
-                continue
-        
+    commits_realizados = 0
+    titulo_commit = f"refactor: {mensagem_pr}"
+    chave_do_commit = chave_commit(nome_branch, titulo_commit, mudancas_para_commit)
+    registrado = diario.concluida(OPERACAO_COMMIT, chave_do_commit) if diario is not None else None
+    if registrado is not None:
+        # Mesmo conteúdo já commitado antes: nem a árvore da branch é consultada de novo
+        print(f"📓 Commit do grupo já feito em uma execução anterior ({registrado['commit'][:7] if registrado.get('commit') else 'sem mudanças'}).")
+        resumo.update(registrado)
+        commits_realizados = 1 if resumo["commit"] else 0
+    elif mudancas_para_commit:
+        verificar_cancelamento()
         try:
-            assunto_commit = f"feat: {caminho}" if not sha_arquivo_existente else f"refactor: {caminho}"
-            commit_message_completo = f"{assunto_commit}\n\n{justificativa}" if justificativa else assunto_commit
-
-            if sha_arquivo_existente:
-                repo.update_file(
-                    path=caminho, 
-                    message=commit_message_completo, 
-                    content=conteudo, 
-                    sha=sha_arquivo_existente, 
-                    branch=nome_branch
-                )
-                print(f"  ✅ [MODIFICADO] {caminho}")
-            else:
-                repo.create_file(
-                    path=caminho, 
-                    message=commit_message_completo, 
-                    content=conteudo, 
-                    branch=nome_branch
-                )
-                print(f"  ✅ [CRIADO] {caminho}")
+            # Árvore nova + um commit + fast-forward: atômico e poucas chamadas por grupo.
+            # Arquivos idênticos ao da branch (SHA de blob local) não são regravados.
+            resultado = git_data.commit_atomico(repo, nome_branch, mudancas_para_commit,
+                                                titulo_commit, descricao_pr)
+            resumo.update(commit=resultado.sha, criados=len(resultado.criados),
+                          modificados=len(resultado.modificados), inalterados=len(resultado.inalterados))
+            if resultado.sha:
+                commits_realizados = 1
+                for caminho in resultado.criados:
+                    print(f"  ✅ [CRIADO] {caminho}")
+                for caminho in resultado.modificados:
+                    print(f"  ✅ [MODIFICADO] {caminho}")
+            for caminho in resultado.inalterados:
+                print(f"  [INALTERADO] {caminho}")
+            if diario is not None:
+                diario.registrar(OPERACAO_COMMIT, chave_do_commit, {
+                    chave: resumo[chave] for chave in ("commit", "criados", "modificados", "inalterados", "ignorados")
+                })
+        except (GithubException, git_data.FastForwardError) as e:
+            print(f"❌ Erro ao commitar os arquivos da branch '{nome_branch}': {e}")
+            resumo["erro"] = str(e)
             
-            commits_realizados += 1
-            
-        except GithubException as e:
-            print(f"❌ Erro ao commitar arquivo '{caminho}': {e}")
-            
-    print(f"📊 Aplicação de commits concluída: {commits_realizados}/{len(conjunto_de_mudancas)} arquivos processados")
+    print(f"📊 Aplicação de commits concluída: {resumo['criados'] + resumo['modificados']}/{len(conjunto_de_mudancas)} arquivos gravados "
+          f"em {commits_realizados} commit ({resumo['inalterados']} inalterados)")
 
     # 3. Criação do Pull Request (APENAS SE HOUVE COMMITS)
     if commits_realizados > 0:
-        try:
-            print(f"\n🔄 Criando Pull Request de '{nome_branch}' para '{branch_alvo_do_pr}'...")
-            pr_body = descricao_pr if descricao_pr else mensagem_pr
-            pr = repo.create_pull(
-                title=mensagem_pr, 
-                body=pr_body, 
-                head=nome_branch, 
-                base=branch_alvo_do_pr
-            )
-            print(f"🎉 Pull Request criado com sucesso! {pr.html_url}")
-        except GithubException as e:
-            if e.status == 422 and "A pull request for these commits already exists" in str(e.data.get('message', '')):
-                print(f"⚠️ Pull Request para a branch '{nome_branch}' já existe.")
-            else:
-                print(f"❌ Erro ao criar Pull Request: {e}")
+        chave_do_pr = chave_pull_request(nome_branch, branch_alvo_do_pr, chave_do_commit)
+        registrado = diario.concluida(OPERACAO_PULL_REQUEST, chave_do_pr) if diario is not None else None
+        if registrado is not None:
+            print(f"📓 Pull Request já aberto em uma execução anterior: {registrado.get('url')}")
+            resumo["pull_request"] = registrado.get("url")
+        else:
+            resumo["pull_request"] = criar_pull_request(repo, nome_branch, branch_alvo_do_pr, mensagem_pr, descricao_pr)
+            if diario is not None:
+                if resumo["pull_request"]:
+                    diario.registrar(OPERACAO_PULL_REQUEST, chave_do_pr, {"url": resumo["pull_request"]})
+                else:
+                    resumo["erro"] = "Pull Request não criado"
     else:
         print(f"⚠️ Nenhum commit foi realizado, pulando criação de PR")
+    return resumo
+
+def _grupos_validos(lista_de_grupos: list) -> list:
+    """Grupos com branch e ao menos uma mudança com conteúdo, já com os campos do PR extraídos"""
+    grupos = []
+    for grupo_atual in lista_de_grupos:
+        nome_da_branch_atual = grupo_atual.get("branch_sugerida")
+        conjunto_de_mudancas = grupo_atual.get("conjunto_de_mudancas", [])
+
+        # Validação básica
+        if not nome_da_branch_atual:
+            print("⚠️ Um grupo foi ignorado por não ter uma 'branch_sugerida'.")
+            continue
+
+        # CORREÇÃO: Verificar se há mudanças válidas
+        mudancas_validas = [
+            m for m in conjunto_de_mudancas 
+            if m.get('conteudo') is not None and m.get('conteudo') != ""
+        ]
+        
+        if not mudancas_validas:
+            print(f"⚠️ GRUPO IGNORADO: '{nome_da_branch_atual}' - Sem mudanças válidas para aplicar")
+            continue
+
+        grupos.append({
+            "nome_branch": nome_da_branch_atual,
+            "mensagem_pr": grupo_atual.get("titulo_pr", "Refatoração Automática"),
+            "descricao_pr": grupo_atual.get("resumo_do_pr", ""),
+            "conjunto_de_mudancas": mudancas_validas  # Usar apenas mudanças válidas
+        })
+    return grupos
+
+def _somar_resumo(resumo: dict, nome_branch: str, resumo_branch: dict) -> None:
+    resumo["branches"][nome_branch] = resumo_branch
+    resumo["commits"] += 1 if resumo_branch["commit"] else 0
+    for chave in ("criados", "modificados", "inalterados", "ignorados"):
+        resumo[chave] += resumo_branch[chave]
+
+def _avisar_arquivos_em_comum(grupos: list) -> None:
+    """No modo independente, o mesmo arquivo em dois grupos gera PRs que conflitam entre si"""
+    donos = {}
+    for grupo in grupos:
+        for mudanca in grupo["conjunto_de_mudancas"]:
+            donos.setdefault(mudanca.get("caminho_do_arquivo"), []).append(grupo["nome_branch"])
+    for caminho, branches in donos.items():
+        if len(set(branches)) > 1:
+            print(f"⚠️ '{caminho}' aparece em {len(set(branches))} grupos ({', '.join(sorted(set(branches)))}): os PRs vão conflitar")
+
+def _processar_grupos_empilhados(repo, grupos: list, base_branch: str, resumo: dict,
+                                 diario: Optional[DiarioCommits] = None) -> int:
+    """Cada grupo sai da branch do grupo anterior (PRs empilhados), um de cada vez"""
+    branch_anterior = base_branch
+    grupos_processados = 0
+    for grupo in grupos:
+        verificar_cancelamento()
+        nome_da_branch_atual = grupo["nome_branch"]
+        print(f"\n📦 Processando grupo: '{nome_da_branch_atual}' ({len(grupo['conjunto_de_mudancas'])} mudanças)")
+
+        try:
+            resumo_branch = _processar_uma_branch(
+                repo=repo,
+                branch_de_origem=branch_anterior,
+                branch_alvo_do_pr=branch_anterior,
+                diario=diario,
+                **grupo
+            )
+            
+            # Atualizar para próximo grupo (empilhamento)
+            branch_anterior = nome_da_branch_atual
+            _somar_resumo(resumo, nome_da_branch_atual, resumo_branch)
+            if resumo_branch.get("erro"):
+                print(f"❌ Grupo '{nome_da_branch_atual}' incompleto: {resumo_branch['erro']}")
+                resumo["falhas"][nome_da_branch_atual] = resumo_branch["erro"]
+                continue
+            grupos_processados += 1
+            print(f"✅ Grupo '{nome_da_branch_atual}' processado com sucesso!")
+            
+        except JobCanceladoError:
+            raise
+        except Exception as e:
+            print(f"❌ Erro no grupo '{nome_da_branch_atual}': {e}")
+            resumo["falhas"][nome_da_branch_atual] = str(e)
+            # Continuar com próximo grupo sem interromper todo o processo
+            continue
+    return grupos_processados
+
+def _processar_grupos_em_paralelo(repo, grupos: list, base_branch: str, resumo: dict,
+                                  diario: Optional[DiarioCommits] = None) -> int:
+    """Cada grupo sai da branch base e é processado (commit + PR) ao mesmo tempo que os outros"""
+    _avisar_arquivos_em_comum(grupos)
+    max_paralelos = max(1, min(CommitConfig.MAX_BRANCHES_PARALELAS, len(grupos)))
+    print(f"🔀 Modo independente: {len(grupos)} grupo(s) a partir de '{base_branch}', até {max_paralelos} em paralelo")
+
+    grupos_processados = 0
+    with ThreadPoolExecutor(max_workers=max_paralelos, thread_name_prefix="commit-grupo") as executor:
+        # Cada tarefa roda em uma cópia do contexto: o token de cancelamento do job vale nas threads
+        futuros = {
+            executor.submit(
+                contextvars.copy_context().run, _processar_uma_branch,
+                repo=repo,
+                branch_de_origem=base_branch,
+                branch_alvo_do_pr=base_branch,
+                diario=diario,
+                **grupo
+            ): grupo["nome_branch"]
+            for grupo in grupos
+        }
+        for futuro in as_completed(futuros):
+            nome_branch = futuros[futuro]
+            try:
+                resumo_branch = futuro.result()
+                _somar_resumo(resumo, nome_branch, resumo_branch)
+                if resumo_branch.get("erro"):
+                    print(f"❌ Grupo '{nome_branch}' incompleto: {resumo_branch['erro']}")
+                    resumo["falhas"][nome_branch] = resumo_branch["erro"]
+                    continue
+                grupos_processados += 1
+                print(f"✅ Grupo '{nome_branch}' processado com sucesso!")
+            except JobCanceladoError:
+                for pendente in futuros:
+                    pendente.cancel()
+                raise
+            except Exception as e:
+                print(f"❌ Erro no grupo '{nome_branch}': {e}")
+                resumo["falhas"][nome_branch] = str(e)
+    return grupos_processados
 
 def processar_e_subir_mudancas_agrupadas(
     nome_repo: str,
     dados_agrupados,
-    base_branch: str = "main"
+    base_branch: str = "main",
+    independentes: bool = False,
+    diario: Optional[DiarioCommits] = None
 ):
     """
     Função principal que orquestra a criação de múltiplas branches e PRs
     (MANTIDA ORIGINAL COM CORREÇÕES MÍNIMAS)
+    
+    Por padrão os grupos são empilhados: cada branch sai da branch do grupo anterior.
+    Com `independentes=True`, todas saem da base e os grupos são processados em paralelo
+    (até CommitConfig.MAX_BRANCHES_PARALELAS ao mesmo tempo).
+    
+    Retorna o resumo do que foi gravado: totais de arquivos criados, modificados,
+    inalterados (conteúdo idêntico, não regravados) e ignorados, e o detalhe por branch.
+    
+    Com um `diario` (ver tools/commit_journal.py), branches, commits e PRs já criados
+    por uma execução anterior não são refeitos, e se algum grupo falhar a função
+    termina com CommitParcialError (depois de processar os demais) para que a
+    retomada do job complete só o que faltou.
     """
     try:
         if isinstance(dados_agrupados, str):
             dados_agrupados = json.loads(dados_agrupados)
 
-        print("🚀 --- Iniciando o Processo de Pull Requests Empilhados ---")
+        if independentes:
+            print("🚀 --- Iniciando o Processo de Pull Requests Independentes ---")
+        else:
+            print("🚀 --- Iniciando o Processo de Pull Requests Empilhados ---")
         repo = github_connector.connection(repositorio=nome_repo)
         print(f"✅ Conectado ao repositório: {repo.full_name}")
 
@@ -154,59 +352,33 @@ def processar_e_subir_mudancas_agrupadas(
         # Processar grupos (MANTIDO ORIGINAL)
         lista_de_grupos = dados_agrupados.get("grupos", [])
         
+        resumo = {"grupos_processados": 0, "commits": 0, "criados": 0, "modificados": 0,
+                  "inalterados": 0, "ignorados": 0, "branches": {}, "falhas": {}}
         if not lista_de_grupos:
             print("⚠️ Nenhum grupo de mudanças encontrado para processar.")
-            return
+            return resumo
 
         print(f"📋 Processando {len(lista_de_grupos)} grupo(s) de mudanças...")
+        grupos = _grupos_validos(lista_de_grupos)
 
-        grupos_processados = 0
-        for grupo_atual in lista_de_grupos:
-            nome_da_branch_atual = grupo_atual.get("branch_sugerida")
-            resumo_do_pr = grupo_atual.get("titulo_pr", "Refatoração Automática")
-            descricao_do_pr = grupo_atual.get("resumo_do_pr", "")
-            conjunto_de_mudancas = grupo_atual.get("conjunto_de_mudancas", [])
-
-            # Validação básica
-            if not nome_da_branch_atual:
-                print("⚠️ Um grupo foi ignorado por não ter uma 'branch_sugerida'.")
-                continue
-
-            # CORREÇÃO: Verificar se há mudanças válidas
-            mudancas_validas = [
-                m for m in conjunto_de_mudancas 
-                if m.get('conteudo') is not None and m.get('conteudo') != ""
-            ]
-            
-            if not mudancas_validas:
-                print(f"⚠️ GRUPO IGNORADO: '{nome_da_branch_atual}' - Sem mudanças válidas para aplicar")
-                continue
-
-            print(f"\n📦 Processando grupo: '{nome_da_branch_atual}' ({len(mudancas_validas)} mudanças)")
-
-            try:
-                _processar_uma_branch(
-                    repo=repo,
-                    nome_branch=nome_da_branch_atual,
-                    branch_de_origem=branch_anterior,
-                    branch_alvo_do_pr=branch_anterior,
-                    mensagem_pr=resumo_do_pr,
-                    descricao_pr=descricao_do_pr,
-                    conjunto_de_mudancas=mudancas_validas  # Usar apenas mudanças válidas
-                )
-                
-                # Atualizar para próximo grupo (empilhamento)
-                branch_anterior = nome_da_branch_atual
-                grupos_processados += 1
-                print(f"✅ Grupo '{nome_da_branch_atual}' processado com sucesso!")
-                
-            except Exception as e:
-                print(f"❌ Erro no grupo '{nome_da_branch_atual}': {e}")
-                # Continuar com próximo grupo sem interromper todo o processo
-                continue
+        if independentes:
+            grupos_processados = _processar_grupos_em_paralelo(repo, grupos, branch_anterior, resumo, diario)
+        else:
+            grupos_processados = _processar_grupos_empilhados(repo, grupos, branch_anterior, resumo, diario)
 
         print(f"\n🎉 === PROCESSO CONCLUÍDO ===")
         print(f"✅ {grupos_processados}/{len(lista_de_grupos)} grupos processados com sucesso!")
+        print(f"📊 {resumo['criados']} criado(s), {resumo['modificados']} modificado(s), "
+              f"{resumo['inalterados']} inalterado(s) em {resumo['commits']} commit(s)")
+        resumo["grupos_processados"] = grupos_processados
+        if diario is not None:
+            resumo["operacoes_reaproveitadas"] = diario.reaproveitadas
+            print(f"📓 {diario.reaproveitadas} operação(ões) reaproveitada(s) do diário")
+            if resumo["falhas"]:
+                raise CommitParcialError(
+                    f"{len(resumo['falhas'])} grupo(s) não enviado(s): {', '.join(resumo['falhas'])}"
+                )
+        return resumo
 
     except Exception as e:
         print(f"❌ ERRO FATAL NO ORQUESTRADOR: {e}")
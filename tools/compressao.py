@@ -0,0 +1,101 @@
+# tools/compressao.py - COMPRESSÃO DOS RELATÓRIOS GUARDADOS NOS JOBS
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from tools.job_store import ValorPreguicoso
+
+# zstandard é opcional: sem ele usamos gzip (biblioteca padrão)
+try:
+    import zstandard
+    _compressor_zstd = zstandard.ZstdCompressor(level=10)
+    _descompressor_zstd = zstandard.ZstdDecompressor()
+    ZSTD_DISPONIVEL = True
+except Exception:
+    _compressor_zstd = _descompressor_zstd = None
+    ZSTD_DISPONIVEL = False
+
+CODEC_PADRAO = 'zstd' if ZSTD_DISPONIVEL else 'gzip'
+
+# Textos menores que isso ficam como estão (o ganho não paga a descompressão)
+TAMANHO_MINIMO_COMPRESSAO = int(os.getenv('JOBS_COMPRESSAO_MINIMO', 4096))
+
+# Quantos relatórios descomprimidos ficam em cache (clientes fazem polling do mesmo job)
+MAX_DESCOMPRIMIDOS_EM_CACHE = int(os.getenv('JOBS_COMPRESSAO_CACHE', 16))
+
+
+def comprimir(texto: str, codec: str = CODEC_PADRAO) -> bytes:
+    dados = texto.encode('utf-8')
+    if codec == 'zstd':
+        return _compressor_zstd.compress(dados)
+    return gzip.compress(dados, compresslevel=6)
+
+
+def descomprimir(dados: bytes, codec: str) -> str:
+    if codec == 'zstd':
+        if _descompressor_zstd is None:
+            raise RuntimeError("Relatório comprimido com zstd, mas o pacote zstandard não está instalado")
+        return _descompressor_zstd.decompress(dados).decode('utf-8')
+    return gzip.decompress(dados).decode('utf-8')
+
+
+_cache_descomprimidos: "OrderedDict[int, Tuple[RelatorioComprimido, str]]" = OrderedDict()
+_lock_cache = threading.Lock()
+
+
+class RelatorioComprimido(ValorPreguicoso):
+    """Texto comprimido em memória; descomprimido só quando lido (com um pequeno cache LRU)"""
+
+    def __init__(self, dados: bytes, codec: str, tamanho: int):
+        self.dados = dados
+        self.codec = codec
+        self.tamanho = tamanho
+
+    @classmethod
+    def de_texto(cls, texto: str, codec: str = CODEC_PADRAO) -> "RelatorioComprimido":
+        return cls(comprimir(texto, codec), codec, len(texto))
+
+    def carregar(self) -> str:
+        chave = id(self)
+        with _lock_cache:
+            item = _cache_descomprimidos.get(chave)
+            if item is not None and item[0] is self:
+                _cache_descomprimidos.move_to_end(chave)
+                return item[1]
+        texto = descomprimir(self.dados, self.codec)
+        with _lock_cache:
+            # Guardar a própria instância no cache impede que o id seja reaproveitado
+            _cache_descomprimidos[chave] = (self, texto)
+            while len(_cache_descomprimidos) > MAX_DESCOMPRIMIDOS_EM_CACHE:
+                _cache_descomprimidos.popitem(last=False)
+        return texto
+
+    def __len__(self) -> int:
+        return self.tamanho
+
+    @property
+    def bytes_em_memoria(self) -> int:
+        return len(self.dados)
+
+    def descartar(self) -> None:
+        with _lock_cache:
+            _cache_descomprimidos.pop(id(self), None)
+
+
+def comprimir_relatorio(dados, chave: str = 'analysis_report') -> int:
+    """
+    Troca o texto em `dados[chave]` (dict de um job) pela versão comprimida, sem gerar
+    nova versão do job. Retorna os bytes economizados (0 se não valeu a pena).
+    """
+    if not dados:
+        return 0
+    texto = dados.obter_bruto(chave)
+    if not isinstance(texto, str) or len(texto) < TAMANHO_MINIMO_COMPRESSAO:
+        return 0
+    comprimido = RelatorioComprimido.de_texto(texto)
+    if comprimido.bytes_em_memoria >= len(texto):
+        return 0
+    dados.substituir_bruto(chave, comprimido)
+    return len(texto) - comprimido.bytes_em_memoria
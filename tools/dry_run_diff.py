@@ -0,0 +1,99 @@
+# tools/dry_run_diff.py - PRÉVIA (DRY-RUN) DAS MUDANÇAS: DIFFS UNIFICADOS CONTRA O SNAPSHOT DA BASE
+import os
+import time
+import difflib
+from typing import Any, Dict, List, Optional
+
+
+class DryRunConfig:
+    """Configurações da prévia das mudanças (variáveis de ambiente)"""
+    LINHAS_CONTEXTO = int(os.getenv('DRY_RUN_LINHAS_CONTEXTO', 3))
+    # Diffs maiores que isso são cortados no relatório (as estatísticas continuam completas)
+    MAX_LINHAS_DIFF_POR_ARQUIVO = int(os.getenv('DRY_RUN_MAX_LINHAS_DIFF', 2000))
+
+
+def diff_arquivo(caminho: str, original: Optional[str], novo: str, config=DryRunConfig) -> Dict[str, Any]:
+    """Diff unificado de um arquivo e suas contagens de linhas adicionadas/removidas"""
+    if original == novo:
+        return {"caminho": caminho, "status": "inalterado", "adicionadas": 0, "removidas": 0, "diff": ""}
+
+    linhas = list(difflib.unified_diff(
+        (original or '').splitlines(keepends=True),
+        novo.splitlines(keepends=True),
+        fromfile=f"a/{caminho}" if original is not None else "/dev/null",
+        tofile=f"b/{caminho}",
+        n=config.LINHAS_CONTEXTO
+    ))
+    adicionadas = sum(1 for linha in linhas[2:] if linha.startswith('+'))
+    removidas = sum(1 for linha in linhas[2:] if linha.startswith('-'))
+    # Linhas sem quebra no fim do arquivo recebem uma, para o patch continuar legível
+    linhas = [linha if linha.endswith('\n') else linha + '\n\\ No newline at end of file\n' for linha in linhas]
+    cortado = len(linhas) > config.MAX_LINHAS_DIFF_POR_ARQUIVO
+    if cortado:
+        linhas = linhas[:config.MAX_LINHAS_DIFF_POR_ARQUIVO]
+    return {
+        "caminho": caminho,
+        "status": "criado" if original is None else "modificado",
+        "adicionadas": adicionadas,
+        "removidas": removidas,
+        "diff": ''.join(linhas),
+        **({"diff_cortado": True} if cortado else {})
+    }
+
+
+def _estatisticas(arquivos: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {
+        "arquivos": len(arquivos),
+        "criados": sum(1 for a in arquivos if a["status"] == "criado"),
+        "modificados": sum(1 for a in arquivos if a["status"] == "modificado"),
+        "inalterados": sum(1 for a in arquivos if a["status"] == "inalterado"),
+        "ignorados": sum(1 for a in arquivos if a["status"] == "ignorado"),
+        "adicionadas": sum(a["adicionadas"] for a in arquivos),
+        "removidas": sum(a["removidas"] for a in arquivos),
+    }
+
+
+def gerar_relatorio_diff(dados_agrupados: Dict[str, Any], snapshot: Dict[str, str],
+                         config=DryRunConfig) -> Dict[str, Any]:
+    """
+    Prévia do que o commit faria, sem tocar no GitHub: para cada grupo ({'grupos': [...]},
+    formato do commit), o diff de cada arquivo proposto contra o `snapshot` da base
+    ({caminho: conteúdo}) e as estatísticas do grupo; no fim, os totais.
+    """
+    inicio = time.perf_counter()
+    grupos = []
+    for grupo in (dados_agrupados or {}).get("grupos", []):
+        arquivos = []
+        for mudanca in grupo.get("conjunto_de_mudancas", []):
+            caminho = mudanca.get("caminho_do_arquivo")
+            conteudo = mudanca.get("conteudo")
+            if not caminho or not conteudo:
+                # O commit também ignora mudanças sem caminho ou sem conteúdo
+                arquivos.append({"caminho": caminho, "status": "ignorado", "adicionadas": 0, "removidas": 0, "diff": ""})
+                continue
+            arquivos.append(diff_arquivo(caminho, snapshot.get(caminho), conteudo, config))
+        grupos.append({
+            "branch": grupo.get("branch_sugerida"),
+            "titulo_pr": grupo.get("titulo_pr", ""),
+            "estatisticas": _estatisticas(arquivos),
+            "arquivos": arquivos
+        })
+
+    todos = [arquivo for grupo in grupos for arquivo in grupo["arquivos"]]
+    return {
+        "grupos": grupos,
+        "totais": {**_estatisticas(todos), "grupos": len(grupos)},
+        "arquivos_no_snapshot": len(snapshot),
+        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2)
+    }
+
+
+def relatorio_como_patch(relatorio: Dict[str, Any]) -> str:
+    """Todos os diffs em um único texto de patch, com um cabeçalho por grupo"""
+    partes = []
+    for grupo in relatorio.get("grupos", []):
+        estatisticas = grupo["estatisticas"]
+        partes.append(f"# Grupo: {grupo['branch']} - {grupo['titulo_pr']} "
+                      f"(+{estatisticas['adicionadas']} -{estatisticas['removidas']}, {estatisticas['arquivos']} arquivo(s))\n")
+        partes.extend(arquivo["diff"] for arquivo in grupo["arquivos"] if arquivo["diff"])
+    return ''.join(partes)
@@ -0,0 +1,202 @@
+# tools/git_data.py - COMMIT ATÔMICO DE VÁRIOS ARQUIVOS VIA GIT DATA API
+import os
+import hashlib
+import posixpath
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+from github import GithubException, InputGitTreeElement
+
+
+class GitDataConfig:
+    """Configurações do commit via Git Data API (variáveis de ambiente)"""
+
+    # Conteúdo enviado direto na criação da árvore (sem chamada de blob), somado por commit
+    TAMANHO_MAXIMO_INLINE = int(os.getenv('GIT_DATA_TAMANHO_MAXIMO_INLINE', 512 * 1024))
+
+    # Novas tentativas quando a branch anda entre a leitura da ref e o fast-forward
+    TENTATIVAS_FAST_FORWARD = int(os.getenv('GIT_DATA_TENTATIVAS_FAST_FORWARD', 3))
+
+
+MODO_ARQUIVO = '100644'
+
+
+@dataclass
+class ItemArvore:
+    """Arquivo na árvore de uma branch"""
+    sha: str
+    modo: str = MODO_ARQUIVO
+
+
+@dataclass
+class ResultadoCommit:
+    """O que um commit atômico gravou (ou deixou de gravar por não haver mudança)"""
+    sha: Optional[str] = None
+    criados: List[str] = field(default_factory=list)
+    modificados: List[str] = field(default_factory=list)
+    inalterados: List[str] = field(default_factory=list)
+
+    @property
+    def gravados(self) -> List[str]:
+        return self.criados + self.modificados
+
+
+class FastForwardError(Exception):
+    """A branch recebeu commits de outra origem e não foi possível avançá-la sem forçar"""
+
+
+def _nao_e_fast_forward(e: GithubException) -> bool:
+    return e.status == 422 and 'fast forward' in str(e.data).lower()
+
+
+def sha_blob_git(conteudo: str) -> str:
+    """SHA que o git daria ao conteúdo como blob (mesma codificação UTF-8 usada no envio)"""
+    dados = conteudo.encode('utf-8')
+    return hashlib.sha1(b'blob %d\0' % len(dados) + dados).hexdigest()
+
+
+def listar_arvore(repo, sha_arvore: str, caminhos: Optional[Iterable[str]] = None) -> Dict[str, ItemArvore]:
+    """
+    Arquivos (blobs) da árvore inteira, por caminho, em uma única chamada recursiva.
+    Em repositórios grandes o GitHub trunca a listagem; nesse caso os diretórios de
+    `caminhos` são lidos um a um, para que existência e SHA deles continuem corretos.
+    """
+    arvore = repo.get_git_tree(sha_arvore, recursive=True)
+    itens = {item.path: ItemArvore(item.sha, item.mode) for item in arvore.tree if item.type == 'blob'}
+    if getattr(arvore, 'truncated', False):
+        if caminhos is None:
+            print(f"⚠️ Listagem da árvore {sha_arvore[:7]} veio truncada; arquivos fora dela serão tratados como novos")
+        else:
+            itens.update(_listar_diretorios(repo, sha_arvore, {posixpath.dirname(c) for c in caminhos}))
+    return itens
+
+
+def arvore_da_branch(repo, nome_branch: str, caminhos: Optional[Iterable[str]] = None) -> Dict[str, ItemArvore]:
+    """Arquivos do topo atual da branch (ver `listar_arvore`)"""
+    ref = repo.get_git_ref(f"heads/{nome_branch}")
+    commit = repo.get_git_commit(ref.object.sha)
+    return listar_arvore(repo, commit.tree.sha, caminhos)
+
+
+def _listar_diretorios(repo, sha_raiz: str, diretorios: Set[str]) -> Dict[str, ItemArvore]:
+    """Blobs dos diretórios pedidos, descendo nível a nível (uma chamada por diretório visitado)"""
+    shas_diretorios = {'': sha_raiz}
+    conteudos: Dict[str, list] = {}
+    itens: Dict[str, ItemArvore] = {}
+
+    def _conteudo(diretorio: str) -> Optional[list]:
+        if diretorio in conteudos:
+            return conteudos[diretorio]
+        if diretorio not in shas_diretorios:
+            pai = posixpath.dirname(diretorio)
+            if _conteudo(pai) is None or diretorio not in shas_diretorios:
+                conteudos[diretorio] = None
+                return None
+        lista = repo.get_git_tree(shas_diretorios[diretorio]).tree
+        for item in lista:
+            caminho = posixpath.join(diretorio, item.path) if diretorio else item.path
+            if item.type == 'tree':
+                shas_diretorios[caminho] = item.sha
+            elif item.type == 'blob':
+                itens[caminho] = ItemArvore(item.sha, item.mode)
+        conteudos[diretorio] = lista
+        return lista
+
+    for diretorio in sorted(diretorios):
+        _conteudo(diretorio)
+    return itens
+
+
+def montar_elementos_arvore(repo, mudancas: List[Dict[str, Any]], arvore_atual: Dict[str, ItemArvore],
+                            config=GitDataConfig) -> List[InputGitTreeElement]:
+    """
+    Elementos da nova árvore. Arquivos pequenos vão com o conteúdo embutido (o GitHub cria
+    o blob junto com a árvore); acima do limite, cada arquivo vira um blob próprio.
+    """
+    elementos = []
+    embutido = 0
+    for mudanca in mudancas:
+        caminho = mudanca["caminho_do_arquivo"]
+        conteudo = mudanca["conteudo"]
+        # Arquivos existentes mantêm o modo (ex.: executável)
+        modo = arvore_atual[caminho].modo if caminho in arvore_atual else MODO_ARQUIVO
+        tamanho = len(conteudo.encode('utf-8'))
+        if embutido + tamanho <= config.TAMANHO_MAXIMO_INLINE:
+            embutido += tamanho
+            elementos.append(InputGitTreeElement(caminho, modo, 'blob', content=conteudo))
+        else:
+            blob = repo.create_git_blob(conteudo, 'utf-8')
+            elementos.append(InputGitTreeElement(caminho, modo, 'blob', sha=blob.sha))
+    return elementos
+
+
+def commit_atomico(repo, nome_branch: str, mudancas: List[Dict[str, Any]], titulo: str,
+                   descricao: str = "", config=GitDataConfig) -> ResultadoCommit:
+    """
+    Grava as `mudancas` ({'caminho_do_arquivo', 'conteudo'}) em um único commit na branch:
+    árvore nova sobre a árvore atual, um commit e fast-forward da ref (nunca força).
+    Arquivos cujo SHA de blob calculado localmente já é o da branch ficam de fora; se
+    nenhum mudou, nada é gravado (`sha` None). A mensagem lista só os arquivos gravados.
+    """
+    # O mesmo caminho duas vezes invalida a árvore: vale a última versão
+    mudancas = list({mudanca["caminho_do_arquivo"]: mudanca for mudanca in mudancas}.values())
+    resultado = ResultadoCommit()
+    if not mudancas:
+        return resultado
+
+    ref = repo.get_git_ref(f"heads/{nome_branch}")
+    commit_base = repo.get_git_commit(ref.object.sha)
+    arvore_atual = listar_arvore(repo, commit_base.tree.sha, [mudanca["caminho_do_arquivo"] for mudanca in mudancas])
+
+    alteradas = []
+    for mudanca in mudancas:
+        caminho = mudanca["caminho_do_arquivo"]
+        item = arvore_atual.get(caminho)
+        if item is None:
+            resultado.criados.append(caminho)
+        elif item.sha == sha_blob_git(mudanca["conteudo"]):
+            resultado.inalterados.append(caminho)
+            continue
+        else:
+            resultado.modificados.append(caminho)
+        alteradas.append(mudanca)
+
+    if resultado.inalterados:
+        print(f"⏭️ {len(resultado.inalterados)} arquivo(s) idêntico(s) ao da branch '{nome_branch}' ignorado(s)")
+    if not alteradas:
+        print(f"⚠️ Nenhum arquivo mudou em '{nome_branch}', commit não criado")
+        return resultado
+
+    elementos = montar_elementos_arvore(repo, alteradas, arvore_atual, config)
+    mensagem = montar_mensagem_commit(titulo, alteradas, descricao)
+    for tentativa in range(1, config.TENTATIVAS_FAST_FORWARD + 1):
+        if tentativa > 1:
+            ref = repo.get_git_ref(f"heads/{nome_branch}")
+            commit_base = repo.get_git_commit(ref.object.sha)
+        arvore = repo.create_git_tree(elementos, commit_base.tree)
+        commit = repo.create_git_commit(mensagem, arvore, [commit_base])
+        try:
+            ref.edit(commit.sha, force=False)
+        except GithubException as e:
+            if not _nao_e_fast_forward(e):
+                raise
+            print(f"⚠️ A branch '{nome_branch}' mudou durante o commit (tentativa {tentativa}), refazendo sobre o novo topo...")
+            continue
+        print(f"✅ Commit {commit.sha[:7]} em '{nome_branch}' com {len(alteradas)} arquivo(s)")
+        resultado.sha = commit.sha
+        return resultado
+
+    raise FastForwardError(
+        f"Não foi possível avançar a branch '{nome_branch}' após {config.TENTATIVAS_FAST_FORWARD} tentativas"
+    )
+
+
+def montar_mensagem_commit(titulo: str, mudancas: List[Dict[str, Any]], descricao: str = "") -> str:
+    """Assunto do grupo; no corpo, a descrição e a justificativa de cada arquivo"""
+    linhas = [titulo, ""]
+    if descricao:
+        linhas += [descricao, ""]
+    for mudanca in mudancas:
+        justificativa = mudanca.get("justificativa")
+        caminho = mudanca["caminho_do_arquivo"]
+        linhas.append(f"- {caminho}: {justificativa}" if justificativa else f"- {caminho}")
+    return "\n".join(linhas).rstrip()
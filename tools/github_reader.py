@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 import logging
 from dataclasses import dataclass
 
+from tools.cancelamento import verificar_cancelamento
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -37,6 +39,9 @@ class GitHubReaderConfig:
         'agrupamento_testes': ['.py', '.js', '.ts', '.java', '.test.js', '.spec.js'],
         'relatorio_teste_unitario': ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rb', '.php', '.cs', '.ipynb']
     }
+
+    # Extensões usadas quando o tipo de análise não encontra nenhum arquivo
+    BASIC_EXTENSIONS = ['.py', '.js', '.ts', '.java', '.ipynb']
     
     # Padrões de arquivos/diretórios a serem ignorados
     SKIP_PATTERNS = [
@@ -72,6 +77,15 @@ class GitHubReader:
             return ['.py', '.js', '.ts']
         return extensions
 
+    def get_file_extensions_by_analyses(self, tipos_de_analise: List[str]) -> List[str]:
+        """União das extensões de vários tipos de análise (ordem estável, sem repetições)"""
+        extensions: List[str] = []
+        for tipo in tipos_de_analise:
+            for ext in self.get_file_extensions_by_analysis(tipo):
+                if ext not in extensions:
+                    extensions.append(ext)
+        return extensions
+
     def should_skip_file(self, file_path: str) -> bool:
         """Verifica se arquivo deve ser ignorado"""
         file_path_lower = file_path.lower()
@@ -99,8 +113,9 @@ class GitHubReader:
             return None, f"Erro ao ler {content.path}: {str(e)}"
 
     def _read_directory_recursive(self, repo, path: str, extensoes: List[str], 
-                                  result: FileReadResult, current_count: int = 0) -> None:
-        """Lê arquivos recursivamente do repositório"""
+                                  result: FileReadResult, current_count: int = 0,
+                                  branch: Optional[str] = None) -> None:
+        """Lê arquivos recursivamente do repositório (na `branch`, ou na padrão se None)"""
         
         if current_count >= self.config.MAX_FILES:
             logger.warning(f"⚠️ Limite de {self.config.MAX_FILES} arquivos atingido")
@@ -108,7 +123,8 @@ class GitHubReader:
         
         try:
             logger.debug(f"📂 Explorando diretório: {path}")
-            contents = repo.get_contents(path)
+            # O conteúdo de cada arquivo listado é buscado na mesma ref da listagem
+            contents = repo.get_contents(path, ref=branch) if branch else repo.get_contents(path)
             
             if not isinstance(contents, list):
                 contents = [contents]
@@ -119,6 +135,7 @@ class GitHubReader:
             
             # Processar arquivos primeiro
             for content in files:
+                verificar_cancelamento()
                 if len(result.files) >= self.config.MAX_FILES:
                     break
                     
@@ -151,7 +168,7 @@ class GitHubReader:
                     
                 try:
                     self._read_directory_recursive(
-                        repo, content.path, extensoes, result, len(result.files)
+                        repo, content.path, extensoes, result, len(result.files), branch
                     )
                 except Exception as e:
                     error_msg = f"Erro ao acessar diretório {content.path}: {str(e)}"
@@ -163,13 +180,15 @@ class GitHubReader:
             result.errors.append(error_msg)
             logger.error(f"❌ {error_msg}")
 
-    def read_repository(self, repo: str, tipo_de_analise: str, branch: str = None) -> FileReadResult:
+    def read_repository(self, repo: str, tipo_de_analise: str, branch: str = None,
+                        extensoes: Optional[List[str]] = None) -> FileReadResult:
         """Lê arquivos do repositório especificado
         
         Args:
             repo: Nome do repositório (ex: 'usuario/repo')
             tipo_de_analise: Tipo de análise para definir extensões
             branch: Branch a ser lida (padrão: branch principal do repo)
+            extensoes: Extensões a ler, no lugar das do tipo de análise (ex.: união de várias análises)
             
         Returns:
             FileReadResult: Resultado da leitura com arquivos e metadados
@@ -203,7 +222,8 @@ class GitHubReader:
                     logger.info(f"🌿 Usando branch padrão: {branch}")
             
             # Obter extensões de arquivo
-            extensoes = self.get_file_extensions_by_analysis(tipo_de_analise)
+            if extensoes is None:
+                extensoes = self.get_file_extensions_by_analysis(tipo_de_analise)
             logger.info(f"📝 Extensões a serem lidas: {extensoes}")
             
             # Inicializar resultado
@@ -211,16 +231,16 @@ class GitHubReader:
             
             # Ler arquivos
             logger.info("📖 Iniciando leitura de arquivos...")
-            self._read_directory_recursive(repository, "", extensoes, result)
+            self._read_directory_recursive(repository, "", extensoes, result, branch=branch)
             
             # Se não encontrou arquivos, tentar com extensões básicas
             if not result.files:
                 logger.warning("⚠️ Nenhum arquivo encontrado com extensões específicas")
-                extensoes_basicas = ['.py', '.js', '.ts', '.java', '.ipynb']
+                extensoes_basicas = self.config.BASIC_EXTENSIONS
                 logger.info(f"🔄 Tentando com extensões básicas: {extensoes_basicas}")
                 
                 result = FileReadResult(files={}, total_files=0, skipped_files=0, errors=[])
-                self._read_directory_recursive(repository, "", extensoes_basicas, result)
+                self._read_directory_recursive(repository, "", extensoes_basicas, result, branch=branch)
             
             # Log dos resultados
             logger.info(f"📊 Leitura concluída:")
@@ -254,14 +274,19 @@ def get_file_extensions_by_analysis(tipo_de_analise: str) -> List[str]:
     """Função de compatibilidade - Define extensões de arquivo por tipo de análise"""
     return _reader.get_file_extensions_by_analysis(tipo_de_analise)
 
+def get_file_extensions_by_analyses(tipos_de_analise: List[str]) -> List[str]:
+    """Função de compatibilidade - União das extensões de vários tipos de análise"""
+    return _reader.get_file_extensions_by_analyses(tipos_de_analise)
+
 def should_skip_file(file_path: str) -> bool:
     """Função de compatibilidade - Verifica se arquivo deve ser ignorado"""
     return _reader.should_skip_file(file_path)
 
-def main(repo: str, tipo_de_analise: str, branch: str = "main") -> Dict[str, str]:
+def main(repo: str, tipo_de_analise: str, branch: str = "main",
+         extensoes: Optional[List[str]] = None) -> Dict[str, str]:
     """Função principal para leitura do repositório - COMPATIBILIDADE"""
     try:
-        result = _reader.read_repository(repo, tipo_de_analise, branch)
+        result = _reader.read_repository(repo, tipo_de_analise, branch, extensoes=extensoes)
         return result.files
     except Exception as e:
         logger.error(f"❌ Erro na função main: {str(e)}")
@@ -0,0 +1,372 @@
+# tools/job_store.py - ARMAZENAMENTO DE JOBS COM VERSÕES E NOTIFICAÇÃO DE MUDANÇAS
+import asyncio
+import base64
+import bisect
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Estados em que o job não muda mais sozinho
+ESTADOS_TERMINAIS = {'completed', 'failed', 'rejected', 'cancelled'}
+
+# Campos com índice invertido (valor -> job_ids), extraídos de cada job
+CAMPOS_INDEXADOS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'status': lambda job: job.get('status'),
+    'repo_name': lambda job: (job.get('data') or {}).get('repo_name'),
+    'analysis_type': lambda job: (job.get('data') or {}).get('original_analysis_type'),
+}
+
+# Campos pelos quais a listagem pode ser ordenada (cada um com uma lista ordenada própria)
+CAMPOS_ORDENACAO: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    'created_at': lambda job: float(job.get('created_at') or 0),
+    'last_updated': lambda job: float(job.get('last_updated') or job.get('created_at') or 0),
+}
+
+
+class CursorInvalidoError(ValueError):
+    """Cursor de paginação malformado ou gerado para outra ordenação"""
+
+
+def _codificar_cursor(ordenar_por: str, decrescente: bool, valor: float, job_id: str) -> str:
+    bruto = json.dumps([ordenar_por, decrescente, valor, job_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def _decodificar_cursor(cursor: str, ordenar_por: str, decrescente: bool) -> Tuple[float, str]:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        campo, desc, valor, job_id = json.loads(bruto)
+        valor, job_id = float(valor), str(job_id)
+    except (ValueError, TypeError) as e:
+        raise CursorInvalidoError(f"Cursor inválido: {e}")
+    if campo != ordenar_por or bool(desc) != decrescente:
+        raise CursorInvalidoError("Cursor gerado para outra ordenação")
+    return valor, job_id
+
+
+class ValorPreguicoso(ABC):
+    """
+    Valor guardado fora da forma original (ex.: relatório em disco), materializado só
+    quando lido. Dentro de um job é transparente: `job['data']['analysis_report']`
+    devolve sempre o texto.
+    """
+
+    @abstractmethod
+    def carregar(self) -> Any:
+        """Valor original (ex.: o texto do relatório)"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Tamanho do valor original, sem materializá-lo"""
+
+    @property
+    def bytes_em_memoria(self) -> int:
+        return 0
+
+    def descartar(self) -> None:
+        """Libera o armazenamento externo quando o job é removido"""
+
+
+def _resolver(valor):
+    return valor.carregar() if isinstance(valor, ValorPreguicoso) else valor
+
+
+def _tamanho_aproximado(valor) -> int:
+    """Bytes aproximados ocupados pelo conteúdo (strings dominam: relatórios e instruções)"""
+    if isinstance(valor, ValorPreguicoso):
+        return valor.bytes_em_memoria
+    if isinstance(valor, (str, bytes)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(len(str(chave)) + _tamanho_aproximado(item) for chave, item in dict.items(valor))
+    if isinstance(valor, (list, tuple, set)):
+        return sum(_tamanho_aproximado(item) for item in valor)
+    return 8
+
+
+class _DictObservado(dict):
+    """dict cujas escritas (inclusive em dicts aninhados) avisam o job dono"""
+
+    def __init__(self, ao_mudar, *args, **kwargs):
+        self._ao_mudar = ao_mudar
+        super().__init__()
+        for chave, valor in dict(*args, **kwargs).items():
+            super().__setitem__(chave, self._envolver(valor))
+
+    def _envolver(self, valor):
+        if isinstance(valor, dict) and not isinstance(valor, _DictObservado):
+            return _DictObservado(self._ao_mudar, valor)
+        return valor
+
+    def __getitem__(self, chave):
+        return _resolver(super().__getitem__(chave))
+
+    def get(self, chave, padrao=None):
+        return _resolver(super().get(chave, padrao))
+
+    def values(self):
+        return [_resolver(valor) for valor in super().values()]
+
+    def items(self):
+        return [(chave, _resolver(valor)) for chave, valor in super().items()]
+
+    def obter_bruto(self, chave, padrao=None):
+        """Valor como está guardado, sem materializar `ValorPreguicoso`"""
+        return super().get(chave, padrao)
+
+    def substituir_bruto(self, chave, valor) -> None:
+        """Troca a forma de armazenamento de um valor sem mudar o conteúdo (não gera nova versão)"""
+        super().__setitem__(chave, valor)
+
+    def __setitem__(self, chave, valor):
+        super().__setitem__(chave, self._envolver(valor))
+        self._ao_mudar(chave)
+
+    def __delitem__(self, chave):
+        super().__delitem__(chave)
+        self._ao_mudar(chave)
+
+    def update(self, *args, **kwargs):
+        for chave, valor in dict(*args, **kwargs).items():
+            super().__setitem__(chave, self._envolver(valor))
+        self._ao_mudar(None)
+
+    def setdefault(self, chave, padrao=None):
+        if chave not in self:
+            self[chave] = padrao
+        return self[chave]
+
+    def pop(self, chave, *padrao):
+        valor = _resolver(super().pop(chave, *padrao))
+        self._ao_mudar(chave)
+        return valor
+
+    def copy(self):
+        return {chave: (valor.copy() if isinstance(valor, _DictObservado) else valor)
+                for chave, valor in self.items()}
+
+
+class Job(_DictObservado):
+    """Registro de um job. `versao` aumenta a cada escrita, em qualquer nível do dict"""
+
+    def __init__(self, job_id: str, store: "JobStore", dados: Dict[str, Any]):
+        self.job_id = job_id
+        self.versao = 0
+        self._store = store
+        super().__init__(self._registrar_mudanca, dados)
+
+    def _registrar_mudanca(self, chave) -> None:
+        self.versao += 1
+        self._store._notificar(self.job_id)
+
+    def tamanho_em_memoria(self) -> int:
+        return _tamanho_aproximado(self)
+
+    def descartar(self) -> None:
+        """Libera valores guardados fora da memória (arquivos de relatório, por exemplo)"""
+        pendentes = [self]
+        while pendentes:
+            atual = pendentes.pop()
+            for valor in dict.values(atual):
+                if isinstance(valor, ValorPreguicoso):
+                    valor.descartar()
+                elif isinstance(valor, dict):
+                    pendentes.append(valor)
+
+
+class JobStore(MutableMapping):
+    """
+    Tabela de jobs em memória (substitui o dict global), com interface de dict.
+
+    Cada job é um `Job` versionado; qualquer escrita acorda quem está esperando
+    mudanças via `aguardar_mudanca` (event loops assíncronos) sem polling.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._esperas: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        # Índices da listagem, mantidos a cada escrita no job
+        self._lock_indices = threading.RLock()
+        self._indices: Dict[str, Dict[Any, Set[str]]] = {campo: {} for campo in CAMPOS_INDEXADOS}
+        self._ordenados: Dict[str, List[Tuple[float, str]]] = {campo: [] for campo in CAMPOS_ORDENACAO}
+        self._valores_indexados: Dict[str, Dict[str, Any]] = {}
+
+    # --- Interface de dict ---
+
+    def __getitem__(self, job_id: str) -> Job:
+        return self._jobs[job_id]
+
+    def __setitem__(self, job_id: str, dados: Dict[str, Any]) -> None:
+        anterior = self._jobs.get(job_id)
+        self._jobs[job_id] = dados if isinstance(dados, Job) else Job(job_id, self, dados)
+        if anterior is not None and anterior is not self._jobs[job_id]:
+            anterior.descartar()
+        self._notificar(job_id)
+
+    def __delitem__(self, job_id: str) -> None:
+        job = self._jobs.pop(job_id)
+        job.descartar()
+        self._notificar(job_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._jobs))
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, job_id) -> bool:
+        return job_id in self._jobs
+
+    # --- Notificação de mudanças ---
+
+    def _notificar(self, job_id: str) -> None:
+        self._indexar(job_id)
+        with self._lock:
+            esperas = list(self._esperas)
+        for loop, evento in esperas:
+            try:
+                loop.call_soon_threadsafe(evento.set)
+            except RuntimeError:
+                # Loop já encerrado
+                pass
+
+    def bytes_em_memoria(self) -> int:
+        """Estimativa do conteúdo mantido em memória por todos os jobs"""
+        return sum(job.tamanho_em_memoria() for job in list(self._jobs.values()))
+
+    # --- Índices ---
+
+    def _indexar(self, job_id: str) -> None:
+        """Atualiza os índices do job (ou o remove deles, se o job não existe mais)"""
+        with self._lock_indices:
+            job = self._jobs.get(job_id)
+            antigos = self._valores_indexados.get(job_id)
+            novos = None
+            if job is not None:
+                novos = {campo: extrair(job) for campo, extrair in CAMPOS_INDEXADOS.items()}
+                novos.update({campo: extrair(job) for campo, extrair in CAMPOS_ORDENACAO.items()})
+            if novos == antigos:
+                return
+
+            for campo in CAMPOS_INDEXADOS:
+                valor_antigo = antigos.get(campo) if antigos else None
+                valor_novo = novos.get(campo) if novos else None
+                if antigos is not None and novos is not None and valor_antigo == valor_novo:
+                    continue
+                if antigos is not None:
+                    grupo = self._indices[campo].get(valor_antigo)
+                    if grupo is not None:
+                        grupo.discard(job_id)
+                        if not grupo:
+                            del self._indices[campo][valor_antigo]
+                if novos is not None:
+                    self._indices[campo].setdefault(valor_novo, set()).add(job_id)
+
+            for campo in CAMPOS_ORDENACAO:
+                lista = self._ordenados[campo]
+                if antigos is not None:
+                    if novos is not None and antigos[campo] == novos[campo]:
+                        continue
+                    posicao = bisect.bisect_left(lista, (antigos[campo], job_id))
+                    if posicao < len(lista) and lista[posicao] == (antigos[campo], job_id):
+                        del lista[posicao]
+                if novos is not None:
+                    bisect.insort(lista, (novos[campo], job_id))
+
+            if novos is None:
+                self._valores_indexados.pop(job_id, None)
+            else:
+                self._valores_indexados[job_id] = novos
+
+    def consultar(self, filtros: Optional[Dict[str, Iterable[Any]]] = None, ordenar_por: str = 'created_at',
+                  decrescente: bool = True, limite: int = 50, cursor: Optional[str] = None,
+                  desde: Optional[float] = None, ate: Optional[float] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Lista job_ids usando os índices: `filtros` mapeia campo indexado -> valores aceitos,
+        `desde`/`ate` limitam `created_at`. Retorna (página, cursor da próxima página ou None).
+        """
+        if ordenar_por not in CAMPOS_ORDENACAO:
+            raise ValueError(f"Ordenação não suportada: {ordenar_por}")
+        posicao_cursor = _decodificar_cursor(cursor, ordenar_por, decrescente) if cursor else None
+
+        with self._lock_indices:
+            candidatos: Optional[Set[str]] = None
+            for campo, valores in (filtros or {}).items():
+                if campo not in CAMPOS_INDEXADOS:
+                    raise ValueError(f"Filtro não suportado: {campo}")
+                encontrados: Set[str] = set()
+                for valor in valores:
+                    encontrados |= self._indices[campo].get(valor, set())
+                candidatos = encontrados if candidatos is None else candidatos & encontrados
+                if not candidatos:
+                    return [], None
+
+            lista = self._ordenados[ordenar_por]
+            # Faixa de tempo: direto na lista ordenada quando a ordenação é por created_at
+            inicio, fim = 0, len(lista)
+            if ordenar_por == 'created_at':
+                if desde is not None:
+                    inicio = bisect.bisect_left(lista, (desde, ''))
+                if ate is not None:
+                    fim = bisect.bisect_left(lista, (ate, '\uffff'))
+            if posicao_cursor is not None:
+                if decrescente:
+                    fim = min(fim, bisect.bisect_left(lista, posicao_cursor))
+                else:
+                    inicio = max(inicio, bisect.bisect_right(lista, posicao_cursor))
+
+            indices = range(fim - 1, inicio - 1, -1) if decrescente else range(inicio, fim)
+            pagina: List[Tuple[float, str]] = []
+            filtrar_tempo = ordenar_por != 'created_at' and (desde is not None or ate is not None)
+            for i in indices:
+                valor, job_id = lista[i]
+                if candidatos is not None and job_id not in candidatos:
+                    continue
+                if filtrar_tempo:
+                    criado = self._valores_indexados[job_id]['created_at']
+                    if (desde is not None and criado < desde) or (ate is not None and criado > ate):
+                        continue
+                pagina.append((valor, job_id))
+                if len(pagina) > limite:
+                    break
+
+        proximo = None
+        if len(pagina) > limite:
+            pagina = pagina[:limite]
+            proximo = _codificar_cursor(ordenar_por, decrescente, *pagina[-1])
+        return [job_id for _, job_id in pagina], proximo
+
+    def versoes(self, job_ids: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Versão atual de cada job (None se o job não existe)"""
+        return {job_id: (self._jobs[job_id].versao if job_id in self._jobs else None) for job_id in job_ids}
+
+    async def aguardar_mudanca(self, job_ids: List[str], versoes_vistas: Dict[str, Optional[int]],
+                               timeout: float) -> bool:
+        """
+        Espera até que algum dos jobs mude em relação a `versoes_vistas` ou o timeout passe.
+        Retorna True se houve mudança.
+        """
+        evento = asyncio.Event()
+        registro = (asyncio.get_running_loop(), evento)
+        with self._lock:
+            self._esperas.add(registro)
+        try:
+            loop = asyncio.get_running_loop()
+            limite = loop.time() + timeout
+            while True:
+                evento.clear()
+                if self.versoes(job_ids) != versoes_vistas:
+                    return True
+                restante = limite - loop.time()
+                if restante <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(evento.wait(), timeout=restante)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._esperas.discard(registro)
@@ -0,0 +1,117 @@
+# tools/limitador_taxa.py - LIMITADOR TPM/RPM (TOKEN BUCKET) PARA CHAMADAS LLM
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+class BaldeDeTokens:
+    """Token bucket com reposição contínua: `limite_por_minuto` unidades a cada 60s"""
+
+    def __init__(self, limite_por_minuto: int):
+        self.capacidade = float(limite_por_minuto)
+        self.taxa_por_segundo = limite_por_minuto / 60.0
+        self.disponivel = float(limite_por_minuto)
+        self._ultima_reposicao = time.monotonic()
+
+    def _repor(self) -> None:
+        agora = time.monotonic()
+        self.disponivel = min(
+            self.capacidade,
+            self.disponivel + (agora - self._ultima_reposicao) * self.taxa_por_segundo
+        )
+        self._ultima_reposicao = agora
+
+    def espera_para(self, quantidade: float) -> float:
+        """Segundos até haver `quantidade` disponível (0 se já houver)"""
+        self._repor()
+        # Pedidos maiores que o balde esperam apenas até ele encher, para não travar
+        quantidade = min(quantidade, self.capacidade)
+        falta = quantidade - self.disponivel
+        return 0.0 if falta <= 0 else falta / self.taxa_por_segundo
+
+    def consumir(self, quantidade: float) -> None:
+        self._repor()
+        self.disponivel -= quantidade
+
+    def devolver(self, quantidade: float) -> None:
+        """Ajusta o saldo após a reconciliação (quantidade negativa cobra a diferença)"""
+        self._repor()
+        self.disponivel = min(self.capacidade, self.disponivel + quantidade)
+
+
+@dataclass
+class Reserva:
+    """Capacidade reservada para uma chamada, reconciliada com o `usage` da resposta"""
+    model_name: str
+    tokens_estimados: int
+
+
+class LimitadorDeTaxa:
+    """
+    Limita requisições e tokens por minuto por modelo, no lado do cliente.
+
+    Cada chamada reserva (tokens do prompt + max_tokens) do balde TPM e 1 do balde RPM.
+    As chamadas entram em uma fila FIFO por modelo e só seguem quando há capacidade;
+    depois da resposta, o uso real (`usage.total_tokens`) corrige a estimativa.
+    Modelos sem limite configurado não são limitados.
+    """
+
+    def __init__(self, tpm_por_modelo: Dict[str, int], rpm_por_modelo: Dict[str, int],
+                 tpm_padrao: int = 0, rpm_padrao: int = 0):
+        self._tpm_por_modelo = tpm_por_modelo
+        self._rpm_por_modelo = rpm_por_modelo
+        self._tpm_padrao = tpm_padrao
+        self._rpm_padrao = rpm_padrao
+        self._baldes_tpm: Dict[str, Optional[BaldeDeTokens]] = {}
+        self._baldes_rpm: Dict[str, Optional[BaldeDeTokens]] = {}
+        self._filas: Dict[str, asyncio.Lock] = {}
+        self._aguardando: Dict[str, int] = {}
+
+    def _baldes(self, model_name: str):
+        if model_name not in self._filas:
+            tpm = self._tpm_por_modelo.get(model_name, self._tpm_padrao)
+            rpm = self._rpm_por_modelo.get(model_name, self._rpm_padrao)
+            self._baldes_tpm[model_name] = BaldeDeTokens(tpm) if tpm > 0 else None
+            self._baldes_rpm[model_name] = BaldeDeTokens(rpm) if rpm > 0 else None
+            self._filas[model_name] = asyncio.Lock()
+            self._aguardando[model_name] = 0
+        return self._baldes_tpm[model_name], self._baldes_rpm[model_name], self._filas[model_name]
+
+    async def reservar(self, model_name: str, tokens_estimados: int) -> Reserva:
+        """Aguarda (em ordem de chegada) até haver capacidade e reserva os tokens"""
+        balde_tpm, balde_rpm, fila = self._baldes(model_name)
+        self._aguardando[model_name] += 1
+        try:
+            async with fila:
+                while True:
+                    espera = max(
+                        balde_tpm.espera_para(tokens_estimados) if balde_tpm else 0.0,
+                        balde_rpm.espera_para(1) if balde_rpm else 0.0
+                    )
+                    if espera <= 0:
+                        break
+                    await asyncio.sleep(espera)
+                if balde_tpm:
+                    balde_tpm.consumir(tokens_estimados)
+                if balde_rpm:
+                    balde_rpm.consumir(1)
+        finally:
+            self._aguardando[model_name] -= 1
+        return Reserva(model_name=model_name, tokens_estimados=tokens_estimados)
+
+    def reconciliar(self, reserva: Reserva, tokens_reais: Optional[int]) -> None:
+        """Corrige o balde TPM com o uso real; None devolve a reserva inteira (chamada falhou)"""
+        balde_tpm = self._baldes_tpm.get(reserva.model_name)
+        if balde_tpm:
+            balde_tpm.devolver(reserva.tokens_estimados - (tokens_reais or 0))
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            modelo: {
+                "tpm_disponivel": int(self._baldes_tpm[modelo].disponivel) if self._baldes_tpm[modelo] else None,
+                "rpm_disponivel": int(self._baldes_rpm[modelo].disponivel) if self._baldes_rpm[modelo] else None,
+                "aguardando": self._aguardando[modelo]
+            }
+            for modelo in self._filas
+        }
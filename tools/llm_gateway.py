@@ -0,0 +1,417 @@
+# tools/llm_gateway.py - GATEWAY ASSÍNCRONO PARA CHAMADAS À OPENAI
+import os
+import asyncio
+import threading
+import concurrent.futures
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from tools.cancelamento import token_atual
+from tools.limitador_taxa import LimitadorDeTaxa
+from tools.resiliencia import (
+    CircuitBreaker, CircuitoAbertoError, ObservadorEventos,
+    calcular_espera, eh_erro_transitorio, extrair_retry_after, notificar
+)
+from tools.tokens import estimar_tokens_mensagens
+
+
+def _ler_int_env(nome: str, padrao: int) -> int:
+    """Lê um inteiro de variável de ambiente, usando o padrão se ausente ou inválido"""
+    valor = os.getenv(nome)
+    try:
+        return int(valor) if valor else padrao
+    except ValueError:
+        print(f"⚠️ Valor inválido para {nome}: '{valor}'. Usando {padrao}")
+        return padrao
+
+
+def _ler_limites_por_modelo(nome: str) -> Dict[str, int]:
+    """Lê limites por modelo no formato 'gpt-4.1=4,gpt-4o-mini=8'"""
+    limites = {}
+    for item in (os.getenv(nome) or "").split(","):
+        if "=" not in item:
+            continue
+        modelo, valor = item.split("=", 1)
+        try:
+            limites[modelo.strip()] = int(valor)
+        except ValueError:
+            print(f"⚠️ Limite inválido em {nome}: '{item}'")
+    return limites
+
+
+# Callback que recebe cada trecho de texto de uma resposta em streaming
+ObservadorDelta = Callable[[str], None]
+
+
+@dataclass
+class _MensagemAgregada:
+    content: str
+
+
+@dataclass
+class _EscolhaAgregada:
+    message: _MensagemAgregada
+    finish_reason: Optional[str] = None
+
+
+@dataclass
+class RespostaAgregada:
+    """Resposta montada a partir de um stream, com a mesma forma de um ChatCompletion"""
+    choices: List[_EscolhaAgregada]
+    usage: Any = None
+
+
+class LLMGatewayConfig:
+    """Configurações do gateway LLM (sobrescrevíveis por variáveis de ambiente)"""
+    # Pool HTTP compartilhado (keep-alive)
+    MAX_CONNECTIONS = _ler_int_env('LLM_MAX_CONNECTIONS', 20)
+    MAX_KEEPALIVE_CONNECTIONS = _ler_int_env('LLM_MAX_KEEPALIVE_CONNECTIONS', 10)
+    KEEPALIVE_EXPIRY = 60.0
+    TIMEOUT = float(_ler_int_env('LLM_TIMEOUT', 300))
+
+    # Limites de chamadas simultâneas
+    MAX_CONCORRENCIA_GLOBAL = _ler_int_env('LLM_MAX_CONCORRENCIA', 8)
+    MAX_CONCORRENCIA_MODELO_PADRAO = _ler_int_env('LLM_MAX_CONCORRENCIA_MODELO', 4)
+    MAX_CONCORRENCIA_POR_MODELO = _ler_limites_por_modelo('LLM_CONCORRENCIA_POR_MODELO')
+
+    # Cotas do provedor (tokens/requisições por minuto); 0 = sem limite no cliente
+    TPM_POR_MODELO = _ler_limites_por_modelo('LLM_TPM_POR_MODELO')
+    RPM_POR_MODELO = _ler_limites_por_modelo('LLM_RPM_POR_MODELO')
+    TPM_PADRAO = _ler_int_env('LLM_TPM_PADRAO', 0)
+    RPM_PADRAO = _ler_int_env('LLM_RPM_PADRAO', 0)
+
+    # Retry com backoff exponencial + jitter e circuit breaker
+    MAX_TENTATIVAS = _ler_int_env('LLM_MAX_TENTATIVAS', 5)
+    BACKOFF_BASE = 1.0
+    BACKOFF_TETO = 60.0
+    CIRCUITO_LIMIAR_FALHAS = _ler_int_env('LLM_CIRCUITO_LIMIAR_FALHAS', 5)
+    CIRCUITO_TEMPO_RECUPERACAO = float(_ler_int_env('LLM_CIRCUITO_RECUPERACAO', 30))
+
+
+class LLMGateway:
+    """
+    Ponto único de acesso à OpenAI.
+
+    Mantém um único AsyncOpenAI (com pool HTTP keep-alive) rodando em um event loop
+    dedicado, limita as chamadas em voo globalmente e por modelo, e pode ser usado
+    tanto por código assíncrono (`await gateway.chat(...)`) quanto por threads
+    síncronas (`gateway.chat_sync(...)`) sem abrir uma conexão por chamada.
+    """
+
+    def __init__(self, config: LLMGatewayConfig = None, api_key: Optional[str] = None):
+        self.config = config or LLMGatewayConfig()
+        self._api_key = api_key
+        self._cliente: Optional[AsyncOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._semaforo_global: Optional[asyncio.Semaphore] = None
+        self._semaforos_modelo: Dict[str, asyncio.Semaphore] = {}
+        self._limitador: Optional[LimitadorDeTaxa] = None
+        self._circuito = CircuitBreaker(
+            limiar_falhas=self.config.CIRCUITO_LIMIAR_FALHAS,
+            tempo_recuperacao=self.config.CIRCUITO_TEMPO_RECUPERACAO
+        )
+        self._total_retries = 0
+        self._total_recusadas_circuito = 0
+        self._em_voo_global = 0
+        self._em_voo_por_modelo: Dict[str, int] = {}
+        self._total_chamadas = 0
+        self._total_erros = 0
+        self._total_canceladas = 0
+
+    def definir_api_key(self, api_key: str) -> None:
+        """Define a chave usada pelo cliente (vale a partir da próxima criação do cliente)"""
+        self._api_key = api_key
+
+    # --- Event loop dedicado ---
+
+    def _garantir_loop(self) -> asyncio.AbstractEventLoop:
+        """Inicia (uma única vez) o event loop do gateway em uma thread daemon"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                pronto = threading.Event()
+
+                def _rodar():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(pronto.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_rodar, name="llm-gateway", daemon=True)
+                self._thread.start()
+                pronto.wait()
+                self._loop = loop
+            return self._loop
+
+    def _no_loop_do_gateway(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def executar(self, coro):
+        """
+        Executa uma corrotina no loop do gateway e bloqueia até o resultado (uso em threads).
+
+        Se a thread está executando um job cancelável (tools/cancelamento.py), cancelar o job
+        cancela a corrotina no loop, abortando as requisições HTTP em voo e as esperas
+        no limitador de taxa.
+        """
+        loop = self._garantir_loop()
+        if self._no_loop_do_gateway():
+            raise RuntimeError("executar() não pode ser chamado de dentro do loop do gateway; use await")
+        token = token_atual()
+        if token is not None and token.cancelado:
+            coro.close()
+            token.verificar()
+        futuro = asyncio.run_coroutine_threadsafe(coro, loop)
+        if token is None:
+            return futuro.result()
+
+        desfazer = token.ao_cancelar(futuro.cancel)
+        try:
+            return futuro.result()
+        except concurrent.futures.CancelledError:
+            self._total_canceladas += 1
+            token.verificar()
+            raise
+        finally:
+            desfazer()
+
+    async def executar_async(self, coro):
+        """Executa uma corrotina no loop do gateway a partir de qualquer outro event loop"""
+        loop = self._garantir_loop()
+        if self._no_loop_do_gateway():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # --- Cliente e limites ---
+
+    def _obter_cliente(self) -> AsyncOpenAI:
+        """Cria o cliente AsyncOpenAI com pool HTTP compartilhado (lazy loading)"""
+        if self._cliente is None:
+            api_key = self._api_key or os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_KEY')
+            if not api_key:
+                raise ValueError("A chave da API da OpenAI não foi encontrada. Defina a variável de ambiente OPENAI_API_KEY.")
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.MAX_CONNECTIONS,
+                    max_keepalive_connections=self.config.MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=self.config.KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(self.config.TIMEOUT, connect=10.0)
+            )
+            # Retries ficam a cargo do gateway (backoff + circuit breaker), não do SDK
+            self._cliente = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+            print(f"✅ Cliente AsyncOpenAI inicializado (pool: {self.config.MAX_CONNECTIONS} conexões)")
+        return self._cliente
+
+    def _semaforo_do_modelo(self, model_name: str) -> asyncio.Semaphore:
+        if model_name not in self._semaforos_modelo:
+            limite = self.config.MAX_CONCORRENCIA_POR_MODELO.get(
+                model_name, self.config.MAX_CONCORRENCIA_MODELO_PADRAO
+            )
+            self._semaforos_modelo[model_name] = asyncio.Semaphore(limite)
+        return self._semaforos_modelo[model_name]
+
+    def _obter_limitador(self) -> LimitadorDeTaxa:
+        if self._limitador is None:
+            self._limitador = LimitadorDeTaxa(
+                tpm_por_modelo=self.config.TPM_POR_MODELO,
+                rpm_por_modelo=self.config.RPM_POR_MODELO,
+                tpm_padrao=self.config.TPM_PADRAO,
+                rpm_padrao=self.config.RPM_PADRAO
+            )
+        return self._limitador
+
+    async def _chat_no_loop(self, model_name: str, mensagens: List[Dict[str, str]],
+                            ao_evento: Optional[ObservadorEventos] = None,
+                            ao_delta: Optional[ObservadorDelta] = None, **kwargs) -> Any:
+        """Executa a chamada com retries para falhas transitórias, passando pelo circuit breaker"""
+        tentativa = 0
+        while True:
+            tentativa += 1
+            deltas_emitidos = []
+            try:
+                chamada_de_teste = self._circuito.verificar()
+            except CircuitoAbertoError:
+                self._total_recusadas_circuito += 1
+                notificar(ao_evento, "circuito_aberto", {"circuito": self._circuito.resumo()})
+                raise
+
+            def _delta_rastreado(texto: str):
+                deltas_emitidos.append(len(texto))
+                ao_delta(texto)
+
+            try:
+                response = await self._chat_uma_tentativa(
+                    model_name, mensagens, ao_delta=_delta_rastreado if ao_delta else None, **kwargs
+                )
+                self._circuito.registrar_sucesso()
+                return response
+            except Exception as e:
+                if deltas_emitidos:
+                    # O texto parcial desta tentativa será reenviado do zero pela próxima
+                    notificar(ao_evento, "stream_reiniciado", {"caracteres_descartados": sum(deltas_emitidos)})
+                if not eh_erro_transitorio(e):
+                    if chamada_de_teste:
+                        self._circuito.liberar_teste()
+                    raise
+                self._circuito.registrar_falha()
+                if tentativa >= self.config.MAX_TENTATIVAS:
+                    notificar(ao_evento, "retry_esgotado", {
+                        "tentativa": tentativa, "erro": str(e), "circuito": self._circuito.resumo()
+                    })
+                    raise
+
+                espera = calcular_espera(
+                    tentativa, self.config.BACKOFF_BASE, self.config.BACKOFF_TETO, extrair_retry_after(e)
+                )
+                self._total_retries += 1
+                print(f"🔁 Falha transitória na OpenAI ({type(e).__name__}). "
+                      f"Tentativa {tentativa}/{self.config.MAX_TENTATIVAS}, nova tentativa em {espera:.1f}s")
+                notificar(ao_evento, "retry", {
+                    "tentativa": tentativa,
+                    "max_tentativas": self.config.MAX_TENTATIVAS,
+                    "espera_segundos": round(espera, 2),
+                    "erro": str(e),
+                    "circuito": self._circuito.resumo()
+                })
+                await asyncio.sleep(espera)
+            except BaseException:
+                # Cancelamento (CancelledError do job): sem resultado, a vaga de teste não pode ficar presa
+                if chamada_de_teste:
+                    self._circuito.liberar_teste()
+                raise
+
+    async def _chat_uma_tentativa(self, model_name: str, mensagens: List[Dict[str, str]],
+                                  ao_delta: Optional[ObservadorDelta] = None, **kwargs) -> Any:
+        if self._semaforo_global is None:
+            self._semaforo_global = asyncio.Semaphore(self.config.MAX_CONCORRENCIA_GLOBAL)
+
+        # Reserva a cota TPM/RPM antes de ocupar uma vaga de concorrência
+        limitador = self._obter_limitador()
+        tokens_estimados = estimar_tokens_mensagens(mensagens) + (kwargs.get('max_tokens') or 0)
+        reserva = await limitador.reservar(model_name, tokens_estimados)
+        tokens_reais = None
+
+        try:
+            response = await self._chamar_com_limite(model_name, mensagens, ao_delta=ao_delta, **kwargs)
+            usage = getattr(response, 'usage', None)
+            tokens_reais = getattr(usage, 'total_tokens', None) or tokens_estimados
+            return response
+        finally:
+            limitador.reconciliar(reserva, tokens_reais)
+
+    async def _chamar_com_limite(self, model_name: str, mensagens: List[Dict[str, str]],
+                                 ao_delta: Optional[ObservadorDelta] = None, **kwargs) -> Any:
+        async with self._semaforo_global:
+            async with self._semaforo_do_modelo(model_name):
+                self._em_voo_global += 1
+                self._em_voo_por_modelo[model_name] = self._em_voo_por_modelo.get(model_name, 0) + 1
+                self._total_chamadas += 1
+                try:
+                    if ao_delta is not None:
+                        return await self._consumir_stream(model_name, mensagens, ao_delta, **kwargs)
+                    return await self._obter_cliente().chat.completions.create(
+                        model=model_name,
+                        messages=mensagens,
+                        **kwargs
+                    )
+                except Exception:
+                    self._total_erros += 1
+                    raise
+                finally:
+                    self._em_voo_global -= 1
+                    self._em_voo_por_modelo[model_name] -= 1
+
+    async def _consumir_stream(self, model_name: str, mensagens: List[Dict[str, str]],
+                               ao_delta: ObservadorDelta, **kwargs) -> RespostaAgregada:
+        """Faz a chamada em streaming, repassa cada trecho a `ao_delta` e devolve a resposta completa"""
+        stream = await self._obter_cliente().chat.completions.create(
+            model=model_name,
+            messages=mensagens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        partes, usage, finish_reason = [], None, None
+        async for evento in stream:
+            if getattr(evento, 'usage', None):
+                usage = evento.usage
+            if not evento.choices:
+                continue
+            escolha = evento.choices[0]
+            finish_reason = escolha.finish_reason or finish_reason
+            texto = escolha.delta.content if escolha.delta else None
+            if texto:
+                partes.append(texto)
+                ao_delta(texto)
+        return RespostaAgregada(
+            choices=[_EscolhaAgregada(message=_MensagemAgregada(content=''.join(partes)), finish_reason=finish_reason)],
+            usage=usage
+        )
+
+    # --- API pública ---
+
+    async def chat(self, model_name: str, mensagens: List[Dict[str, str]],
+                   ao_evento: Optional[ObservadorEventos] = None,
+                   ao_delta: Optional[ObservadorDelta] = None, **kwargs) -> Any:
+        """
+        Chamada assíncrona de chat completion respeitando limites, retries e circuit breaker.
+        `ao_evento(evento, dados)` recebe os eventos de retry/circuito desta chamada.
+        Com `ao_delta`, a resposta é pedida em streaming e cada trecho é repassado assim que chega.
+        """
+        return await self.executar_async(self._chat_no_loop(
+            model_name, mensagens, ao_evento=ao_evento, ao_delta=ao_delta, **kwargs
+        ))
+
+    def chat_sync(self, model_name: str, mensagens: List[Dict[str, str]],
+                  ao_evento: Optional[ObservadorEventos] = None,
+                  ao_delta: Optional[ObservadorDelta] = None, **kwargs) -> Any:
+        """Versão bloqueante de chat() para código que roda em threads"""
+        return self.executar(self._chat_no_loop(
+            model_name, mensagens, ao_evento=ao_evento, ao_delta=ao_delta, **kwargs
+        ))
+
+    def metricas(self) -> Dict[str, Any]:
+        """Retorna um retrato do uso atual do gateway"""
+        return {
+            "em_voo": self._em_voo_global,
+            "em_voo_por_modelo": dict(self._em_voo_por_modelo),
+            "limite_global": self.config.MAX_CONCORRENCIA_GLOBAL,
+            "total_chamadas": self._total_chamadas,
+            "total_erros": self._total_erros,
+            "total_retries": self._total_retries,
+            "total_recusadas_circuito": self._total_recusadas_circuito,
+            "total_canceladas": self._total_canceladas,
+            "circuito": self._circuito.resumo(),
+            "limites_taxa": self._limitador.metricas() if self._limitador else {}
+        }
+
+    def fechar(self) -> None:
+        """Fecha o pool HTTP e encerra o loop dedicado"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        if self._cliente is not None:
+            self.executar(self._cliente.close())
+            self._cliente = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._semaforo_global = None
+        self._semaforos_modelo = {}
+        self._limitador = None
+
+
+# Instância global compartilhada por todo o processo
+_gateway = LLMGateway()
+
+
+def obter_gateway() -> LLMGateway:
+    """Retorna o gateway LLM compartilhado"""
+    return _gateway
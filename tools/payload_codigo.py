@@ -0,0 +1,85 @@
+# tools/payload_codigo.py - CODIFICAÇÃO DO CÓDIGO ENVIADO AO LLM (TEXTO PURO, UMA SEÇÃO POR ARQUIVO)
+import os
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from tools.tokens import estimar_tokens
+
+
+class PayloadConfig:
+    """Configurações do payload de código (variáveis de ambiente)"""
+    # Prefixa cada linha com o número dela (ajuda o modelo a citar trechos, custa alguns tokens)
+    NUMERAR_LINHAS = os.getenv('PAYLOAD_NUMERAR_LINHAS', 'false').lower() in ('1', 'true', 'sim')
+
+
+@dataclass
+class PayloadCodigo:
+    """Texto pronto para a mensagem do modelo e o que ele custa"""
+    texto: str
+    arquivos: int
+    caracteres: int
+    tokens: int
+
+
+def eh_mapa_de_arquivos(codigo: Any) -> bool:
+    """Indica se o código é um mapa {caminho: conteúdo} (vira seções por arquivo e pode ir em partes)"""
+    return isinstance(codigo, dict) and bool(codigo) and all(isinstance(v, str) for v in codigo.values())
+
+
+def secao_arquivo(caminho: str, conteudo: str, numerar_linhas: bool = False,
+                  numeros: Optional[List[int]] = None) -> str:
+    """
+    Um arquivo como texto puro entre cabeçalho e rodapé com o caminho. `numeros` dá o
+    número original de cada linha (partes de um arquivo não começam na linha 1).
+    """
+    linhas = conteudo.splitlines()
+    if numerar_linhas and linhas:
+        numeros = numeros or list(range(1, len(linhas) + 1))
+        largura = len(str(max(numeros)))
+        linhas = [f"{numero:>{largura}} | {linha}" for numero, linha in zip(numeros, linhas)]
+    corpo = '\n'.join(linhas)
+    return f"=== ARQUIVO: {caminho} ({len(linhas)} linhas) ===\n{corpo}\n=== FIM: {caminho} ==="
+
+
+def custo_secao(caminho: str, maior_numero: int) -> int:
+    """
+    Tokens que a seção de um arquivo soma ao conteúdo: cabeçalho, rodapé e a separação
+    entre seções. `maior_numero` limita linhas e partes (pior caso do nome de uma parte).
+    """
+    nome = f"{caminho} (parte {maior_numero}/{maior_numero}, linhas {maior_numero}-{maior_numero})"
+    return estimar_tokens(f"=== ARQUIVO: {nome} ({maior_numero} linhas) ===\n\n=== FIM: {nome} ===\n\n")
+
+
+def custo_numeracao(maior_numero: int) -> int:
+    """Tokens do prefixo "número | " que cada linha ganha quando as linhas são numeradas"""
+    return estimar_tokens(f"{maior_numero} | ")
+
+
+def codificar(codigo: Any, numerar_linhas: bool = None, numeros_de_linha: Optional[Dict[str, List[int]]] = None,
+              config=PayloadConfig) -> PayloadCodigo:
+    """
+    Payload do código para o modelo. Um mapa {caminho: conteúdo} vira uma seção de texto
+    puro por arquivo (quebras de linha e aspas reais, sem o escape do repr de um dict);
+    outros dicts e listas (ex.: JSON de mudanças, manifesto) vão como JSON compacto; texto
+    vai como está. `numeros_de_linha` ({caminho: [número de cada linha]}) vale para partes
+    de arquivos, quando as linhas são numeradas.
+    """
+    if numerar_linhas is None:
+        numerar_linhas = config.NUMERAR_LINHAS
+
+    if eh_mapa_de_arquivos(codigo):
+        numeros_de_linha = numeros_de_linha or {}
+        texto = '\n\n'.join(
+            secao_arquivo(caminho, conteudo, numerar_linhas, numeros_de_linha.get(caminho))
+            for caminho, conteudo in codigo.items()
+        )
+        arquivos = len(codigo)
+    elif isinstance(codigo, (dict, list)):
+        texto = json.dumps(codigo, ensure_ascii=False, separators=(',', ':'), default=str)
+        arquivos = 0
+    else:
+        texto = '' if codigo is None else str(codigo)
+        arquivos = 0
+    return PayloadCodigo(texto=texto, arquivos=arquivos, caracteres=len(texto), tokens=estimar_tokens(texto))
+
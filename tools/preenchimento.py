@@ -1,6 +1,106 @@
 # tools/preenchimento.py - CORREÇÃO MÍNIMA PARA FUNCIONAR
 
 import json
+from typing import Dict, Optional, Tuple
+
+
+def normalizar_caminho(caminho: str) -> str:
+    """Forma canônica do caminho: separador '/', sem './', '/' inicial nem barras repetidas"""
+    partes = caminho.strip().replace('\\', '/').split('/')
+    return '/'.join(parte for parte in partes if parte and parte != '.')
+
+
+class _NoSufixo:
+    __slots__ = ('filhos', 'melhor', 'total')
+
+    def __init__(self):
+        self.filhos: Dict[str, '_NoSufixo'] = {}
+        self.melhor: Optional[Tuple[int, str]] = None  # (profundidade, caminho) preferido nesta subárvore
+        self.total = 0
+
+
+class IndiceCaminhos:
+    """
+    Índice dos caminhos do mapa de conteúdo, montado uma vez: caminho exato, caminho
+    normalizado e uma trie de sufixos (componentes do fim para o começo, cujo primeiro
+    nível é o índice por nome de arquivo). Cada busca custa O(componentes do caminho),
+    e só componentes inteiros casam (`a.py` não casa com `data.py`).
+
+    Na trie vence o caminho com o maior sufixo em comum; empates vão para o caminho
+    com menos componentes e, depois, para a ordem alfabética.
+    """
+
+    def __init__(self, caminhos):
+        self._exatos = set()
+        self._normalizados: Dict[str, str] = {}
+        self._raiz = _NoSufixo()
+        for caminho in sorted(caminhos):
+            self._exatos.add(caminho)
+            normalizado = normalizar_caminho(caminho)
+            if not normalizado:
+                continue
+            self._normalizados.setdefault(normalizado, caminho)
+            componentes = normalizado.split('/')
+            candidato = (len(componentes), caminho)
+            no = self._raiz
+            for componente in reversed(componentes):
+                no = no.filhos.setdefault(componente, _NoSufixo())
+                no.total += 1
+                if no.melhor is None or candidato < no.melhor:
+                    no.melhor = candidato
+
+    def resolver(self, caminho: str) -> Tuple[Optional[str], str]:
+        """
+        (caminho no mapa, como casou) para o caminho pedido. Como casou: 'exato',
+        'normalizado', 'sufixo' (ao menos um diretório em comum além do nome),
+        'nome' (só o nome do arquivo), 'ambiguo' (só o nome, com mais de um
+        candidato) ou 'ausente' (caminho None).
+        """
+        if not caminho:
+            return None, 'ausente'
+        if caminho in self._exatos:
+            return caminho, 'exato'
+        normalizado = normalizar_caminho(caminho)
+        if normalizado in self._normalizados:
+            return self._normalizados[normalizado], 'normalizado'
+
+        no, profundidade = self._raiz, 0
+        for componente in reversed(normalizado.split('/')):
+            proximo = no.filhos.get(componente)
+            if proximo is None:
+                break
+            no, profundidade = proximo, profundidade + 1
+        if profundidade == 0:
+            return None, 'ausente'
+        if profundidade > 1:
+            return no.melhor[1], 'sufixo'
+        return no.melhor[1], 'nome' if no.total == 1 else 'ambiguo'
+
+
+def montar_manifesto(json_mudancas: dict) -> dict:
+    """
+    JSON de mudanças sem o conteúdo dos arquivos, para a etapa de agrupamento: cada
+    mudança fica só com caminho, status, justificativa e tamanho. O conteúdo continua
+    no JSON original e volta para os grupos no `main` (json_inicial).
+    """
+    if not isinstance(json_mudancas, dict):
+        return json_mudancas
+    manifesto = {chave: valor for chave, valor in json_mudancas.items() if chave != 'conjunto_de_mudancas'}
+    manifesto['conjunto_de_mudancas'] = []
+    for mudanca in json_mudancas.get('conjunto_de_mudancas', []):
+        conteudo = mudanca.get('conteudo')
+        item = {chave: valor for chave, valor in mudanca.items() if chave != 'conteudo'}
+        if conteudo is not None:
+            item['tamanho_bytes'] = len(conteudo.encode('utf-8'))
+            item['linhas'] = conteudo.count('\n') + (0 if conteudo.endswith('\n') or not conteudo else 1)
+        manifesto['conjunto_de_mudancas'].append(item)
+
+    tamanho_original = len(json.dumps(json_mudancas, ensure_ascii=False))
+    tamanho_manifesto = len(json.dumps(manifesto, ensure_ascii=False))
+    print(f"📉 Manifesto de {len(manifesto['conjunto_de_mudancas'])} mudanças: "
+          f"{tamanho_manifesto} caracteres em vez de {tamanho_original}")
+    return manifesto
+
 
 def main(json_agrupado: dict, json_inicial: dict) -> dict:
     """
@@ -30,6 +130,9 @@ def main(json_agrupado: dict, json_inicial: dict) -> dict:
     if mapa_de_conteudo:
         print(f"📂 Exemplos de caminhos no mapa: {list(mapa_de_conteudo.keys())[:3]}")
 
+    # Índice dos caminhos: resolve cada caminho do agrupamento sem varrer o mapa
+    indice = IndiceCaminhos(mapa_de_conteudo.keys())
+
     # Passo 2: Processar grupos (com melhorias)
     grupos_processados = 0
     mudancas_preenchidas = 0
@@ -44,28 +147,24 @@ def main(json_agrupado: dict, json_inicial: dict) -> dict:
             
             for i, mudanca_no_grupo in enumerate(mudancas_grupo):
                 caminho_do_arquivo = mudanca_no_grupo.get('caminho_do_arquivo')
-                print(f"   📄 [{i}] Processando: {caminho_do_arquivo}")
-                
-                # Buscar conteúdo no mapa
-                if caminho_do_arquivo in mapa_de_conteudo:
-                    mudanca_no_grupo['conteudo'] = mapa_de_conteudo[caminho_do_arquivo]
+
+                # Buscar conteúdo no mapa (exato, normalizado ou por sufixo do caminho)
+                caminho_mapa, correspondencia = indice.resolver(caminho_do_arquivo)
+                if correspondencia == 'exato':
+                    mudanca_no_grupo['conteudo'] = mapa_de_conteudo[caminho_mapa]
                     mudancas_preenchidas += 1
-                    print(f"   ✅ Conteúdo encontrado e preenchido")
                 else:
-                    print(f"   ⚠️  Conteúdo não encontrado no mapa para: {caminho_do_arquivo}")
+                    print(f"   📄 [{i}] Conteúdo não encontrado no mapa para: {caminho_do_arquivo}")
                     
                     # CORREÇÃO: Tentar encontrar por correspondência parcial
-                    arquivo_encontrado = False
-                    if caminho_do_arquivo:
-                        # Buscar por nome do arquivo apenas (sem caminho completo)
-                        nome_arquivo = caminho_do_arquivo.split('/')[-1]
-                        for caminho_mapa in mapa_de_conteudo.keys():
-                            if nome_arquivo in caminho_mapa or caminho_mapa.endswith(nome_arquivo):
-                                mudanca_no_grupo['conteudo'] = mapa_de_conteudo[caminho_mapa]
-                                mudancas_preenchidas += 1
-                                print(f"   ✅ Conteúdo encontrado por correspondência: {caminho_mapa}")
-                                arquivo_encontrado = True
-                                break
+                    arquivo_encontrado = caminho_mapa is not None
+                    if arquivo_encontrado:
+                        mudanca_no_grupo['conteudo'] = mapa_de_conteudo[caminho_mapa]
+                        mudancas_preenchidas += 1
+                        if correspondencia == 'ambiguo':
+                            print(f"   ⚠️  Só o nome do arquivo coincide com mais de um caminho; usando: {caminho_mapa}")
+                        else:
+                            print(f"   ✅ Conteúdo encontrado por correspondência ({correspondencia}): {caminho_mapa}")
                     
                     if not arquivo_encontrado:
                         # FALLBACK: Se não encontrou, criar conteúdo básico baseado no status
@@ -0,0 +1,144 @@
+# tools/resiliencia.py - RETRY COM BACKOFF EXPONENCIAL E CIRCUIT BREAKER PARA CHAMADAS LLM
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+import openai
+
+# Códigos HTTP que indicam falha transitória do provedor
+STATUS_TRANSITORIOS = {408, 409, 429, 500, 502, 503, 504}
+
+# Assinatura dos observadores de eventos: callback(evento, dados)
+ObservadorEventos = Callable[[str, Dict[str, Any]], None]
+
+
+class CircuitoAbertoError(RuntimeError):
+    """Levantada quando o circuit breaker está aberto e a chamada é recusada sem ir à rede"""
+
+
+def notificar(observador: Optional[ObservadorEventos], evento: str, dados: Dict[str, Any]) -> None:
+    """Repassa um evento ao observador sem deixar erros dele interromperem a chamada"""
+    if observador is None:
+        return
+    try:
+        observador(evento, dados)
+    except Exception as e:
+        print(f"⚠️ Erro no observador de eventos LLM ({evento}): {e}")
+
+
+def eh_erro_transitorio(erro: Exception) -> bool:
+    """Indica se vale a pena repetir a chamada que gerou `erro`"""
+    if isinstance(erro, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                         openai.InternalServerError)):
+        return True
+    if isinstance(erro, openai.APIStatusError):
+        return erro.status_code in STATUS_TRANSITORIOS
+    return False
+
+
+def extrair_retry_after(erro: Exception) -> Optional[float]:
+    """Lê os cabeçalhos retry-after-ms / retry-after (segundos ou data HTTP) da resposta de erro"""
+    response = getattr(erro, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    valor_ms = headers.get('retry-after-ms')
+    if valor_ms:
+        try:
+            return max(0.0, float(valor_ms) / 1000)
+        except ValueError:
+            pass
+
+    valor = headers.get('retry-after')
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def calcular_espera(tentativa: int, base: float, teto: float, retry_after: Optional[float] = None) -> float:
+    """Backoff exponencial com full jitter; um Retry-After do servidor tem precedência"""
+    if retry_after is not None:
+        return min(teto, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(teto, base * (2 ** (tentativa - 1))))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de três estados (fechado → aberto → meio_aberto).
+
+    Abre após `limiar_falhas` falhas transitórias consecutivas e recusa chamadas
+    por `tempo_recuperacao` segundos; depois deixa passar uma chamada de teste,
+    que fecha o circuito se der certo ou o reabre se falhar.
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, limiar_falhas: int = 5, tempo_recuperacao: float = 30.0):
+        self.limiar_falhas = limiar_falhas
+        self.tempo_recuperacao = tempo_recuperacao
+        self.estado = self.FECHADO
+        self.falhas_consecutivas = 0
+        self.aberto_em: Optional[float] = None
+        self.vezes_aberto = 0
+        self._teste_em_andamento = False
+
+    def _mudar_estado(self, novo_estado: str) -> None:
+        if novo_estado == self.estado:
+            return
+        print(f"🔌 Circuit breaker LLM: {self.estado} → {novo_estado}")
+        self.estado = novo_estado
+
+    def verificar(self) -> bool:
+        """
+        Levanta CircuitoAbertoError se a chamada não deve ir ao provedor agora. Retorna True
+        quando a chamada é a de teste do estado meio aberto (e ocupa a vaga dela).
+        """
+        if self.estado == self.ABERTO:
+            if time.monotonic() - self.aberto_em < self.tempo_recuperacao:
+                raise CircuitoAbertoError(
+                    f"Circuito aberto: provedor LLM indisponível após {self.falhas_consecutivas} falhas consecutivas"
+                )
+            self._mudar_estado(self.MEIO_ABERTO)
+
+        if self.estado == self.MEIO_ABERTO:
+            if self._teste_em_andamento:
+                raise CircuitoAbertoError("Circuito meio aberto: aguardando o resultado da chamada de teste")
+            self._teste_em_andamento = True
+            return True
+        return False
+
+    def registrar_sucesso(self) -> None:
+        self.falhas_consecutivas = 0
+        self._teste_em_andamento = False
+        self._mudar_estado(self.FECHADO)
+
+    def registrar_falha(self) -> None:
+        self.falhas_consecutivas += 1
+        self._teste_em_andamento = False
+        if self.estado == self.ABERTO:
+            return
+        if self.estado == self.MEIO_ABERTO or self.falhas_consecutivas >= self.limiar_falhas:
+            self.aberto_em = time.monotonic()
+            self.vezes_aberto += 1
+            self._mudar_estado(self.ABERTO)
+
+    def liberar_teste(self) -> None:
+        """Libera a vaga da chamada de teste quando ela termina sem sucesso nem falha transitória (ou é cancelada)"""
+        self._teste_em_andamento = False
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "falhas_consecutivas": self.falhas_consecutivas,
+            "vezes_aberto": self.vezes_aberto
+        }
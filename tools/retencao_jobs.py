@@ -0,0 +1,207 @@
+# tools/retencao_jobs.py - RETENÇÃO DE JOBS: EXPIRAÇÃO POR ESTADO, ORÇAMENTO DE MEMÓRIA E RELATÓRIOS EM DISCO
+import os
+import time
+import uuid
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from tools.job_store import ESTADOS_TERMINAIS, Job, JobStore, ValorPreguicoso
+from tools.compressao import RelatorioComprimido, comprimir_relatorio, descomprimir
+
+
+class RetencaoJobsConfig:
+    """Configurações de retenção (variáveis de ambiente; 0 desativa o limite correspondente)"""
+
+    # Tempo (segundos) que um job fica na tabela depois de chegar a cada estado terminal
+    RETENCAO_POR_ESTADO = {
+        'completed': float(os.getenv('JOBS_RETENCAO_COMPLETED', 24 * 3600)),
+        'failed': float(os.getenv('JOBS_RETENCAO_FAILED', 24 * 3600)),
+        'rejected': float(os.getenv('JOBS_RETENCAO_REJECTED', 3600)),
+        'cancelled': float(os.getenv('JOBS_RETENCAO_CANCELLED', 3600)),
+    }
+
+    # Relatórios de jobs terminais mais antigos que isso vão para o disco
+    DESCARREGAR_RELATORIO_APOS = float(os.getenv('JOBS_DESCARREGAR_RELATORIO_APOS', 600))
+
+    # Orçamento global de memória para o conteúdo dos jobs (MB)
+    MEMORIA_MAX_MB = float(os.getenv('JOBS_MEMORIA_MAX_MB', 256))
+
+    INTERVALO_VARREDURA = float(os.getenv('JOBS_INTERVALO_VARREDURA', 60))
+
+    DIRETORIO_RELATORIOS = os.getenv('JOBS_DIRETORIO_RELATORIOS') or os.path.join(
+        tempfile.gettempdir(), 'agentes_peers_relatorios'
+    )
+
+
+EXTENSOES_CODEC = {'gzip': 'gz', 'zstd': 'zst'}
+
+
+class RelatorioEmDisco(ValorPreguicoso):
+    """Texto gravado comprimido em disco; lido de volta só quando alguém pede"""
+
+    def __init__(self, caminho: str, codec: str, tamanho: int):
+        self.caminho = caminho
+        self.codec = codec
+        self.tamanho = tamanho
+
+    @classmethod
+    def gravar(cls, diretorio: str, nome: str, comprimido: RelatorioComprimido) -> "RelatorioEmDisco":
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, f"{nome}-{uuid.uuid4().hex[:8]}.md.{EXTENSOES_CODEC.get(comprimido.codec, comprimido.codec)}")
+        caminho_tmp = caminho + '.tmp'
+        with open(caminho_tmp, 'wb') as f:
+            f.write(comprimido.dados)
+        os.replace(caminho_tmp, caminho)
+        return cls(caminho, comprimido.codec, comprimido.tamanho)
+
+    def carregar(self) -> str:
+        try:
+            with open(self.caminho, 'rb') as f:
+                return descomprimir(f.read(), self.codec)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"❌ Relatório em disco ilegível ({self.caminho}): {e}")
+            return ''
+
+    def __len__(self) -> int:
+        return self.tamanho
+
+    def descartar(self) -> None:
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Não foi possível remover {self.caminho}: {e}")
+
+
+def descarregar_relatorio(job: Job, diretorio: str) -> int:
+    """Move o relatório do job para o disco. Retorna os bytes liberados da memória"""
+    dados = job.get('data')
+    if not dados:
+        return 0
+    relatorio = dados.obter_bruto('analysis_report')
+    if isinstance(relatorio, str) and relatorio:
+        comprimido = RelatorioComprimido.de_texto(relatorio)
+    elif isinstance(relatorio, RelatorioComprimido):
+        comprimido = relatorio
+    else:
+        return 0
+    try:
+        em_disco = RelatorioEmDisco.gravar(diretorio, job.job_id, comprimido)
+    except OSError as e:
+        print(f"⚠️ Não foi possível descarregar o relatório do job {job.job_id}: {e}")
+        return 0
+    dados.substituir_bruto('analysis_report', em_disco)
+    if relatorio is comprimido:
+        comprimido.descartar()
+        return comprimido.bytes_em_memoria
+    return len(relatorio)
+
+
+class FaxineiroJobs:
+    """
+    Varredura periódica da tabela de jobs (thread em segundo plano):
+
+    1. remove jobs terminais cuja retenção (por estado) expirou;
+    2. descarrega para o disco os relatórios de jobs terminais antigos e comprime
+       em memória os relatórios ainda em texto puro de jobs que não estão gerando relatório;
+    3. se o conteúdo em memória passar do orçamento, descarrega relatórios de jobs
+       terminais, do mais antigo para o mais recente, até voltar ao limite.
+
+    Jobs em andamento nunca são removidos nem descarregados.
+    """
+
+    def __init__(self, store: JobStore, config=RetencaoJobsConfig,
+                 ao_remover: Optional[Callable[[str], None]] = None):
+        self.store = store
+        self.config = config
+        self.ao_remover = ao_remover  # Limpeza extra por job expirado (ex.: checkpoints)
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.removidos = 0
+        self.descarregados = 0
+        self.ultima_varredura: Optional[float] = None
+
+    def varrer(self, agora: Optional[float] = None) -> Dict[str, int]:
+        agora = agora if agora is not None else time.time()
+        removidos = descarregados = 0
+        terminais = []
+
+        with self._lock:
+            for job_id in list(self.store):
+                job = self.store.get(job_id)
+                if job is None:
+                    continue
+                if job.get('status') not in ESTADOS_TERMINAIS:
+                    if job.get('status') != 'analyzing':
+                        comprimir_relatorio(job.get('data'))
+                    continue
+                idade = agora - float(job.get('last_updated') or job.get('created_at') or agora)
+                retencao = self.config.RETENCAO_POR_ESTADO.get(job['status'], 0)
+                if retencao and idade > retencao:
+                    try:
+                        del self.store[job_id]
+                    except KeyError:
+                        continue
+                    if self.ao_remover:
+                        self.ao_remover(job_id)
+                    removidos += 1
+                    continue
+                if self.config.DESCARREGAR_RELATORIO_APOS and idade > self.config.DESCARREGAR_RELATORIO_APOS:
+                    if descarregar_relatorio(job, self.config.DIRETORIO_RELATORIOS):
+                        descarregados += 1
+                        continue
+                comprimir_relatorio(job.get('data'))
+                terminais.append((idade, job))
+
+            orcamento = self.config.MEMORIA_MAX_MB * 1024 * 1024
+            if orcamento:
+                em_memoria = self.store.bytes_em_memoria()
+                for _, job in sorted(terminais, key=lambda item: item[0], reverse=True):
+                    if em_memoria <= orcamento:
+                        break
+                    liberados = descarregar_relatorio(job, self.config.DIRETORIO_RELATORIOS)
+                    if liberados:
+                        em_memoria -= liberados
+                        descarregados += 1
+                if em_memoria > orcamento:
+                    print(f"⚠️ Jobs ocupam ~{em_memoria / 1024 / 1024:.1f} MB, acima do orçamento de "
+                          f"{self.config.MEMORIA_MAX_MB:g} MB, só com jobs em andamento")
+
+            self.removidos += removidos
+            self.descarregados += descarregados
+            self.ultima_varredura = agora
+
+        if removidos or descarregados:
+            print(f"🧹 Retenção de jobs: {removidos} removido(s), {descarregados} relatório(s) enviados ao disco")
+        return {"removidos": removidos, "descarregados": descarregados}
+
+    def _executar(self) -> None:
+        while not self._parar.wait(self.config.INTERVALO_VARREDURA):
+            try:
+                self.varrer()
+            except Exception as e:
+                print(f"❌ Erro na varredura de retenção de jobs: {e}")
+
+    def iniciar(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="faxineiro-jobs", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "jobs": len(self.store),
+            "bytes_em_memoria": self.store.bytes_em_memoria(),
+            "removidos": self.removidos,
+            "relatorios_descarregados": self.descarregados,
+            "ultima_varredura": self.ultima_varredura
+        }
@@ -1,7 +1,8 @@
 # tools/revisor_geral.py - CORREÇÃO APENAS DO TRATAMENTO DE RESPOSTA
 import os
-from openai import OpenAI
-from typing import Dict
+from typing import Dict, List, Optional
+from tools.llm_gateway import obter_gateway, ObservadorDelta
+from tools.resiliencia import ObservadorEventos
 
 def get_openai_key():
     """Obtém chave OpenAI de forma robusta"""
@@ -25,9 +26,10 @@ def get_openai_key():
     
     return key
 
-# Inicializar cliente OpenAI
+# Inicializar gateway OpenAI (cliente assíncrono único com pool de conexões)
 OPENAI_API_KEY = get_openai_key()
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+gateway_llm = obter_gateway()
+gateway_llm.definir_api_key(OPENAI_API_KEY)
 
 def carregar_prompt(tipo_analise: str) -> str:
     """Carrega o conteúdo do arquivo de prompt correspondente."""
@@ -49,27 +51,96 @@ Analise o código fornecido e forneça um relatório detalhado com:
 Seja específico e prático nas suas recomendações.
 """
 
+def montar_mensagens(prompt_sistema: str, codigo: str, analise_extra: str) -> List[Dict[str, str]]:
+    """Monta a lista de mensagens enviada ao modelo."""
+    return [
+        {"role": "system", "content": prompt_sistema},
+        {'role': 'user', 'content': codigo},
+        {
+            'role': 'user', 
+            'content': f'Instruções extras do usuário a serem consideradas na análise: {analise_extra}' if analise_extra and analise_extra.strip() else 'Nenhuma instrução extra fornecida pelo usuário.'
+        }
+    ]
+
+def _extrair_conteudo(response) -> str:
+    """Extrai o texto da resposta com tratamento robusto de campos nulos."""
+    # CORREÇÃO: Tratamento robusto da resposta
+    if not response:
+        print("❌ Response é None")
+        raise RuntimeError("Resposta vazia da API OpenAI")
+    
+    if not response.choices:
+        print("❌ Response.choices está vazio")
+        raise RuntimeError("Nenhuma escolha na resposta da OpenAI")
+    
+    choice = response.choices[0]
+    if not choice:
+        print("❌ Choice é None")
+        raise RuntimeError("Primeira escolha é None")
+    
+    if not choice.message:
+        print("❌ Choice.message é None")
+        raise RuntimeError("Mensagem da escolha é None")
+    
+    conteudo_resposta = choice.message.content
+    print(f"📄 Conteudo recebido: {type(conteudo_resposta)}")
+    
+    # CORREÇÃO PRINCIPAL: Verificar se conteudo_resposta é None antes de fazer strip()
+    if conteudo_resposta is None:
+        print("❌ conteudo_resposta é None - este é o problema!")
+        raise RuntimeError("Conteúdo da resposta é None")
+    
+    # Agora é seguro fazer strip()
+    resultado_final = conteudo_resposta.strip()
+    
+    if not resultado_final:
+        print("⚠️ Resultado final está vazio após strip")
+        resultado_final = "Análise concluída, mas resposta vazia. Tente novamente."
+    
+    print(f"✅ Análise concluída! Resposta: {len(resultado_final)} caracteres")
+    return resultado_final
+
 def executar_analise_llm(
     tipo_analise: str,
     codigo: str,
     analise_extra: str,
     model_name: str,
-    max_token_out: int
+    max_token_out: int,
+    ao_evento: Optional[ObservadorEventos] = None,
+    ao_delta: Optional[ObservadorDelta] = None
 ) -> str:
     """
     Executa análise usando LLM da OpenAI com tratamento robusto da resposta.
+    Versão bloqueante, para chamadas a partir de threads.
+    """
+    return gateway_llm.executar(executar_analise_llm_async(
+        tipo_analise=tipo_analise,
+        codigo=codigo,
+        analise_extra=analise_extra,
+        model_name=model_name,
+        max_token_out=max_token_out,
+        ao_evento=ao_evento,
+        ao_delta=ao_delta
+    ))
+
+async def executar_analise_llm_async(
+    tipo_analise: str,
+    codigo: str,
+    analise_extra: str,
+    model_name: str,
+    max_token_out: int,
+    ao_evento: Optional[ObservadorEventos] = None,
+    ao_delta: Optional[ObservadorDelta] = None
+) -> str:
+    """
+    Executa análise usando LLM da OpenAI via gateway assíncrono.
+    Pode ser aguardada em paralelo com outras análises (ex.: asyncio.gather).
+    Falhas transitórias são repetidas pelo gateway; `ao_evento` recebe os eventos de retry/circuito.
+    Com `ao_delta`, a resposta vem em streaming e cada trecho é repassado assim que chega.
     """
     
     prompt_sistema = carregar_prompt(tipo_analise)
-
-    mensagens = [
-        {"role": "system", "content": prompt_sistema},
-        {'role': 'user', 'content': codigo},
-        {
-            'role': 'user', 
-            'content': f'Instruções extras do usuário a serem consideradas na análise: {analise_extra}' if analise_extra and analise_extra.strip() else 'Nenhuma instrução extra fornecida pelo usuário.'
-        }
-    ]
+    mensagens = montar_mensagens(prompt_sistema, codigo, analise_extra)
 
     try:
         print(f"🤖 Fazendo chamada para OpenAI...")
@@ -77,52 +148,22 @@ def executar_analise_llm(
         print(f"🔤 Max tokens: {max_token_out}")
         print(f"📝 Tamanho do código: {len(codigo)} caracteres")
         
-        response = openai_client.chat.completions.create(
-            model=model_name,
-            messages=mensagens,
+        response = await gateway_llm.chat(
+            model_name,
+            mensagens,
+            ao_evento=ao_evento,
+            ao_delta=ao_delta,
             temperature=0.5,
             max_tokens=max_token_out
         )
         
         print(f"✅ Resposta recebida da OpenAI")
-        
-        # CORREÇÃO: Tratamento robusto da resposta
-        if not response:
-            print("❌ Response é None")
-            raise RuntimeError("Resposta vazia da API OpenAI")
-        
-        if not response.choices:
-            print("❌ Response.choices está vazio")
-            raise RuntimeError("Nenhuma escolha na resposta da OpenAI")
-        
-        choice = response.choices[0]
-        if not choice:
-            print("❌ Choice é None")
-            raise RuntimeError("Primeira escolha é None")
-        
-        if not choice.message:
-            print("❌ Choice.message é None")
-            raise RuntimeError("Mensagem da escolha é None")
-        
-        conteudo_resposta = choice.message.content
-        print(f"📄 Conteudo recebido: {type(conteudo_resposta)}")
-        
-        # CORREÇÃO PRINCIPAL: Verificar se conteudo_resposta é None antes de fazer strip()
-        if conteudo_resposta is None:
-            print("❌ conteudo_resposta é None - este é o problema!")
-            raise RuntimeError("Conteúdo da resposta é None")
-        
-        # Agora é seguro fazer strip()
-        resultado_final = conteudo_resposta.strip()
-        
-        if not resultado_final:
-            print("⚠️ Resultado final está vazio após strip")
-            resultado_final = "Análise concluída, mas resposta vazia. Tente novamente."
-        
-        print(f"✅ Análise concluída! Resposta: {len(resultado_final)} caracteres")
-        return resultado_final
+        usage = getattr(response, 'usage', None)
+        if usage:
+            print(f"🔢 Tokens usados: entrada={usage.prompt_tokens}, saída={usage.completion_tokens}")
+        return _extrair_conteudo(response)
         
     except Exception as e:
         error_msg = f"ERRO: Falha na chamada à API da OpenAI para análise '{tipo_analise}'. Causa: {e}"
         print(error_msg)
-        raise RuntimeError(f"Erro ao comunicar com a OpenAI: {e}") from e
\ No newline at end of file
+        raise RuntimeError(f"Erro ao comunicar com a OpenAI: {e}") from e
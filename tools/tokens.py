@@ -0,0 +1,31 @@
+# tools/tokens.py - ESTIMATIVA DE TOKENS PARA CHAMADAS LLM
+from typing import Dict, List
+
+# tiktoken é opcional: sem ele usamos a heurística de ~4 caracteres por token
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+    TIKTOKEN_DISPONIVEL = True
+except Exception:
+    _encoding = None
+    TIKTOKEN_DISPONIVEL = False
+
+CARACTERES_POR_TOKEN = 4
+TOKENS_POR_MENSAGEM = 4  # overhead de formatação de cada mensagem do chat
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estima quantos tokens um texto consome no modelo"""
+    if not texto:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(texto, disallowed_special=()))
+    return (len(texto) + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
+
+
+def estimar_tokens_mensagens(mensagens: List[Dict[str, str]]) -> int:
+    """Estima os tokens de entrada de uma lista de mensagens de chat"""
+    return sum(
+        estimar_tokens(mensagem.get('content') or '') + TOKENS_POR_MENSAGEM
+        for mensagem in mensagens
+    )
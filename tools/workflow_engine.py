@@ -0,0 +1,293 @@
+# tools/workflow_engine.py - MOTOR DE WORKFLOW EM DAG (ETAPAS COM ENTRADAS/SAÍDAS, PARALELISMO, TIMEOUT, RETRY E CACHE)
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.cache_llm import gerar_chave
+from tools.cancelamento import JobCanceladoError, TokenCancelamento, contexto_cancelamento, token_atual
+
+
+class WorkflowConfig:
+    """Configurações do motor de workflow (variáveis de ambiente)"""
+    MAX_ETAPAS_PARALELAS = int(os.getenv('WORKFLOW_MAX_ETAPAS_PARALELAS', 4))
+    # Intervalo máximo entre verificações de cancelamento/timeouts enquanto espera as etapas
+    INTERVALO_VERIFICACAO = 0.5
+
+
+class WorkflowInvalidoError(ValueError):
+    """Definição de workflow inconsistente (entrada sem produtor, saída duplicada, ciclo...)"""
+
+
+class EtapaFalhouError(RuntimeError):
+    """Uma etapa esgotou as tentativas; o workflow é interrompido"""
+
+    def __init__(self, etapa: str, erro: BaseException):
+        self.etapa = etapa
+        self.erro = erro
+        super().__init__(f"Etapa '{etapa}' falhou: {erro}")
+
+
+class EtapaTimeoutError(TimeoutError):
+    """A etapa passou do tempo limite (a execução é cancelada)"""
+
+
+@dataclass
+class Etapa:
+    """
+    Etapa declarada no registro. `entradas` mapeia parâmetro da função -> valor do
+    contexto; `saida` é o nome do valor produzido; `apos` lista valores que precisam
+    existir antes da etapa rodar, sem serem passados a ela. O nome também é o status
+    do job enquanto a etapa roda.
+    """
+    nome: str
+    funcao: str
+    saida: str
+    entradas: Dict[str, str] = field(default_factory=dict)
+    apos: List[str] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+    mensagem: str = ''
+    timeout: Optional[float] = None
+    tentativas: int = 1
+    cache: bool = True
+    duracao: float = 2  # usado apenas na simulação
+
+    @property
+    def dependencias(self) -> List[str]:
+        """Valores do contexto que precisam existir para a etapa rodar"""
+        return list(self.entradas.values()) + self.apos
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> "Etapa":
+        entradas = dados.get('inputs') or {}
+        if isinstance(entradas, (list, tuple)):
+            entradas = {nome: nome for nome in entradas}
+        return cls(
+            nome=dados['status'],
+            funcao=dados['agent_function'],
+            saida=dados['output'],
+            entradas=dict(entradas),
+            apos=list(dados.get('after') or []),
+            params=dict(dados.get('params') or {}),
+            mensagem=dados.get('message', ''),
+            timeout=dados.get('timeout'),
+            tentativas=max(1, int(dados.get('retries', 0)) + 1),
+            cache=dados.get('cache', True),
+            duracao=dados.get('duration', 2)
+        )
+
+
+class DefinicaoWorkflow:
+    """Workflow do registro já validado e em ordem topológica (empates na ordem declarada)"""
+
+    def __init__(self, nome: str, definicao: Dict[str, Any]):
+        self.nome = nome
+        self.descricao = definicao.get('description', '')
+        self.entradas_iniciais: List[str] = list(definicao.get('inputs', []))
+        self.etapas: List[Etapa] = [Etapa.de_dict(dados) for dados in definicao['steps']]
+        self.etapas = self._ordenar()
+
+    def _ordenar(self) -> List[Etapa]:
+        produtores: Dict[str, Etapa] = {}
+        for etapa in self.etapas:
+            if etapa.saida in produtores or etapa.saida in self.entradas_iniciais:
+                raise WorkflowInvalidoError(f"[{self.nome}] Saída '{etapa.saida}' produzida mais de uma vez")
+            produtores[etapa.saida] = etapa
+
+        dependencias: Dict[str, set] = {}
+        for etapa in self.etapas:
+            dependencias[etapa.nome] = set()
+            for chave in etapa.dependencias:
+                if chave in self.entradas_iniciais:
+                    continue
+                if chave not in produtores:
+                    raise WorkflowInvalidoError(
+                        f"[{self.nome}] Etapa '{etapa.nome}' depende de '{chave}', que nenhuma etapa produz"
+                    )
+                dependencias[etapa.nome].add(produtores[chave].nome)
+
+        ordem: List[Etapa] = []
+        restantes = list(self.etapas)
+        concluidas: set = set()
+        while restantes:
+            prontas = [etapa for etapa in restantes if dependencias[etapa.nome] <= concluidas]
+            if not prontas:
+                raise WorkflowInvalidoError(
+                    f"[{self.nome}] Ciclo entre as etapas: {', '.join(etapa.nome for etapa in restantes)}"
+                )
+            for etapa in prontas:
+                ordem.append(etapa)
+                concluidas.add(etapa.nome)
+                restantes.remove(etapa)
+        return ordem
+
+
+@dataclass
+class _Tentativa:
+    etapa: Etapa
+    numero: int
+    token: TokenCancelamento
+    prazo: Optional[float]
+    desfazer: Callable[[], None]
+
+
+# Assinaturas dos callbacks de progresso
+ObservadorInicio = Callable[[Etapa, List[str]], None]
+ObservadorConclusao = Callable[[Etapa, Any, bool], None]
+
+
+class MotorWorkflow:
+    """
+    Executa uma `DefinicaoWorkflow`: cada etapa roda assim que todas as suas entradas
+    existem no contexto, com até `max_paralelo` etapas ao mesmo tempo.
+
+    - timeout: a tentativa é cancelada (chamadas LLM em voo são abortadas) e conta como falha;
+    - retries: a etapa é repetida até esgotar as tentativas;
+    - cache: com um armazém de checkpoints, o resultado de cada etapa é gravado junto de uma
+      chave das entradas, e uma nova execução com as mesmas entradas reaproveita o resultado;
+    - cancelamento: o token do job que chamou `executar` é repassado para as etapas.
+    """
+
+    def __init__(self, definicao: DefinicaoWorkflow, funcoes: Dict[str, Callable[..., Any]],
+                 max_paralelo: int = WorkflowConfig.MAX_ETAPAS_PARALELAS):
+        faltando = sorted({etapa.funcao for etapa in definicao.etapas} - set(funcoes))
+        if faltando:
+            raise WorkflowInvalidoError(f"[{definicao.nome}] Funções não registradas: {', '.join(faltando)}")
+        self.definicao = definicao
+        self.funcoes = funcoes
+        self.max_paralelo = max(1, max_paralelo)
+
+    def _chave_cache(self, etapa: Etapa, entradas: Dict[str, Any]) -> str:
+        return gerar_chave(etapa.funcao, etapa.params, entradas)
+
+    def _executar_tentativa(self, etapa: Etapa, entradas: Dict[str, Any], token: TokenCancelamento) -> Any:
+        with contexto_cancelamento(token):
+            token.verificar()
+            return self.funcoes[etapa.funcao](**etapa.params, **entradas)
+
+    def executar(self, contexto_inicial: Dict[str, Any], job_id: str = '', armazem=None,
+                 ao_iniciar: Optional[ObservadorInicio] = None,
+                 ao_concluir: Optional[ObservadorConclusao] = None) -> Dict[str, Any]:
+        """Roda o workflow e devolve o contexto final (entradas iniciais + saídas de todas as etapas)"""
+        faltando = [nome for nome in self.definicao.entradas_iniciais if nome not in contexto_inicial]
+        if faltando:
+            raise WorkflowInvalidoError(f"[{self.definicao.nome}] Entradas ausentes: {', '.join(faltando)}")
+
+        contexto = dict(contexto_inicial)
+        token_pai = token_atual()
+        pendentes: List[Etapa] = list(self.definicao.etapas)
+        ativas: Dict[Future, _Tentativa] = {}
+        # Tentativas abandonadas por timeout ainda ocupam threads até perceberem o cancelamento
+        pool = ThreadPoolExecutor(max_workers=self.max_paralelo * 2,
+                                  thread_name_prefix=f"workflow-{self.definicao.nome}")
+
+        def _entradas_de(etapa: Etapa) -> Dict[str, Any]:
+            return {parametro: contexto[chave] for parametro, chave in etapa.entradas.items()}
+
+        def _submeter(etapa: Etapa, numero: int) -> None:
+            token = TokenCancelamento(job_id)
+            desfazer = token_pai.ao_cancelar(token.cancelar) if token_pai else (lambda: None)
+            prazo = time.monotonic() + etapa.timeout if etapa.timeout else None
+            futuro = pool.submit(self._executar_tentativa, etapa, _entradas_de(etapa), token)
+            ativas[futuro] = _Tentativa(etapa, numero, token, prazo, desfazer)
+            if ao_iniciar:
+                ao_iniciar(etapa, [tentativa.etapa.nome for tentativa in ativas.values()])
+
+        def _concluir(etapa: Etapa, resultado: Any, do_cache: bool) -> None:
+            contexto[etapa.saida] = resultado
+            if ao_concluir:
+                ao_concluir(etapa, resultado, do_cache)
+
+        def _falhar(tentativa: _Tentativa, erro: BaseException) -> None:
+            etapa = tentativa.etapa
+            if tentativa.numero < etapa.tentativas:
+                print(f"🔁 [{self.definicao.nome}] Etapa '{etapa.nome}' falhou "
+                      f"(tentativa {tentativa.numero}/{etapa.tentativas}): {erro}")
+                _submeter(etapa, tentativa.numero + 1)
+                return
+            raise EtapaFalhouError(etapa.nome, erro)
+
+        try:
+            while pendentes or ativas:
+                if token_pai is not None:
+                    token_pai.verificar()
+
+                # Despacha tudo que já tem as entradas prontas (cache primeiro, sem ocupar vaga)
+                for etapa in list(pendentes):
+                    if not all(chave in contexto for chave in etapa.dependencias):
+                        continue
+                    if etapa.cache and armazem is not None:
+                        registro = armazem.carregar(job_id, etapa.nome)
+                        # Checkpoints sem chave (gravados antes do motor) valem para qualquer entrada
+                        if registro is not None and registro.get('chave') in (None, self._chave_cache(etapa, _entradas_de(etapa))):
+                            print(f"♻️ [{self.definicao.nome}] Etapa '{etapa.nome}' reaproveitada do cache")
+                            pendentes.remove(etapa)
+                            _concluir(etapa, registro['resultado'], True)
+                            continue
+                    if len(ativas) >= self.max_paralelo:
+                        continue
+                    pendentes.remove(etapa)
+                    _submeter(etapa, 1)
+
+                if not ativas:
+                    if pendentes:
+                        # Só acontece se uma etapa anterior saiu sem produzir a saída
+                        raise WorkflowInvalidoError(
+                            f"[{self.definicao.nome}] Etapas sem entradas disponíveis: "
+                            f"{', '.join(etapa.nome for etapa in pendentes)}"
+                        )
+                    continue
+
+                agora = time.monotonic()
+                prazos = [tentativa.prazo for tentativa in ativas.values() if tentativa.prazo is not None]
+                espera = WorkflowConfig.INTERVALO_VERIFICACAO
+                if prazos:
+                    espera = max(0.0, min(espera, min(prazos) - agora))
+                concluidos, _ = wait(list(ativas), timeout=espera, return_when=FIRST_COMPLETED)
+
+                for futuro in concluidos:
+                    tentativa = ativas.pop(futuro)
+                    tentativa.desfazer()
+                    try:
+                        resultado = futuro.result()
+                    except JobCanceladoError as erro:
+                        if token_pai is not None and token_pai.cancelado:
+                            raise
+                        _falhar(tentativa, erro)
+                        continue
+                    except Exception as erro:
+                        _falhar(tentativa, erro)
+                        continue
+                    if tentativa.etapa.cache and armazem is not None:
+                        # Job cancelado (ou removido) não grava mais checkpoints
+                        if token_pai is not None:
+                            token_pai.verificar()
+                        armazem.salvar(job_id, tentativa.etapa.nome, resultado,
+                                       chave=self._chave_cache(tentativa.etapa, _entradas_de(tentativa.etapa)))
+                    _concluir(tentativa.etapa, resultado, False)
+
+                agora = time.monotonic()
+                for futuro, tentativa in list(ativas.items()):
+                    if tentativa.prazo is not None and agora >= tentativa.prazo:
+                        del ativas[futuro]
+                        tentativa.token.cancelar(f"Tempo limite de {tentativa.etapa.timeout:g}s excedido")
+                        tentativa.desfazer()
+                        _falhar(tentativa, EtapaTimeoutError(
+                            f"Etapa '{tentativa.etapa.nome}' excedeu {tentativa.etapa.timeout:g}s"
+                        ))
+        except BaseException:
+            # Falha ou cancelamento: interrompe as etapas que ainda estão rodando
+            for tentativa in ativas.values():
+                tentativa.token.cancelar("Workflow interrompido")
+                tentativa.desfazer()
+            raise
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return contexto
+
+
+def validar_registro(registro: Dict[str, Dict[str, Any]]) -> Dict[str, DefinicaoWorkflow]:
+    """Valida todas as entradas do registro (falha na importação, não no meio de um job)"""
+    return {nome: DefinicaoWorkflow(nome, definicao) for nome, definicao in registro.items()}